@@ -0,0 +1,88 @@
+# benchmarks/bench_cubo_agregacao.py
+"""
+Compara, por combinação dos filtros de categoria e grupo, os agregados do painel
+(cards de resumo, estoque por grupo e categorias com estoque baixo) calculados com
+groupby sobre as linhas filtradas e com um recorte do cubo de modules.cubo_agregacao.
+
+O cubo é montado uma vez por dataset (o tempo de montagem aparece à parte); depois disso
+cada combinação de filtros só seleciona células, sem percorrer os produtos.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_cubo_agregacao
+    python -m benchmarks.bench_cubo_agregacao --tamanhos 10000 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.bench_hierarquia import gerar_df_bruto
+from benchmarks.bench_historico import gravar_relatorio
+from modules.cubo_agregacao import CuboAgregacao
+from modules.data_loader import carregar_produtos_compactos, serie_numerica
+from modules.dataset_efetivo import DatasetEfetivo
+from modules.inventory_manager import NIVEL_BAIXO
+
+TAMANHOS_PADRAO = [10_000, 100_000, 1_000_000]
+LIMITE_BAIXO = 15
+LIMITE_MEDIO = 120
+REPETICOES = 5
+
+def _agregados_por_linhas(dataset, categoria, grupo):
+    """Agregados do painel como eram calculados antes do cubo: groupby sobre as linhas filtradas."""
+    dff = dataset.filtrar(categoria, grupo)
+    estoque = serie_numerica(dff['Estoque']).fillna(0)
+    classificacao = dataset.classificar_niveis(LIMITE_BAIXO, LIMITE_MEDIO, dataset.mascara_filtros(categoria, grupo))
+    resumo = {
+        'total_skus': dff['Código'].nunique(),
+        'qtd_total_estoque': estoque.sum(),
+        'num_categorias': dff['Categoria'].nunique(),
+        'num_grupos': dff['Grupo'].nunique(),
+    }
+    por_grupo = estoque.groupby(dff['Grupo'], observed=True).sum()
+    baixos_por_categoria = dff[classificacao.mascara(NIVEL_BAIXO)].groupby('Categoria', observed=True)['Código'].nunique()
+    return resumo, por_grupo, baixos_por_categoria
+
+def _agregados_por_cubo(dataset, categoria, grupo):
+    cubo = dataset.cubo_agregacao(LIMITE_BAIXO, LIMITE_MEDIO, categoria, grupo)
+    return cubo.resumo_indicadores(), cubo.por_grupo('estoque'), cubo.recortar(nivel=NIVEL_BAIXO).por_categoria()
+
+def _cronometrar(funcao, *args):
+    inicio = time.perf_counter()
+    for _ in range(REPETICOES):
+        resultado = funcao(*args)
+    return (time.perf_counter() - inicio) / REPETICOES, resultado
+
+def _conferir(resultado_linhas, resultado_cubo):
+    resumo_linhas, por_grupo_linhas, baixos_linhas = resultado_linhas
+    resumo_cubo, por_grupo_cubo, baixos_cubo = resultado_cubo
+    assert {chave: round(valor, 3) for chave, valor in resumo_linhas.items()} == resumo_cubo
+    pd.testing.assert_series_equal(por_grupo_linhas.round(3), por_grupo_cubo, check_names=False, check_index_type=False, check_categorical=False)
+    pd.testing.assert_series_equal(baixos_linhas, baixos_cubo, check_names=False, check_index_type=False, check_dtype=False, check_categorical=False)
+
+def executar(tamanhos):
+    print(f"{'Linhas':>10} | {'filtros':>18} | {'groupby (ms)':>12} | {'cubo (ms)':>9} | {'ganho':>7} | {'montagem do cubo (ms)':>21}")
+    for num_linhas in tamanhos:
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, 'relatorio.csv')
+            gravar_relatorio(caminho, gerar_df_bruto(num_linhas), pd.Timestamp('2025-05-27'), 0)
+            df = carregar_produtos_compactos(caminho)
+
+        dataset = DatasetEfetivo(df, {}, 1)
+        codigos_niveis = dataset.classificar_niveis(LIMITE_BAIXO, LIMITE_MEDIO).codigos
+        tempo_montagem, _ = _cronometrar(CuboAgregacao.construir, dataset.df, codigos_niveis)
+        categoria = df['Categoria'].dropna().iloc[len(df) // 2]
+        grupo = df['Grupo'].dropna().iloc[len(df) // 3]
+        for rotulo, filtros in (('sem filtros', (None, None)), ('categoria', (categoria, None)), ('grupo', (None, grupo))):
+            tempo_linhas, resultado_linhas = _cronometrar(_agregados_por_linhas, dataset, *filtros)
+            tempo_cubo, resultado_cubo = _cronometrar(_agregados_por_cubo, dataset, *filtros)
+            _conferir(resultado_linhas, resultado_cubo)
+            print(f"{num_linhas:>10,} | {rotulo:>18} | {tempo_linhas * 1000:>12.2f} | {tempo_cubo * 1000:>9.3f} | "
+                  f"{tempo_linhas / tempo_cubo:>6.0f}x | {tempo_montagem * 1000:>21.1f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO)
+    executar(parser.parse_args().tamanhos)
@@ -0,0 +1,91 @@
+# benchmarks/bench_hierarquia.py
+"""
+Compara a extração de Categoria/Grupo por iterrows (implementação original)
+com a versão vetorizada de modules.data_loader.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_hierarquia
+    python -m benchmarks.bench_hierarquia --tamanhos 1000 100000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from modules.data_loader import PREFIXO_CATEGORIA, PREFIXO_GRUPO, _atribuir_hierarquia
+
+TAMANHOS_PADRAO = [1_000, 100_000, 1_000_000]
+PRODUTOS_POR_CATEGORIA = 12
+CATEGORIAS_POR_GRUPO = 4
+
+def gerar_df_bruto(num_linhas, semente=42):
+    """Gera um DataFrame de strings no formato lido por carregar_produtos_com_hierarquia."""
+    rng = np.random.default_rng(semente)
+    posicoes = np.arange(num_linhas)
+    bloco_categoria = PRODUTOS_POR_CATEGORIA + 1
+    bloco_grupo = CATEGORIAS_POR_GRUPO * bloco_categoria + 1
+    indice_grupo, posicao_no_grupo = np.divmod(posicoes, bloco_grupo)
+    eh_total_grupo = posicao_no_grupo == bloco_grupo - 1
+    eh_total_categoria = ~eh_total_grupo & ((posicao_no_grupo % bloco_categoria) == PRODUTOS_POR_CATEGORIA)
+    indice_categoria = indice_grupo * CATEGORIAS_POR_GRUPO + posicao_no_grupo // bloco_categoria
+    eh_total = eh_total_grupo | eh_total_categoria
+
+    codigos = pd.Series(posicoes + 1).astype(str)
+    numero_categoria = pd.Series(indice_categoria).astype(str).str.zfill(3)
+    numero_grupo = pd.Series(indice_grupo).astype(str).str.zfill(3)
+    produtos = np.where(eh_total_grupo, PREFIXO_GRUPO + numero_grupo,
+                        np.where(eh_total_categoria, PREFIXO_CATEGORIA + numero_categoria, 'PRODUTO ' + codigos))
+    codigos[eh_total] = np.nan
+
+    estoque = pd.Series(rng.integers(-50, 5000, num_linhas)).astype(str) + ',' + pd.Series(rng.integers(0, 100, num_linhas)).astype(str).str.zfill(2)
+    venda = pd.Series(rng.integers(0, 500, num_linhas)).astype(str) + ',00'
+
+    return pd.DataFrame({
+        'Código': codigos,
+        'Un': np.where(eh_total, None, 'CX'),
+        'Produto_Original': pd.Series(produtos, dtype=object),
+        'VendaMensal_Original': venda,
+        'Estoque_Original': estoque,
+    })
+
+def _atribuir_hierarquia_iterrows(df_full, coluna_produto):
+    """Implementação original, mantida aqui apenas como referência de desempenho e de resultado."""
+    df_full['CategoriaExtraida'] = pd.NA
+    df_full['GrupoExtraido'] = pd.NA
+
+    for index, row in df_full.iterrows():
+        produto_original_strip = row[coluna_produto].strip() if pd.notna(row[coluna_produto]) else ''
+
+        if produto_original_strip.startswith(PREFIXO_CATEGORIA):
+            nome_categoria = produto_original_strip[len(PREFIXO_CATEGORIA):].strip()
+            df_full.loc[index, 'CategoriaExtraida'] = nome_categoria
+
+        if produto_original_strip.startswith(PREFIXO_GRUPO):
+            nome_grupo = produto_original_strip[len(PREFIXO_GRUPO):].strip()
+            df_full.loc[index, 'GrupoExtraido'] = nome_grupo
+
+    df_full['Categoria'] = df_full['CategoriaExtraida'].bfill()
+    df_full['Grupo'] = df_full['GrupoExtraido'].bfill()
+    return df_full
+
+def _cronometrar(funcao, df_bruto):
+    df_entrada = df_bruto.copy()
+    inicio = time.perf_counter()
+    resultado = funcao(df_entrada, 'Produto_Original')
+    return time.perf_counter() - inicio, resultado
+
+def executar(tamanhos):
+    print(f"{'Linhas':>10} | {'iterrows (s)':>13} | {'vetorizado (s)':>14} | {'ganho':>8}")
+    for num_linhas in tamanhos:
+        df_bruto = gerar_df_bruto(num_linhas)
+        tempo_vetorizado, resultado_vetorizado = _cronometrar(_atribuir_hierarquia, df_bruto)
+        tempo_iterrows, resultado_iterrows = _cronometrar(_atribuir_hierarquia_iterrows, df_bruto)
+
+        pd.testing.assert_frame_equal(resultado_vetorizado, resultado_iterrows)
+        print(f"{num_linhas:>10,} | {tempo_iterrows:>13.3f} | {tempo_vetorizado:>14.4f} | {tempo_iterrows / tempo_vetorizado:>7.0f}x")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO)
+    executar(parser.parse_args().tamanhos)
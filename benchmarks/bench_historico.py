@@ -0,0 +1,86 @@
+# benchmarks/bench_historico.py
+"""
+Mede a ingestão de N relatórios no histórico de snapshots (modules.historico_snapshots)
+e o tempo das consultas de linha do tempo, variação entre relatórios e tendência por grupo.
+
+Os relatórios são gerados em um diretório temporário, um por dia, com o mesmo catálogo
+e estoques sorteados. O tempo por linha deve ficar estável quando N cresce, e uma
+segunda ingestão do mesmo diretório não deve ler nenhum arquivo.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_historico
+    python -m benchmarks.bench_historico --snapshots 2 8 32 --linhas 50000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_hierarquia import gerar_df_bruto
+from modules.historico_snapshots import HistoricoSnapshots
+
+SNAPSHOTS_PADRAO = [2, 8, 32]
+LINHAS_PADRAO = 20_000
+DATA_INICIAL = pd.Timestamp('2025-01-01')
+CABECALHO_COLUNAS = "Código;Un;Produto;Compra;Venda;Média;Venda Dia;Estoque;Dias Estoque;Custo Estoque"
+
+def gravar_relatorio(caminho, df_bruto, data_estoque, semente):
+    """Grava um relatório no formato do ERP (cabeçalho de 4 linhas + produtos e totais)."""
+    rng = np.random.default_rng(semente)
+    estoque = pd.Series(rng.integers(-50, 5000, len(df_bruto))).astype(str) + ',00'
+    linhas = (
+        df_bruto['Código'].fillna('') + ';' + df_bruto['Un'].fillna('') + ';' + df_bruto['Produto_Original']
+        + ';;' + df_bruto['VendaMensal_Original'] + ';;;' + estoque + ';;'
+    )
+    with open(caminho, 'w', encoding='latin-1', newline='') as arquivo:
+        arquivo.write(f"NECESSIDADE ESTOQUE ONLINE - VENDA DE 01/01/25  A  {data_estoque:%d/%m/%y}   Estoque:'{data_estoque:%d/%m/%y}\n")
+        arquivo.write(";;;;;;;;;\n")
+        arquivo.write("Dias Média :;30;Un. Venda;Período\n")
+        arquivo.write(CABECALHO_COLUNAS + "\n")
+        arquivo.write("\n".join(linhas) + "\n")
+
+def _cronometrar(funcao, repeticoes=1):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao()
+    return (time.perf_counter() - inicio) / repeticoes, resultado
+
+def executar(quantidades, num_linhas):
+    df_bruto = gerar_df_bruto(num_linhas)
+    codigo_exemplo = df_bruto['Código'].dropna().iloc[len(df_bruto) // 2]
+    print(f"{'Relatórios':>10} | {'ingestão (s)':>12} | {'µs/linha':>8} | {'reingestão (ms)':>15} | "
+          f"{'linha do tempo (ms)':>19} | {'variação (ms)':>13} | {'tendência (ms)':>14}")
+    for quantidade in quantidades:
+        with tempfile.TemporaryDirectory() as diretorio:
+            diretorio_dados = os.path.join(diretorio, 'data')
+            os.makedirs(diretorio_dados)
+            for indice in range(quantidade):
+                data_estoque = DATA_INICIAL + pd.Timedelta(days=indice)
+                gravar_relatorio(os.path.join(diretorio_dados, f"{data_estoque:%d-%m-%y}.csv"), df_bruto, data_estoque, indice)
+
+            historico = HistoricoSnapshots(os.path.join(diretorio, 'historico'))
+            tempo_ingestao, novos = _cronometrar(lambda: historico.ingerir_diretorio(diretorio_dados))
+            tempo_reingestao, repetidos = _cronometrar(lambda: historico.ingerir_diretorio(diretorio_dados))
+            assert novos == quantidade and repetidos == 0
+
+            # Consultas em um histórico reaberto do disco
+            historico = HistoricoSnapshots(os.path.join(diretorio, 'historico'))
+            tempo_linha, linha = _cronometrar(lambda: historico.linha_do_tempo_produto(codigo_exemplo), 5)
+            tempo_variacao, _ = _cronometrar(historico.variacao_entre_snapshots, 5)
+            tempo_tendencia, _ = _cronometrar(historico.tendencia_grupos, 5)
+            assert len(linha) == quantidade
+
+            linhas_totais = quantidade * df_bruto['Código'].notna().sum()
+            print(f"{quantidade:>10} | {tempo_ingestao:>12.2f} | {tempo_ingestao / linhas_totais * 1e6:>8.2f} | "
+                  f"{tempo_reingestao * 1000:>15.2f} | {tempo_linha * 1000:>19.2f} | "
+                  f"{tempo_variacao * 1000:>13.2f} | {tempo_tendencia * 1000:>14.2f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--snapshots', type=int, nargs='+', default=SNAPSHOTS_PADRAO)
+    parser.add_argument('--linhas', type=int, default=LINHAS_PADRAO)
+    args = parser.parse_args()
+    executar(args.snapshots, args.linhas)
@@ -0,0 +1,58 @@
+# benchmarks/bench_memoria_esquema.py
+"""
+Relatório de memória (bytes por linha) do DataFrame de produtos antes e depois de
+compactar_dataframe_estoque, com o tempo de um filtro por grupo e de um groupby('Grupo').
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_memoria_esquema
+    python -m benchmarks.bench_memoria_esquema data/DAMI29-05.csv /caminho/relatorio_grande.csv
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from modules.data_loader import carregar_produtos_com_hierarquia, compactar_dataframe_estoque, relatorio_memoria_por_linha, serie_numerica
+
+ARQUIVOS_PADRAO = ['data/DAMI29-05.csv', 'data/16-05.CSV']
+REPETICOES = 20
+
+def _cronometrar_consultas(df):
+    """Tempo médio (ms) de um filtro de igualdade por grupo e de uma soma de estoque por grupo."""
+    grupo = df['Grupo'].dropna().iloc[0]
+    inicio = time.perf_counter()
+    for _ in range(REPETICOES):
+        df[df['Grupo'] == grupo]
+    tempo_filtro = (time.perf_counter() - inicio) / REPETICOES * 1000
+
+    inicio = time.perf_counter()
+    for _ in range(REPETICOES):
+        serie_numerica(df['Estoque']).groupby(df['Grupo'], observed=True).sum()
+    tempo_groupby = (time.perf_counter() - inicio) / REPETICOES * 1000
+    return tempo_filtro, tempo_groupby
+
+def executar(arquivos):
+    for caminho in arquivos:
+        df_original = carregar_produtos_com_hierarquia(caminho)
+        if df_original is None or df_original.empty:
+            continue
+        df_compacto = compactar_dataframe_estoque(df_original)
+        antes = relatorio_memoria_por_linha(df_original)
+        depois = relatorio_memoria_por_linha(df_compacto)
+
+        print(f"\n{caminho} ({antes['linhas']:,} linhas)")
+        print(f"{'Coluna':>12} | {'antes (B/linha)':>15} | {'depois (B/linha)':>16} | {'tipo compacto':>14}")
+        for coluna in df_original.columns:
+            print(f"{coluna:>12} | {antes['colunas'][coluna]:>15.1f} | {depois['colunas'][coluna]:>16.1f} | {str(df_compacto[coluna].dtype):>14}")
+        print(f"{'TOTAL':>12} | {antes['total']:>15.1f} | {depois['total']:>16.1f} | {antes['total'] / depois['total']:>13.1f}x")
+
+        for rotulo, df in (('original', df_original), ('compacto', df_compacto)):
+            tempo_filtro, tempo_groupby = _cronometrar_consultas(df)
+            print(f"{rotulo:>12} | filtro Grupo == x: {tempo_filtro:.3f} ms | groupby('Grupo'): {tempo_groupby:.3f} ms")
+
+        pd.testing.assert_series_equal(serie_numerica(df_compacto['Estoque']), df_original['Estoque'], check_dtype=False)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('arquivos', nargs='*', default=ARQUIVOS_PADRAO)
+    executar(parser.parse_args().arquivos)
@@ -0,0 +1,62 @@
+# benchmarks/bench_reorder_engine.py
+"""
+Mede a sugestão de compra de modules.reorder_engine para N SKUs sintéticos: o cálculo
+vetorizado sobre os arrays (calcular_sugestao_compra) e o DataFrame completo de
+sugerir_compras (venda diária, cobertura, ruptura prevista e quantidade, já ordenado).
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_reorder_engine
+    python -m benchmarks.bench_reorder_engine --tamanhos 100000 5000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from modules.reorder_engine import COLUNA_QTD_SUGERIDA, calcular_sugestao_compra, sugerir_compras, venda_media_diaria
+
+TAMANHOS_PADRAO = [10_000, 100_000, 1_000_000]
+HORIZONTE_DIAS = 30
+ESTOQUE_SEGURANCA_DIAS = 7
+DIAS_MEDIA = 27
+DATA_ESTOQUE = pd.Timestamp('2025-05-27')
+REPETICOES = 5
+
+def gerar_df_produtos(num_skus, semente=42):
+    """DataFrame de produtos com as colunas lidas por carregar_produtos_sugestao_compra."""
+    rng = np.random.default_rng(semente)
+    venda = np.round(rng.gamma(0.6, 40, num_skus), 2)
+    venda[rng.random(num_skus) < 0.3] = np.nan
+    return pd.DataFrame({
+        'Código': pd.Series(np.arange(1, num_skus + 1)).astype(str),
+        'Un': 'CX',
+        'Produto': 'PRODUTO ' + pd.Series(np.arange(1, num_skus + 1)).astype(str),
+        'VendaMensal': venda,
+        'MediaDiaria': np.round(venda / DIAS_MEDIA, 2),
+        'Estoque': np.round(rng.normal(80, 120, num_skus), 2),
+        'Categoria': pd.Categorical(rng.integers(0, 200, num_skus).astype(str)),
+        'Grupo': pd.Categorical(rng.integers(0, 20, num_skus).astype(str)),
+    })
+
+def _cronometrar(funcao):
+    inicio = time.perf_counter()
+    for _ in range(REPETICOES):
+        resultado = funcao()
+    return (time.perf_counter() - inicio) / REPETICOES, resultado
+
+def executar(tamanhos):
+    print(f"{'SKUs':>10} | {'cálculo (ms)':>12} | {'sugerir_compras (ms)':>20} | {'com sugestão':>12}")
+    for num_skus in tamanhos:
+        df = gerar_df_produtos(num_skus)
+        estoque = df['Estoque'].to_numpy()
+        venda_diaria = venda_media_diaria(df, DIAS_MEDIA)
+        tempo_calculo, _ = _cronometrar(lambda: calcular_sugestao_compra(estoque, venda_diaria, HORIZONTE_DIAS, ESTOQUE_SEGURANCA_DIAS))
+        tempo_total, df_sugestao = _cronometrar(lambda: sugerir_compras(df, HORIZONTE_DIAS, ESTOQUE_SEGURANCA_DIAS, DATA_ESTOQUE, DIAS_MEDIA))
+        com_sugestao = int((df_sugestao[COLUNA_QTD_SUGERIDA] > 0).sum())
+        print(f"{num_skus:>10,} | {tempo_calculo * 1000:>12.2f} | {tempo_total * 1000:>20.1f} | {com_sugestao:>12,}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO)
+    executar(parser.parse_args().tamanhos)
@@ -0,0 +1,318 @@
+# benchmarks/bench_suite.py
+"""
+Suíte de benchmarks ponta a ponta sobre relatórios sintéticos no layout do ERP
+(benchmarks.gerador_relatorio), de 1 mil a 5 milhões de produtos.
+
+Para cada tamanho mede:
+- os carregadores (carregar_apenas_produtos, carregar_produtos_com_hierarquia e o
+  carregar_produtos_compactos usado pelo painel);
+- identificar_produtos_estoque_baixo e identificar_produtos_em_falta;
+- cada criar_grafico_* de components.graphs.graficos_estoque, com o tamanho da figura
+  serializada (acusando as que passam de ORCAMENTO_PAYLOAD_FIGURA_BYTES);
+- o caminho completo do painel principal: o callback da chave de filtros e cada callback de
+  saída do painel, chamados pelo endpoint do Dash (/_dash-update-component) com o cliente de
+  teste do Flask, logo após publicar os dados (frio) e de novo com o cache de figuras (quente).
+
+O resultado é gravado em JSON (com commit, data e versões das bibliotecas); --comparar
+lista as etapas que ficaram mais lentas entre dois resultados, por exemplo entre commits.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_suite
+    python -m benchmarks.bench_suite --tamanhos 1000 10000 100000 1000000 5000000
+    python -m benchmarks.bench_suite --saida benchmarks/resultados/antes.json
+    python -m benchmarks.bench_suite --comparar benchmarks/resultados/antes.json benchmarks/resultados/depois.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from datetime import datetime
+
+import dash
+import numpy as np
+import pandas as pd
+import plotly
+
+from benchmarks.gerador_relatorio import gerar_relatorio_sintetico
+from components.graphs.graficos_estoque import (
+    criar_grafico_estoque_por_grupo,
+    criar_grafico_top_n_produtos_estoque,
+    criar_grafico_niveis_estoque,
+    criar_grafico_categorias_com_estoque_baixo,
+    criar_grafico_estoque_produtos_populares,
+    criar_grafico_colunas_estoque_por_grupo,
+    tamanho_payload_figura,
+    ORCAMENTO_PAYLOAD_FIGURA_BYTES,
+)
+from modules.data_loader import carregar_apenas_produtos, carregar_produtos_com_hierarquia, carregar_produtos_compactos, serie_numerica
+from modules.inventory_manager import identificar_produtos_estoque_baixo, identificar_produtos_em_falta
+
+TAMANHOS_PADRAO = [1_000, 10_000, 100_000, 1_000_000]
+REPETICOES_PADRAO = 3
+# Acima deste tamanho cada etapa roda uma única vez (o carregamento de 5 milhões leva dezenas de segundos)
+TAMANHO_REPETICAO_UNICA = 1_000_000
+LIMITE_BAIXO = 15
+LIMITE_MEDIO = 120
+DIRETORIO_RESULTADOS = os.path.join('benchmarks', 'resultados')
+TOLERANCIA_REGRESSAO_PADRAO = 0.2
+# Etapas mais rápidas que isso oscilam demais entre execuções para acusar regressão
+TEMPO_MINIMO_COMPARACAO_S = 0.005
+# Callbacks do painel principal, identificados pelo primeiro componente de saída
+SAIDAS_PAINEL = [
+    'card-total-skus',
+    'grafico-colunas-resumo-estoque',
+    'grafico-estoque-grupo',
+    'container-tabela-alerta-estoque-baixo-geral',
+    'grafico-top-n-produtos',
+    'grafico-niveis-estoque',
+    'grafico-estoque-populares',
+]
+CHAVE_CALLBACK_FILTROS = 'store-dados-filtrados-para-modais.data'
+
+def _cronometrar(funcao, repeticoes):
+    """Menor tempo (s) entre as repetições e o resultado da última chamada."""
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+def _metadados():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'plotly': plotly.__version__,
+        'dash': dash.__version__,
+    }
+
+# --- Caminho completo do painel pelo endpoint do Dash ---
+
+def _saidas_da_chave(chave):
+    """Lista de saídas no formato do corpo da requisição a partir da chave do callback_map."""
+    partes = chave[2:-2].split('...') if chave.startswith('..') else [chave]
+    saidas = []
+    for parte in partes:
+        componente, propriedade = parte.rsplit('.', 1)
+        saidas.append({'id': componente, 'property': propriedade.split('@')[0]})
+    return saidas
+
+def _chamar_callback(app, cliente, chave, valores):
+    """POST em /_dash-update-component como o navegador faria; devolve a resposta em JSON."""
+    especificacao = app.callback_map[chave]
+
+    def _valores(dependencias):
+        return [{'id': d['id'], 'property': d['property'], 'value': valores.get(f"{d['id']}.{d['property']}")}
+                for d in dependencias]
+    saidas = _saidas_da_chave(chave)
+    corpo = {
+        'output': chave,
+        'outputs': saidas if chave.startswith('..') else saidas[0],
+        'inputs': _valores(especificacao['inputs']),
+        'state': _valores(especificacao.get('state', [])),
+        'changedPropIds': [],
+    }
+    resposta = cliente.post('/_dash-update-component', json=corpo)
+    if resposta.status_code != 200:
+        raise RuntimeError(f"Callback {chave} respondeu {resposta.status_code}: {resposta.get_data(as_text=True)[:500]}")
+    return resposta.get_json()
+
+class PainelBenchmark:
+    """Registra os callbacks do painel uma vez e mede o caminho completo para cada DataFrame publicado."""
+
+    def __init__(self, df, origem):
+        # Importados aqui: registrar os callbacks só faz sentido quando a etapa do painel roda
+        from app_instance import app
+        from callbacks.geral_callbacks import registrar_callbacks_gerais
+        from components.layout import criar_layout_principal
+        from modules.dataset_efetivo import obter_dataset_efetivo
+        registrar_callbacks_gerais(df, origem)
+        if app.layout is None:
+            # O Dash valida o layout na primeira requisição; é o mesmo layout dinâmico do main.py
+            def criar_layout_atual():
+                dataset = obter_dataset_efetivo()
+                return criar_layout_principal(df_completo=dataset.df_base, nome_arquivo=dataset.origem,
+                                              page_size_tabela=20, versao_dados=dataset.versao_dados)
+            app.layout = criar_layout_atual
+        self.app = app
+        self.cliente = app.server.test_client()
+        # A primeira requisição configura o servidor do Dash; fica fora das medições
+        self.cliente.get('/_dash-layout')
+        self.chaves_saidas = {}
+        for saida in SAIDAS_PAINEL:
+            chaves = [chave for chave in app.callback_map if chave.startswith(f'{saida}.') or f'..{saida}.' in chave]
+            if chaves:
+                self.chaves_saidas[saida] = chaves[0]
+
+    def publicar(self, df, origem):
+        from modules.dataset_efetivo import publicar_dataset_base
+        publicar_dataset_base(df, origem)
+
+    def atualizar(self, filtros=None):
+        """Uma atualização do painel: chave de filtros e depois cada saída; devolve os tempos por callback."""
+        valores = {
+            'span-config-atual-limite-baixo.children': str(LIMITE_BAIXO),
+            'span-config-atual-limite-medio.children': str(LIMITE_MEDIO),
+            **(filtros or {}),
+        }
+        tempos = {}
+        inicio = time.perf_counter()
+        resposta = _chamar_callback(self.app, self.cliente, CHAVE_CALLBACK_FILTROS, valores)
+        tempos[CHAVE_CALLBACK_FILTROS] = time.perf_counter() - inicio
+        valores[CHAVE_CALLBACK_FILTROS] = resposta['response']['store-dados-filtrados-para-modais']['data']
+        for saida, chave in self.chaves_saidas.items():
+            inicio = time.perf_counter()
+            _chamar_callback(self.app, self.cliente, chave, valores)
+            tempos[saida] = time.perf_counter() - inicio
+        return tempos
+
+# --- Execução ---
+
+def _registrar(resultados, tamanho, etapa, funcao, repeticoes):
+    """Mede `funcao` e anota o tempo (ou o erro, sem interromper a suíte) em `resultados`."""
+    try:
+        segundos, resultado = _cronometrar(funcao, repeticoes)
+    except Exception as e:
+        print(f"  {etapa}: ERRO {e}")
+        resultados.append({'tamanho': tamanho, 'etapa': etapa, 'erro': f"{type(e).__name__}: {e}",
+                           'traceback': traceback.format_exc(limit=5)})
+        return None
+    print(f"  {etapa}: {segundos * 1000:,.1f} ms")
+    resultados.append({'tamanho': tamanho, 'etapa': etapa, 'segundos': segundos, 'repeticoes': repeticoes})
+    return resultado
+
+def _medir_tamanho(tamanho, diretorio, repeticoes, painel, resultados, medir_painel):
+    repeticoes = 1 if tamanho >= TAMANHO_REPETICAO_UNICA else repeticoes
+    caminho = os.path.join(diretorio, f'relatorio_{tamanho}.csv')
+    print(f"{tamanho:,} produtos")
+    if not os.path.exists(caminho):
+        _registrar(resultados, tamanho, 'gerar_relatorio_sintetico', lambda: gerar_relatorio_sintetico(caminho, tamanho), 1)
+
+    _registrar(resultados, tamanho, 'carregar_apenas_produtos', lambda: carregar_apenas_produtos(caminho), repeticoes)
+    _registrar(resultados, tamanho, 'carregar_produtos_com_hierarquia', lambda: carregar_produtos_com_hierarquia(caminho), repeticoes)
+    df = _registrar(resultados, tamanho, 'carregar_produtos_compactos', lambda: carregar_produtos_compactos(caminho), repeticoes)
+    if df is None or df.empty:
+        return painel
+
+    df_baixo = _registrar(resultados, tamanho, 'identificar_produtos_estoque_baixo',
+                          lambda: identificar_produtos_estoque_baixo(df, LIMITE_BAIXO), repeticoes)
+    _registrar(resultados, tamanho, 'identificar_produtos_em_falta', lambda: identificar_produtos_em_falta(df), repeticoes)
+
+    estoque_por_grupo = serie_numerica(df['Estoque']).groupby(df['Grupo'], observed=True).sum().reset_index()
+    etapas_graficos = {
+        'criar_grafico_estoque_por_grupo': lambda: criar_grafico_estoque_por_grupo(estoque_por_grupo[estoque_por_grupo['Estoque'] > 0]),
+        'criar_grafico_top_n_produtos_estoque': lambda: criar_grafico_top_n_produtos_estoque(df, n=7),
+        'criar_grafico_niveis_estoque': lambda: criar_grafico_niveis_estoque(df, LIMITE_BAIXO, LIMITE_MEDIO),
+        'criar_grafico_categorias_com_estoque_baixo': lambda: criar_grafico_categorias_com_estoque_baixo(df_baixo if df_baixo is not None else df.iloc[:0]),
+        'criar_grafico_estoque_produtos_populares': lambda: criar_grafico_estoque_produtos_populares(df, n=7),
+        'criar_grafico_colunas_estoque_por_grupo': lambda: criar_grafico_colunas_estoque_por_grupo(df),
+    }
+    for etapa, funcao in etapas_graficos.items():
+        fig = _registrar(resultados, tamanho, etapa, funcao, repeticoes)
+        if fig is not None:
+            # Tamanho da figura serializada, conferido contra o orçamento de bytes dos gráficos
+            payload_bytes = tamanho_payload_figura(fig)
+            resultados[-1].update(payload_bytes=payload_bytes, acima_orcamento=payload_bytes > ORCAMENTO_PAYLOAD_FIGURA_BYTES)
+            print(f"    payload: {payload_bytes / 1024:,.1f} KB{' (acima do orçamento)' if payload_bytes > ORCAMENTO_PAYLOAD_FIGURA_BYTES else ''}")
+
+    if not medir_painel:
+        return painel
+    try:
+        if painel is None:
+            painel = PainelBenchmark(df, caminho)
+        else:
+            painel.publicar(df, caminho)
+        for rotulo in ('frio', 'quente'):
+            # A primeira atualização depois de publicar monta tudo; a segunda sai do cache de figuras
+            tempos = painel.atualizar()
+            for etapa, segundos in tempos.items():
+                resultados.append({'tamanho': tamanho, 'etapa': f'painel_{rotulo}:{etapa}', 'segundos': segundos, 'repeticoes': 1})
+            resultados.append({'tamanho': tamanho, 'etapa': f'painel_{rotulo}', 'segundos': sum(tempos.values()), 'repeticoes': 1})
+            print(f"  painel ({rotulo}): {sum(tempos.values()) * 1000:,.1f} ms")
+    except Exception as e:
+        print(f"  painel: ERRO {e}")
+        resultados.append({'tamanho': tamanho, 'etapa': 'painel', 'erro': f"{type(e).__name__}: {e}",
+                           'traceback': traceback.format_exc(limit=5)})
+    return painel
+
+def executar(tamanhos, repeticoes=REPETICOES_PADRAO, caminho_saida=None, diretorio_relatorios=None, medir_painel=True):
+    resultados = []
+    painel = None
+    with tempfile.TemporaryDirectory() as diretorio_temporario:
+        diretorio = diretorio_relatorios or diretorio_temporario
+        os.makedirs(diretorio, exist_ok=True)
+        for tamanho in tamanhos:
+            painel = _medir_tamanho(tamanho, diretorio, repeticoes, painel, resultados, medir_painel)
+
+    metadados = _metadados()
+    if caminho_saida is None:
+        os.makedirs(DIRETORIO_RESULTADOS, exist_ok=True)
+        caminho_saida = os.path.join(DIRETORIO_RESULTADOS, f"{datetime.now():%Y%m%d-%H%M%S}-{metadados['commit'] or 'sem-commit'}.json")
+    with open(caminho_saida, 'w', encoding='utf-8') as f:
+        json.dump({'metadados': metadados, 'resultados': resultados}, f, ensure_ascii=False, indent=2)
+    print(f"Resultados gravados em {caminho_saida}")
+    return caminho_saida
+
+def comparar(caminho_base, caminho_novo, tolerancia=TOLERANCIA_REGRESSAO_PADRAO):
+    """
+    Compara dois arquivos de resultado etapa a etapa. Retorna a lista de regressões:
+    etapas que ficaram mais de `tolerancia` (fração) mais lentas, que passaram a falhar
+    ou cujas figuras passaram do orçamento de payload.
+    """
+    def _indexar(caminho):
+        with open(caminho, encoding='utf-8') as f:
+            dados = json.load(f)
+        return dados['metadados'], {(r['tamanho'], r['etapa']): r for r in dados['resultados']}
+
+    metadados_base, base = _indexar(caminho_base)
+    metadados_novo, novo = _indexar(caminho_novo)
+    print(f"Base: {metadados_base.get('commit')} ({metadados_base.get('data')})  |  Novo: {metadados_novo.get('commit')} ({metadados_novo.get('data')})")
+    print(f"{'Tamanho':>10} | {'etapa':<60} | {'base (ms)':>10} | {'novo (ms)':>10} | {'variação':>9}")
+    regressoes = []
+    for chave in sorted(set(base) & set(novo)):
+        tamanho, etapa = chave
+        antes, depois = base[chave], novo[chave]
+        if 'erro' in depois and 'erro' not in antes:
+            regressoes.append(chave)
+            print(f"{tamanho:>10,} | {etapa:<60} | {antes['segundos'] * 1000:>10.1f} | {'ERRO':>10} |")
+            continue
+        if depois.get('acima_orcamento') and not antes.get('acima_orcamento'):
+            regressoes.append(chave)
+            print(f"{tamanho:>10,} | {etapa:<60} | payload de {depois['payload_bytes'] / 1024:,.1f} KB passou do orçamento")
+        if 'segundos' not in antes or 'segundos' not in depois:
+            continue
+        variacao = depois['segundos'] / antes['segundos'] - 1 if antes['segundos'] > 0 else 0.0
+        regrediu = variacao > tolerancia and depois['segundos'] >= TEMPO_MINIMO_COMPARACAO_S
+        if regrediu:
+            regressoes.append(chave)
+        print(f"{tamanho:>10,} | {etapa:<60} | {antes['segundos'] * 1000:>10.1f} | {depois['segundos'] * 1000:>10.1f} | "
+              f"{variacao:>+8.0%}{' <-' if regrediu else ''}")
+    print(f"{len(regressoes)} regressão(ões) acima de {tolerancia:.0%}")
+    return regressoes
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO)
+    parser.add_argument('--repeticoes', type=int, default=REPETICOES_PADRAO)
+    parser.add_argument('--saida', help=f'arquivo JSON de resultado (padrão: {DIRETORIO_RESULTADOS}/<data>-<commit>.json)')
+    parser.add_argument('--diretorio-relatorios', help='reaproveita (ou grava) os relatórios sintéticos neste diretório')
+    parser.add_argument('--sem-painel', action='store_true', help='não mede o caminho completo dos callbacks do painel')
+    parser.add_argument('--comparar', nargs=2, metavar=('BASE', 'NOVO'), help='compara dois resultados em vez de medir')
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_REGRESSAO_PADRAO)
+    args = parser.parse_args()
+    if args.comparar:
+        sys.exit(1 if comparar(*args.comparar, tolerancia=args.tolerancia) else 0)
+    executar(args.tamanhos, args.repeticoes, args.saida, args.diretorio_relatorios, not args.sem_painel)
@@ -0,0 +1,120 @@
+# benchmarks/bench_xlsx.py
+"""
+Compara a leitura do relatório em planilha (.xlsx) por carregar_produtos_planilha com
+pd.read_excel seguido das mesmas etapas de hierarquia e limpeza.
+
+As planilhas são geradas a partir dos relatórios sintéticos de benchmarks.gerador_relatorio,
+como o ERP as exporta: mesma disposição de linhas, textos na tabela de textos compartilhados,
+códigos e valores gravados como números e campos vazios como células vazias. Para cada
+tamanho são medidos o tempo e o pico de memória alocada (tracemalloc) das duas leituras, e
+os dois resultados são comparados.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_xlsx
+    python -m benchmarks.bench_xlsx --tamanhos 10000 100000 --repeticoes 1
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+from openpyxl import Workbook
+
+from benchmarks.gerador_relatorio import ENCODING_ERP, gerar_relatorio_sintetico
+from modules.data_loader import (
+    _converter_decimal_br, _separar_produtos_com_hierarquia, carregar_produtos_planilha, ler_cabecalho_relatorio,
+    _normalizar_nome_coluna
+)
+
+TAMANHOS_PADRAO = [10_000, 100_000]
+REPETICOES_PADRAO = 3
+# Campos de texto do relatório; os demais (a partir de "Compra") são gravados como números
+CAMPOS_TEXTO = 3
+NOMES_COLUNAS_LEITURA = ['Código', 'Un', 'Produto_Original', 'VendaMensal_Original', 'Estoque_Original', 'CustoEstoque_Original']
+
+def _valor_planilha(indice, campo):
+    if not campo:
+        return None
+    if indice == 0:
+        return int(campo) if campo.isdigit() else campo
+    if indice < CAMPOS_TEXTO:
+        return campo
+    numero = _converter_decimal_br(campo)
+    return campo if pd.isna(numero) else numero
+
+def gravar_planilha_de_csv(caminho_csv, caminho_xlsx):
+    """Grava o relatório CSV como a planilha exportada pelo ERP (cabeçalho como texto, produtos e totais com números)."""
+    # Fora do modo write-only o openpyxl grava os textos compartilhados, como o Excel
+    planilha = Workbook()
+    aba = planilha.active
+    aba.title = "GLOBAL"
+    with open(caminho_csv, 'r', encoding=ENCODING_ERP, newline='') as arquivo:
+        leitor = csv.reader(arquivo, delimiter=';')
+        for numero_linha, campos in enumerate(leitor):
+            if numero_linha < 4:
+                aba.append([campo or None for campo in campos])
+            else:
+                aba.append([_valor_planilha(indice, campo) for indice, campo in enumerate(campos)])
+    planilha.save(caminho_xlsx)
+
+def carregar_com_read_excel(caminho_xlsx):
+    """Mesmo resultado de carregar_produtos_planilha lendo a aba inteira com pd.read_excel."""
+    posicoes = ler_cabecalho_relatorio(caminho_xlsx)['posicoes']
+    usecols = [posicoes[_normalizar_nome_coluna(nome)] for nome in ('Código', 'Un', 'Produto', 'Venda', 'Estoque', 'Custo Estoque')]
+    df_full = pd.read_excel(caminho_xlsx, sheet_name=0, header=None, skiprows=4, usecols=usecols, dtype=object)
+    df_full.columns = NOMES_COLUNAS_LEITURA
+    for coluna in ('Código', 'Un', 'Produto_Original'):
+        df_full[coluna] = df_full[coluna].map(str, na_action='ignore')
+    for coluna in NOMES_COLUNAS_LEITURA[3:]:
+        df_full[coluna] = pd.to_numeric(df_full[coluna], errors='coerce')
+    return _separar_produtos_com_hierarquia(df_full)
+
+def _cronometrar(funcao, repeticoes):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+def _pico_memoria(funcao):
+    tracemalloc.start()
+    try:
+        funcao()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def _resultados_iguais(df_a, df_b):
+    df_a, df_b = df_a.reset_index(drop=True), df_b.reset_index(drop=True)
+    return df_a.columns.tolist() == df_b.columns.tolist() and df_a.equals(df_b)
+
+def executar(tamanhos, repeticoes):
+    print(f"{'Produtos':>9} | {'planilha (MB)':>13} | {'expat (s)':>9} | {'read_excel (s)':>14} | "
+          f"{'ganho':>6} | {'pico expat (MB)':>15} | {'pico read_excel (MB)':>20} | iguais")
+    for tamanho in tamanhos:
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho_csv = os.path.join(diretorio, 'relatorio.csv')
+            caminho_xlsx = os.path.join(diretorio, 'relatorio.xlsx')
+            gerar_relatorio_sintetico(caminho_csv, tamanho)
+            gravar_planilha_de_csv(caminho_csv, caminho_xlsx)
+
+            tempo_planilha, df_planilha = _cronometrar(lambda: carregar_produtos_planilha(caminho_xlsx), repeticoes)
+            tempo_read_excel, df_read_excel = _cronometrar(lambda: carregar_com_read_excel(caminho_xlsx), repeticoes)
+            pico_planilha = _pico_memoria(lambda: carregar_produtos_planilha(caminho_xlsx))
+            pico_read_excel = _pico_memoria(lambda: carregar_com_read_excel(caminho_xlsx))
+
+            print(f"{tamanho:>9,} | {os.path.getsize(caminho_xlsx) / 2**20:>13.1f} | {tempo_planilha:>9.2f} | "
+                  f"{tempo_read_excel:>14.2f} | {tempo_read_excel / tempo_planilha:>5.1f}x | "
+                  f"{pico_planilha / 2**20:>15.1f} | {pico_read_excel / 2**20:>20.1f} | "
+                  f"{'sim' if _resultados_iguais(df_planilha, df_read_excel) else 'NÃO'}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO)
+    parser.add_argument('--repeticoes', type=int, default=REPETICOES_PADRAO)
+    args = parser.parse_args()
+    executar(args.tamanhos, args.repeticoes)
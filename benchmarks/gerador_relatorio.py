@@ -0,0 +1,185 @@
+# benchmarks/gerador_relatorio.py
+"""
+Gera relatórios sintéticos no layout exato do "NECESSIDADE ESTOQUE ONLINE" do ERP:
+4 linhas de cabeçalho, 39 campos separados por ';' em todas as linhas, decimais no formato
+brasileiro ("1.324,98", vazio para zero/ausente), linhas "* Total Categoria :" depois dos
+produtos de cada categoria, "* Total GRUPO :" depois de cada grupo e "TOTAL GERAL" no fim.
+
+O arquivo é gravado em cp850, como o ERP exporta (os carregadores leem como latin-1 e
+reconhecem o cabeçalho nas duas codificações). A geração é feita em lotes de grupos, então a
+memória usada não cresce com o número de produtos (testado até 5 milhões).
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.gerador_relatorio /tmp/relatorio_1m.csv 1000000
+    python -m benchmarks.gerador_relatorio /tmp/relatorio.csv 50000 --transito
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+CAMPOS_POR_LINHA = 39
+COLUNAS_LAYOUT_PADRAO = ['Código', 'Un', 'Produto', 'Compra', 'Venda', 'Média', 'Venda Dia', 'Estoque', 'Dias Estoque', 'Custo Estoque']
+# Layout mais novo (16-05.CSV): "Qtde Transito" depois do Estoque e Custo Estoque sem separador de milhar
+COLUNAS_LAYOUT_TRANSITO = ['Código', 'Un', 'Produto', 'Compra', 'Venda', 'Média', 'Venda Dia', 'Estoque', 'Qtde Transito', 'Dias Estoque', 'Custo Estoque']
+COLUNAS_VALORES = ['Compra', 'Venda', 'Média', 'Venda Dia', 'Estoque', 'Qtde Transito', 'Dias Estoque', 'Custo Estoque']
+ENCODING_ERP = 'cp850'
+DIAS_MEDIA_PADRAO = 27
+DATA_ESTOQUE_PADRAO = pd.Timestamp('2025-05-27')
+# O catálogo cresce primeiro em categorias e depois em produtos por categoria, como no ERP
+# (dezenas de grupos, milhares de categorias no máximo)
+PRODUTOS_POR_CATEGORIA_MINIMO = 25
+CATEGORIAS_POR_GRUPO = 8
+MAX_CATEGORIAS = 4_000
+MAX_GRUPOS = 150
+# Os produtos são sorteados e formatados em lotes de grupos inteiros com pelo menos este tamanho
+PRODUTOS_POR_LOTE = 100_000
+UNIDADES = np.array(['CX', 'UN', 'DZ', 'LT', 'SX', 'PC', 'FD'])
+MARCAS = np.array(['SKOL', 'BRAHMA', 'ANTARCTICA', 'BUDWEISER', 'HEINEKEN', 'ORIGINAL', 'COCA COLA', 'GUARANA',
+                   'FANTA', 'SPRITE', 'RED BULL', 'JAMEL', 'DREHER', 'AGUA MINERAL', 'GLP'])
+EMBALAGENS = np.array(['LATA 350 ML', 'LN 330 ML', 'PET 600 ML', 'PET 2L', 'GARRAFA 600 ML', 'LT 269 ML', 'P13', '1000 ML'])
+
+def dimensoes_catalogo(num_produtos):
+    """(número de grupos, número de categorias) usados para `num_produtos` produtos."""
+    num_categorias = int(np.clip(num_produtos // PRODUTOS_POR_CATEGORIA_MINIMO, 1, MAX_CATEGORIAS))
+    num_grupos = int(np.clip(num_categorias // CATEGORIAS_POR_GRUPO, 1, MAX_GRUPOS))
+    return num_grupos, num_categorias
+
+def _linha(campos):
+    return ';'.join(campos + [''] * (CAMPOS_POR_LINHA - len(campos)))
+
+def _formatar_decimal_br(valores, separar_milhar=True):
+    """Formata floats como "1.324,98" (vetorizado); NaN e zero viram campo vazio, como no ERP."""
+    valores = np.asarray(valores, dtype='float64')
+    vazio = np.isnan(valores) | (np.round(valores, 2) == 0)
+    centavos = np.round(np.nan_to_num(valores) * 100).astype('int64')
+    inteiro, fracao = np.divmod(np.abs(centavos), 100)
+    texto_inteiro = pd.Series(inteiro).astype(str)
+    if separar_milhar:
+        com_milhar = inteiro >= 1000
+        if com_milhar.any():
+            texto_inteiro[com_milhar] = pd.Series(inteiro[com_milhar]).map('{:,}'.format).str.replace(',', '.', regex=False).to_numpy()
+    texto = pd.Series(np.where(centavos < 0, '-', '')) + texto_inteiro + ',' + pd.Series(fracao).astype(str).str.zfill(2)
+    return texto.where(~vazio, '').to_numpy(dtype=object)
+
+def _valores_produtos(rng, num_produtos, dias_media):
+    """Valores numéricos sorteados para os produtos de um grupo (NaN = campo vazio)."""
+    venda = np.round(rng.gamma(0.6, 40, num_produtos), 0)
+    venda[rng.random(num_produtos) < 0.3] = np.nan
+    media = np.round(venda / dias_media, 2)
+    estoque = np.round(rng.normal(120, 200, num_produtos), 2)
+    estoque[rng.random(num_produtos) < 0.02] = np.nan
+    compra = np.where(rng.random(num_produtos) < 0.6, np.nan, rng.integers(1, 500, num_produtos).astype('float64'))
+    venda_dia = np.where(rng.random(num_produtos) < 0.7, np.nan, rng.integers(1, 20, num_produtos).astype('float64'))
+    transito = np.where(rng.random(num_produtos) < 0.9, np.nan, rng.integers(1, 100, num_produtos).astype('float64'))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dias_estoque = np.where((media > 0) & (estoque > 0), np.round(estoque / media, 2), np.nan)
+    custo = np.where(estoque > 0, np.round(estoque * rng.uniform(2, 200, num_produtos), 2), np.nan)
+    return {'Compra': compra, 'Venda': venda, 'Média': media, 'Venda Dia': venda_dia, 'Estoque': estoque,
+            'Qtde Transito': transito, 'Dias Estoque': dias_estoque, 'Custo Estoque': custo}
+
+def _totais(valores, inicios):
+    """Somas por trecho (categoria ou grupo) no formato das linhas de total do ERP."""
+    totais = {coluna: np.add.reduceat(np.nan_to_num(valores[coluna]), inicios) for coluna in COLUNAS_VALORES}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        totais['Dias Estoque'] = np.where(totais['Média'] > 0, np.round(totais['Estoque'] / totais['Média'], 2), np.nan)
+    return totais
+
+def _campos_valores(valores_formatados, colunas_layout, indice):
+    return [valores_formatados[coluna][indice] for coluna in colunas_layout[3:]]
+
+def _formatar_valores(valores, colunas_layout, com_transito):
+    return {coluna: _formatar_decimal_br(valores[coluna], separar_milhar=not (com_transito and coluna == 'Custo Estoque'))
+            for coluna in colunas_layout[3:]}
+
+def _lotes_grupos(produtos_por_categoria, categorias_por_grupo):
+    """Faixas (range) de grupos consecutivos com pelo menos PRODUTOS_POR_LOTE produtos (o último pode ter menos)."""
+    produtos_por_grupo = np.add.reduceat(produtos_por_categoria, np.concatenate(([0], np.cumsum(categorias_por_grupo)[:-1])))
+    inicio = acumulado = 0
+    for indice_grupo, quantidade in enumerate(produtos_por_grupo):
+        acumulado += quantidade
+        if acumulado >= PRODUTOS_POR_LOTE:
+            yield range(inicio, indice_grupo + 1)
+            inicio, acumulado = indice_grupo + 1, 0
+    if inicio < len(produtos_por_grupo):
+        yield range(inicio, len(produtos_por_grupo))
+
+def gerar_relatorio_sintetico(caminho, num_produtos, semente=42, com_transito=False,
+                              data_estoque=DATA_ESTOQUE_PADRAO, dias_media=DIAS_MEDIA_PADRAO):
+    """
+    Grava em `caminho` um relatório com `num_produtos` produtos. Com `com_transito`, usa o
+    layout com a coluna "Qtde Transito". Retorna (número de grupos, número de categorias).
+    """
+    rng = np.random.default_rng(semente)
+    colunas_layout = COLUNAS_LAYOUT_TRANSITO if com_transito else COLUNAS_LAYOUT_PADRAO
+    num_grupos, num_categorias = dimensoes_catalogo(num_produtos)
+    # Produtos distribuídos em blocos contíguos por categoria, e categorias por grupo
+    produtos_por_categoria = np.diff(np.linspace(0, num_produtos, num_categorias + 1).astype('int64'))
+    categorias_por_grupo = np.diff(np.linspace(0, num_categorias, num_grupos + 1).astype('int64'))
+    data_inicial = data_estoque.replace(day=1)
+
+    totais_gerais = {coluna: 0.0 for coluna in COLUNAS_VALORES}
+    with open(caminho, 'w', encoding=ENCODING_ERP, newline='') as arquivo:
+        arquivo.write(_linha([f"NECESSIDADE ESTOQUE ONLINE - VENDA DE {data_inicial:%d/%m/%y}  A  {data_estoque:%d/%m/%y}   Estoque:'{data_estoque:%d/%m/%y}"]) + '\n')
+        arquivo.write(_linha([]) + '\n')
+        arquivo.write(_linha(['Dias Média :', str(dias_media), 'Un. Venda', 'Período']) + '\n')
+        arquivo.write(_linha(colunas_layout) + '\n')
+
+        proximo_codigo = 1
+        for grupos_lote in _lotes_grupos(produtos_por_categoria, categorias_por_grupo):
+            # Categorias e produtos do lote são contíguos: os grupos vêm em ordem, e as categorias de cada grupo também
+            primeira_categoria = int(categorias_por_grupo[:grupos_lote.start].sum())
+            categorias_grupos = categorias_por_grupo[grupos_lote]
+            categorias = np.arange(primeira_categoria, primeira_categoria + int(categorias_grupos.sum()))
+            quantidades = produtos_por_categoria[categorias]
+            num_produtos_lote = int(quantidades.sum())
+
+            codigos = pd.Series(np.arange(proximo_codigo, proximo_codigo + num_produtos_lote)).astype(str)
+            proximo_codigo += num_produtos_lote
+            unidades = UNIDADES[rng.integers(0, len(UNIDADES), num_produtos_lote)]
+            produtos = (pd.Series(MARCAS[rng.integers(0, len(MARCAS), num_produtos_lote)]) + ' '
+                        + pd.Series(EMBALAGENS[rng.integers(0, len(EMBALAGENS), num_produtos_lote)]) + ' ' + codigos)
+            valores = _valores_produtos(rng, num_produtos_lote, dias_media)
+            formatados = _formatar_valores(valores, colunas_layout, com_transito)
+            colunas_produto = [codigos.to_numpy(dtype=object), unidades, produtos.to_numpy(dtype=object)] + [formatados[c] for c in colunas_layout[3:]]
+            preenchimento = ';' * (CAMPOS_POR_LINHA - len(colunas_layout))
+            linhas_produtos = [';'.join(campos) + preenchimento for campos in zip(*colunas_produto)]
+
+            inicios_categorias = np.concatenate(([0], np.cumsum(quantidades)[:-1]))
+            inicios_grupos = inicios_categorias[np.concatenate(([0], np.cumsum(categorias_grupos)[:-1]))]
+            totais_categorias = _formatar_valores(_totais(valores, inicios_categorias), colunas_layout, com_transito)
+            totais_grupos = _totais(valores, inicios_grupos)
+            for coluna in COLUNAS_VALORES:
+                if coluna != 'Dias Estoque':
+                    totais_gerais[coluna] += totais_grupos[coluna].sum()
+            totais_grupos = _formatar_valores(totais_grupos, colunas_layout, com_transito)
+
+            linhas = []
+            posicao_categoria = 0
+            for posicao_grupo, indice_grupo in enumerate(grupos_lote):
+                for _ in range(categorias_grupos[posicao_grupo]):
+                    inicio = inicios_categorias[posicao_categoria]
+                    linhas.extend(linhas_produtos[inicio:inicio + quantidades[posicao_categoria]])
+                    categoria = categorias[posicao_categoria]
+                    linhas.append(_linha(['', '', f"* Total Categoria :{categoria % 1000:03d} CATEGORIA {categoria:05d}"]
+                                         + _campos_valores(totais_categorias, colunas_layout, posicao_categoria)))
+                    posicao_categoria += 1
+                linhas.append(_linha(['', '', f"* Total GRUPO :{indice_grupo:03d} GRUPO {indice_grupo:03d}"]
+                                     + _campos_valores(totais_grupos, colunas_layout, posicao_grupo)))
+            arquivo.write('\n'.join(linhas) + '\n')
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            totais_gerais['Dias Estoque'] = totais_gerais['Estoque'] / totais_gerais['Média'] if totais_gerais['Média'] > 0 else np.nan
+        totais_gerais = _formatar_valores({coluna: np.array([valor]) for coluna, valor in totais_gerais.items()}, colunas_layout, com_transito)
+        arquivo.write(_linha(['', '', 'TOTAL GERAL'] + _campos_valores(totais_gerais, colunas_layout, 0)) + '\n')
+    return num_grupos, num_categorias
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('caminho')
+    parser.add_argument('produtos', type=int)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--transito', action='store_true', help='layout com a coluna "Qtde Transito"')
+    args = parser.parse_args()
+    grupos, categorias = gerar_relatorio_sintetico(args.caminho, args.produtos, args.semente, args.transito)
+    print(f"{args.produtos:,} produtos em {categorias:,} categorias e {grupos:,} grupos gravados em {args.caminho}")
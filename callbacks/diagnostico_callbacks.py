@@ -0,0 +1,131 @@
+import time
+import dash
+from dash import Input, Output, html, no_update
+import dash_bootstrap_components as dbc
+import flask
+from app_instance import app
+
+from modules.config_manager import carregar_configuracoes_instrumentacao
+from modules.instrumentacao import (
+    configurar_instrumentacao, instrumentacao_ativa, obter_registro_metricas, METRICA_DURACAO, METRICA_PAYLOAD, TIPO_REQUISICAO
+)
+
+ROTA_METRICAS = '/metrics'
+ROTA_CALLBACKS_DASH = '/_dash-update-component'
+TIPO_CONTEUDO_PROMETHEUS = 'text/plain; version=0.0.4; charset=utf-8'
+ENDERECOS_LOCAIS = ('127.0.0.1', '::1', 'localhost')
+
+def _formatar_ms(segundos):
+    return "-" if segundos is None else f"{segundos * 1000:,.1f}"
+
+def _formatar_kb(quantidade_bytes):
+    return "-" if quantidade_bytes is None else f"{quantidade_bytes / 1024:,.1f}"
+
+def _formatar_mb(quantidade_bytes):
+    return "-" if quantidade_bytes is None else f"{quantidade_bytes / (1024 * 1024):,.2f}"
+
+def _tabela_medicoes(linhas_resumo):
+    cabecalho = html.Thead(html.Tr([html.Th(titulo) for titulo in (
+        "Etapa", "Tipo", "Chamadas", "p50 (ms)", "p95 (ms)", "Máx. (ms)", "Payload p50 (KB)", "Payload máx. (KB)", "Memória p50 (MB)", "Memória máx. (MB)"
+    )]))
+    corpo = html.Tbody([
+        html.Tr([
+            html.Td(html.Code(linha['etapa'])), html.Td(linha['tipo']), html.Td(f"{linha.get('chamadas', 0):,}"),
+            html.Td(_formatar_ms(linha.get('duracao_p50'))), html.Td(_formatar_ms(linha.get('duracao_p95'))),
+            html.Td(_formatar_ms(linha.get('duracao_max'))),
+            html.Td(_formatar_kb(linha.get('payload_p50'))), html.Td(_formatar_kb(linha.get('payload_max'))),
+            html.Td(_formatar_mb(linha.get('memoria_p50'))), html.Td(_formatar_mb(linha.get('memoria_max'))),
+        ]) for linha in linhas_resumo
+    ])
+    return dbc.Table([cabecalho, corpo], striped=True, bordered=False, hover=True, size="sm", responsive=True, className="small")
+
+def _registrar_medicao_requisicoes(servidor):
+    """Mede, em cada chamada de callback, o tempo total da requisição e o tamanho da resposta."""
+    registro = obter_registro_metricas()
+
+    @servidor.before_request
+    def iniciar_medicao_requisicao():
+        if flask.request.path == ROTA_CALLBACKS_DASH and instrumentacao_ativa():
+            flask.g.inicio_requisicao = time.perf_counter()
+
+    @servidor.after_request
+    def finalizar_medicao_requisicao(resposta):
+        inicio = flask.g.pop('inicio_requisicao', None)
+        if inicio is None or flask.g.get('ignorar_metricas') or resposta.direct_passthrough:
+            return resposta
+        # Callbacks instrumentados anotam o próprio nome; os demais aparecem pela saída que atualizam
+        etapa = flask.g.get('etapa_callback')
+        if etapa is None:
+            corpo = flask.request.get_json(silent=True) or {}
+            etapa = corpo.get('output', flask.request.path)
+        registro.observar(METRICA_DURACAO, etapa, TIPO_REQUISICAO, time.perf_counter() - inicio)
+        registro.observar(METRICA_PAYLOAD, etapa, TIPO_REQUISICAO, resposta.calculate_content_length() or 0)
+        return resposta
+
+def _requisicao_permitida(apenas_local):
+    """Com `apenas_local` (metricas_apenas_local), só requisições feitas na própria máquina."""
+    return not apenas_local or flask.request.remote_addr in ENDERECOS_LOCAIS
+
+def _registrar_rota_metricas(servidor, apenas_local):
+    registro = obter_registro_metricas()
+
+    def exibir_metricas():
+        if not _requisicao_permitida(apenas_local):
+            flask.abort(403)
+        return flask.Response(registro.texto_prometheus(), content_type=TIPO_CONTEUDO_PROMETHEUS)
+
+    servidor.add_url_rule(ROTA_METRICAS, 'metricas_prometheus', exibir_metricas)
+
+def registrar_callbacks_diagnostico():
+    config_instrumentacao = carregar_configuracoes_instrumentacao()
+    configurar_instrumentacao(config_instrumentacao["instrumentacao_ativa"], config_instrumentacao["instrumentacao_detalhada"])
+    _registrar_medicao_requisicoes(app.server)
+    apenas_local = config_instrumentacao["metricas_apenas_local"]
+    _registrar_rota_metricas(app.server, apenas_local)
+
+    @app.callback(
+        Output('intervalo-atualizacao-diagnostico', 'disabled'),
+        Input('abas-principais', 'active_tab')
+    )
+    def ativar_atualizacao_diagnostico(aba_ativa):
+        flask.g.ignorar_metricas = True
+        return aba_ativa != "tab-diagnostico"
+
+    @app.callback(
+        Output('conteudo-dinamico-aba-diagnostico', 'children'),
+        [Input('abas-principais', 'active_tab'),
+         Input('intervalo-atualizacao-diagnostico', 'n_intervals'),
+         Input('btn-limpar-metricas', 'n_clicks'),
+         Input('switch-instrumentacao-detalhada', 'value')]
+    )
+    def atualizar_conteudo_aba_diagnostico(aba_ativa, ignore_n_intervals, n_clicks_limpar, modo_detalhado):
+        '''
+        Mostra o resumo das medições enquanto a aba está aberta. O botão zera as medições e o
+        interruptor liga o modo detalhado só neste processo (a configuração salva não muda).
+        Como o modo detalhado deixa todas as respostas mais lentas, com metricas_apenas_local os
+        dois controles só valem para quem acessa da própria máquina, como a rota /metrics.
+        '''
+        # As atualizações desta aba não entram nas próprias medições
+        flask.g.ignorar_metricas = True
+        propriedade_disparo = dash.callback_context.triggered[0]['prop_id'] if dash.callback_context.triggered else ''
+        aviso_controles = None
+        if propriedade_disparo in ('btn-limpar-metricas.n_clicks', 'switch-instrumentacao-detalhada.value') \
+                and not _requisicao_permitida(apenas_local):
+            aviso_controles = dbc.Alert("O modo detalhado e a limpeza das medições só podem ser alterados a partir "
+                                        "do próprio servidor (metricas_apenas_local).", color="warning", dismissable=True)
+        elif propriedade_disparo == 'btn-limpar-metricas.n_clicks' and n_clicks_limpar:
+            obter_registro_metricas().limpar()
+        elif propriedade_disparo == 'switch-instrumentacao-detalhada.value':
+            configurar_instrumentacao(carregar_configuracoes_instrumentacao()["instrumentacao_ativa"], modo_detalhado)
+
+        if aba_ativa != "tab-diagnostico":
+            return no_update
+        if not carregar_configuracoes_instrumentacao()["instrumentacao_ativa"]:
+            conteudo = dbc.Alert("A instrumentação está desligada na configuração (instrumentacao_ativa).", color="secondary")
+        else:
+            linhas_resumo = obter_registro_metricas().resumo()
+            if not linhas_resumo:
+                conteudo = dbc.Alert("Nenhuma medição ainda. Use o painel e volte a esta aba.", color="info")
+            else:
+                conteudo = _tabela_medicoes(linhas_resumo)
+        return conteudo if aviso_controles is None else html.Div([aviso_controles, conteudo])
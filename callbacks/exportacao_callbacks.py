@@ -0,0 +1,103 @@
+import json
+import tempfile
+from urllib.parse import urlencode
+from dash import Input, Output
+import flask
+from app_instance import app
+
+from components.tabs.tab_estoque_geral import id_link_exportacao_estoque
+from modules.consulta_tabelas import (
+    filtrar_e_ordenar, resolver_origem_tabela,
+    ORIGEM_ESTOQUE, ORIGEM_ESTOQUE_BAIXO, ORIGEM_EM_FALTA, ORIGEM_NIVEL, ORIGEM_SUGESTAO_COMPRA
+)
+from modules.exportacao import (
+    colunas_exportacao, formatos_disponiveis, gerar_csv, gravar_parquet, gravar_xlsx,
+    FORMATO_CSV, FORMATO_PARQUET, TIPOS_CONTEUDO_EXPORTACAO
+)
+from modules.instrumentacao import medir_etapa, medir_trecho, TIPO_CALLBACK
+
+ROTA_EXPORTACAO = '/exportar/<formato>'
+NOMES_ARQUIVOS_EXPORTACAO = {
+    ORIGEM_ESTOQUE: "estoque_filtrado",
+    ORIGEM_ESTOQUE_BAIXO: "estoque_baixo",
+    ORIGEM_EM_FALTA: "produtos_em_falta",
+    ORIGEM_NIVEL: "produtos_por_nivel",
+    ORIGEM_SUGESTAO_COMPRA: "sugestao_compra",
+}
+CHAVES_FILTROS_CONSULTA = ('categoria', 'grupo', 'nome_produto')
+
+def endereco_exportacao(formato, consulta, filter_query=None, sort_by=None):
+    """
+    Endereço (relativo ao app) que baixa a tabela descrita por `consulta` (mesmo formato das
+    tabelas paginadas, ver modules/consulta_tabelas.py) no formato pedido.
+    """
+    parametros = {'consulta': json.dumps(consulta, sort_keys=True, ensure_ascii=False)}
+    if filter_query:
+        parametros['filter_query'] = filter_query
+    if sort_by:
+        parametros['sort_by'] = json.dumps(sort_by)
+    return app.get_relative_path(f"/exportar/{formato}") + "?" + urlencode(parametros)
+
+def _ler_parametros_exportacao():
+    try:
+        consulta = json.loads(flask.request.args.get('consulta') or '{}')
+        sort_by = json.loads(flask.request.args.get('sort_by') or '[]')
+    except ValueError:
+        flask.abort(400)
+    if not isinstance(consulta, dict) or not isinstance(sort_by, list):
+        flask.abort(400)
+    return consulta, flask.request.args.get('filter_query'), sort_by
+
+def _registrar_rota_exportacao(servidor):
+    def exportar_tabela(formato):
+        '''
+        Refaz a tabela no servidor a partir da consulta (dataset efetivo atual, filtros, ordenação)
+        e a envia em blocos: nenhum dado passa pelo navegador antes do download. O CSV é gerado
+        durante a resposta; a planilha e o Parquet são gravados em um arquivo temporário
+        (apagado ao fechar) e enviados em seguida.
+        '''
+        if formato not in formatos_disponiveis():
+            flask.abort(404)
+        consulta, filter_query, sort_by = _ler_parametros_exportacao()
+        df = filtrar_e_ordenar(resolver_origem_tabela(consulta), filter_query, sort_by)
+        colunas = colunas_exportacao(df, consulta.get('colunas'))
+        nome_arquivo = f"{NOMES_ARQUIVOS_EXPORTACAO.get(consulta.get('origem'), 'exportacao')}.{formato}"
+
+        if formato == FORMATO_CSV:
+            resposta = flask.Response(gerar_csv(df, colunas), content_type=TIPOS_CONTEUDO_EXPORTACAO[formato])
+            resposta.headers['Content-Disposition'] = f'attachment; filename="{nome_arquivo}"'
+            return resposta
+
+        arquivo = tempfile.TemporaryFile()
+        try:
+            with medir_trecho(f"exportar_{formato}"):
+                if formato == FORMATO_PARQUET:
+                    gravar_parquet(df, colunas, arquivo)
+                else:
+                    gravar_xlsx(df, colunas, arquivo)
+            arquivo.seek(0)
+        except Exception:
+            arquivo.close()
+            raise
+        return flask.send_file(arquivo, mimetype=TIPOS_CONTEUDO_EXPORTACAO[formato], as_attachment=True,
+                               download_name=nome_arquivo)
+
+    servidor.add_url_rule(ROTA_EXPORTACAO, 'exportar_tabela', exportar_tabela)
+
+def registrar_callbacks_exportacao():
+    _registrar_rota_exportacao(app.server)
+    formatos = formatos_disponiveis()
+
+    @app.callback(
+        [Output(id_link_exportacao_estoque(formato), 'href') for formato in formatos],
+        Input('store-dados-filtrados-para-modais', 'data')
+    )
+    @medir_etapa(TIPO_CALLBACK)
+    def atualizar_links_exportacao_estoque(chave_filtros):
+        '''
+        Aponta os botões de exportação da aba de Estoque Geral para a rota de exportação com
+        os filtros atuais; o download é montado no servidor a partir desses filtros.
+        '''
+        consulta = {'origem': ORIGEM_ESTOQUE}
+        consulta.update({chave: valor for chave, valor in (chave_filtros or {}).items() if chave in CHAVES_FILTROS_CONSULTA and valor})
+        return [endereco_exportacao(formato, consulta) for formato in formatos]
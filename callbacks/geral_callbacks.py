@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import dash
 from dash import Input, Output, no_update, State, html, dcc 
@@ -5,154 +6,285 @@ import dash_bootstrap_components as dbc
 from app_instance import app 
 import io
 
-from components.graphs.graficos_estoque import (
-    criar_grafico_estoque_por_grupo,
-    criar_grafico_top_n_produtos_estoque,
-    criar_grafico_niveis_estoque,
-    criar_figura_vazia,
-    criar_grafico_categorias_com_estoque_baixo,
-    criar_grafico_estoque_produtos_populares,
-    criar_grafico_colunas_estoque_por_grupo,
-)
+from components.layout import id_chave_aba_renderizada
 from components.tables.table1 import criar_tabela_estoque, criar_tabela_produtos_criticos
+from components.tabs.tab_configuracoes import opcoes_exclusao
+from components.tabs.tab_produtos_em_falta import criar_conteudo_dinamico_aba_produtos_em_falta
 from modules.config_manager import (
     carregar_definicoes_niveis_estoque, salvar_definicoes_niveis_estoque,
-    carregar_configuracoes_exclusao, salvar_configuracoes_exclusao
+    carregar_configuracoes_exclusao, salvar_configuracoes_exclusao,
+    carregar_configuracoes_cache_figuras
+)
+from modules.inventory_manager import (
+    identificar_produtos_estoque_baixo, identificar_produtos_em_falta,
+    NIVEL_BAIXO, NIVEL_MEDIO, NIVEL_ALTO
 )
-from modules.inventory_manager import identificar_produtos_estoque_baixo, identificar_produtos_em_falta
+from modules.dataset_efetivo import publicar_dataset_base, reaplicar_exclusoes, obter_dataset_efetivo
+from modules.cache_figuras import CacheFiguras, normalizar_filtro_nome
+from modules.consulta_tabelas import ORIGEM_ESTOQUE_BAIXO, ORIGEM_NIVEL
+from modules.opcoes_produtos import obter_indice_opcoes_produtos, opcoes_codigos, preparar_indice_opcoes_produtos
+from modules.instrumentacao import medir_etapa, TIPO_CALLBACK
+
+TAMANHO_PAGINA_ALERTA = 10
+# Chave do recorte filtrado (filtros interativos + versão dos dados + exclusões), guardada
+# uma única vez no Store e usada como entrada pelos gráficos e modais do painel principal
+CHAVE_FILTROS_PAINEL = Input('store-dados-filtrados-para-modais', 'data')
+ESTADO_CHAVE_FILTROS_PAINEL = State('store-dados-filtrados-para-modais', 'data')
+
+def _graficos():
+    """
+    components.graphs.graficos_estoque, importado no primeiro gráfico montado: o plotly.express
+    e o template dos gráficos não pesam na inicialização do servidor.
+    """
+    from components.graphs import graficos_estoque
+    return graficos_estoque
+
+def _filtros_da_chave(chave_filtros):
+    """(categoria, grupo, nome do produto) guardados na chave do recorte filtrado."""
+    chave_filtros = chave_filtros or {}
+    return chave_filtros.get('categoria'), chave_filtros.get('grupo'), chave_filtros.get('nome_produto')
+
+def registrar_callbacks_gerais(df_global_original=None, origem=None):
+    # Sem DataFrame, os callbacks usam o dataset publicado por quem carregou os dados (ver modules/inicializacao.py)
+    if df_global_original is not None:
+        publicar_dataset_base(df_global_original, origem)
+
+    config_cache_figuras = carregar_configuracoes_cache_figuras()
+    cache_figuras = CacheFiguras(
+        limite_bytes=int(config_cache_figuras["cache_figuras_limite_mb"] * 1024 * 1024),
+        ttl_segundos=config_cache_figuras["cache_figuras_ttl_segundos"]
+    )
 
-def registrar_callbacks_gerais(df_global_original):
+    @medir_etapa()
+    def _limites_niveis():
+        config_niveis = carregar_definicoes_niveis_estoque()
+        return config_niveis.get("limite_estoque_baixo", 10), config_niveis.get("limite_estoque_medio", 100)
+
+    @medir_etapa()
+    def _preparar_painel(categoria_selecionada, grupo_selecionado, nome_produto_filtrado):
+        '''
+        Estado comum aos callbacks do painel principal: dataset efetivo, máscara dos filtros
+        interativos, linhas filtradas (sem cópia) e limites de nível configurados.
+        '''
+        dataset = obter_dataset_efetivo()
+        limite_baixo_atual, limite_medio_atual = _limites_niveis()
+        mascara_filtros = None if dataset.vazio else dataset.mascara_filtros(categoria_selecionada, grupo_selecionado, nome_produto_filtrado)
+        return dataset, mascara_filtros, dataset.aplicar_mascara(mascara_filtros), limite_baixo_atual, limite_medio_atual
+
+    def _saida_com_cache(nome_saida, dataset, filtros, montar_saida, *dependencias):
+        '''
+        Devolve a saída guardada para (saída, versão dos dados, exclusões, filtros, dependências)
+        ou a monta com `montar_saida` e guarda. Sem dados carregados, não usa o cache.
+        '''
+        if dataset.vazio:
+            return montar_saida()
+        categoria_selecionada, grupo_selecionado, nome_produto_filtrado = filtros
+        chave_cache = (nome_saida, dataset.versao_dados, dataset.hash_exclusao,
+                       categoria_selecionada, grupo_selecionado, normalizar_filtro_nome(nome_produto_filtrado),
+                       *dependencias)
+        saida_em_cache = cache_figuras.obter(chave_cache)
+        if saida_em_cache is not None:
+            return saida_em_cache
+        return cache_figuras.guardar(chave_cache, montar_saida())
+
+    def _conteudo_aba_sob_demanda(tab_id, aba_ativa, chave_renderizada, dataset, dependencias, montar_conteudo):
+        '''
+        Conteúdo de uma aba montada sob demanda: nada é enviado enquanto a aba está fechada nem
+        quando a página já recebeu o conteúdo da mesma chave (versão dos dados e `dependencias`).
+        Fora isso, o conteúdo vem do cache ou é montado por `montar_conteudo` e guardado.
+        Retorna (conteúdo, chave a guardar no Store da aba).
+        '''
+        if aba_ativa != tab_id or dataset.vazio:
+            return no_update, no_update
+        chave = [dataset.versao_dados, *dependencias]
+        if chave_renderizada == chave:
+            return no_update, no_update
+        chave_cache = (tab_id, *chave)
+        conteudo_em_cache = cache_figuras.obter(chave_cache)
+        if conteudo_em_cache is not None:
+            return conteudo_em_cache, chave
+        return cache_figuras.guardar(chave_cache, montar_conteudo()), chave
 
     @app.callback(
-        [Output('card-total-skus', 'children'),
-         Output('card-qtd-total-estoque', 'children'),
-         Output('card-num-categorias', 'children'),
-         Output('card-num-grupos', 'children'),
-         Output('grafico-colunas-resumo-estoque', 'figure'),
-         #Output('tabela-estoque', 'data'),
-         #Output('tabela-estoque', 'columns'),
-         Output('grafico-estoque-grupo', 'figure'),
-         Output('container-tabela-alerta-estoque-baixo-geral', 'children'), 
-         Output('grafico-top-n-produtos', 'figure'),
-         Output('grafico-niveis-estoque', 'figure'),
-         Output('grafico-estoque-populares', 'figure'),
-         Output('grafico-categorias-estoque-baixo-visao-geral', 'figure')], 
+        Output('store-dados-filtrados-para-modais', 'data'),
         [Input('dropdown-categoria-filtro', 'value'),
          Input('dropdown-grupo-filtro', 'value'),
          Input('input-nome-produto-filtro', 'value'),
-         Input('span-config-atual-limite-baixo', 'children'), 
-         Input('span-config-atual-limite-medio', 'children'),
          Input('span-excluidos-grupos', 'children'),
          Input('span-excluidos-categorias', 'children'),
-         Input('span-excluidos-produtos-codigos', 'children')]
+         Input('span-excluidos-produtos-codigos', 'children'),
+         Input('store-versao-dados', 'data')]
     )
-    def atualizar_dashboard_filtrado(categoria_selecionada, grupo_selecionado, nome_produto_filtrado,
-                                     limite_baixo_str_span, limite_medio_str_span,
-                                     ignore_exc_grp, ignore_exc_cat, ignore_exc_prod):
-
-        fig_vazia_grupo = criar_figura_vazia("Volume de Estoque por Grupo")
-        tabela_alerta_vazia = criar_tabela_produtos_criticos(pd.DataFrame(columns=['Produto', 'Estoque']), 'tabela-alerta-vazia-geral-cb-placeholder', "Produtos com Estoque Baixo", page_size=10, altura_tabela='250px')
-        fig_vazia_top_n = criar_figura_vazia("Top 7 Produtos")
-        fig_vazia_niveis = criar_figura_vazia("Produtos por Nível de Estoque")
-        fig_vazia_populares = criar_figura_vazia("Estoque dos Produtos Populares")
-        fig_vazia_cat_baixo_geral = criar_figura_vazia("Categorias com Estoque Baixo")
-        fig_vazia_colunas_resumo = criar_grafico_colunas_estoque_por_grupo(pd.DataFrame())
-
-
-        if df_global_original is None or df_global_original.empty:
-            colunas_vazias_principais = [{"name": col, "id": col} for col in ['Código', 'Produto', 'Un', 'Estoque', 'Categoria', 'Grupo']]
-            return ("0", "0", "0", "0", fig_vazia_colunas_resumo, [], colunas_vazias_principais,
-                    fig_vazia_grupo, tabela_alerta_vazia,
-                    fig_vazia_top_n, fig_vazia_niveis, fig_vazia_populares,
-                    fig_vazia_cat_baixo_geral)
-
-        config_exclusao = carregar_configuracoes_exclusao()
-        dff = df_global_original.copy()
-        grupos_a_excluir = config_exclusao.get("excluir_grupos", []); categorias_a_excluir = config_exclusao.get("excluir_categorias", []); produtos_codigos_a_excluir = [str(p) for p in config_exclusao.get("excluir_produtos_codigos", [])]
-        if grupos_a_excluir: dff = dff[~dff['Grupo'].isin(grupos_a_excluir)]
-        if categorias_a_excluir: dff = dff[~dff['Categoria'].isin(categorias_a_excluir)]
-        if produtos_codigos_a_excluir: dff = dff[~dff['Código'].astype(str).isin(produtos_codigos_a_excluir)]
-
-        dff_filtrado_interativo = dff.copy()
-        if categoria_selecionada: dff_filtrado_interativo = dff_filtrado_interativo[dff_filtrado_interativo['Categoria'] == categoria_selecionada]
-        if grupo_selecionado: dff_filtrado_interativo = dff_filtrado_interativo[dff_filtrado_interativo['Grupo'] == grupo_selecionado]
-        if nome_produto_filtrado and nome_produto_filtrado.strip() != "": dff_filtrado_interativo = dff_filtrado_interativo[dff_filtrado_interativo['Produto'].str.contains(nome_produto_filtrado, case=False, na=False)]
-
-        config_niveis = carregar_definicoes_niveis_estoque()
-        limite_baixo_atual = config_niveis.get("limite_estoque_baixo", 10)
-        limite_medio_atual = config_niveis.get("limite_estoque_medio", 100)
-
-        df_estoque_realmente_baixo = identificar_produtos_estoque_baixo(dff_filtrado_interativo, limite_baixo_atual)
-        tabela_estoque_baixo_componente = criar_tabela_produtos_criticos(
-            df_estoque_realmente_baixo,
-            id_tabela='tabela-alerta-estoque-baixo-geral-cb',
-            titulo_alerta=f"Alerta: Estoque Baixo (≤ {limite_baixo_atual:g})",
-            page_size=len(df_estoque_realmente_baixo) if not df_estoque_realmente_baixo.empty else 1,
-            altura_tabela='320px'
+    @medir_etapa(TIPO_CALLBACK)
+    def atualizar_chave_filtros(categoria_selecionada, grupo_selecionado, nome_produto_filtrado,
+                                ignore_exc_grp, ignore_exc_cat, ignore_exc_prod, ignore_versao_dados):
+        '''
+        Guarda a identificação do recorte filtrado (não os dados): os callbacks que dependem
+        só dos filtros escutam este Store, e os que dependem dos limites escutam também os spans
+        de configuração. Assim, mudar um limite redesenha apenas o que usa aquele limite.
+        '''
+        dataset = obter_dataset_efetivo()
+        return {
+            'categoria': categoria_selecionada,
+            'grupo': grupo_selecionado,
+            'nome_produto': nome_produto_filtrado,
+            'versao_dados': dataset.versao_dados,
+            'hash_exclusao': dataset.hash_exclusao,
+        }
+
+    # O painel é dividido em callbacks independentes: o navegador dispara todos em paralelo
+    # e cada saída aparece assim que fica pronta, começando pelos cards de resumo.
+    @app.callback(
+        [Output('card-total-skus', 'children'),
+         Output('card-qtd-total-estoque', 'children'),
+         Output('card-num-categorias', 'children'),
+         Output('card-num-grupos', 'children')],
+        CHAVE_FILTROS_PAINEL
+    )
+    @medir_etapa(TIPO_CALLBACK)
+    def atualizar_cards_resumo(chave_filtros):
+        dataset = obter_dataset_efetivo()
+        if dataset.vazio:
+            return "0", "0", "0", "0"
+        # Os totais não dependem dos limites; o cubo de qualquer combinação de limites serve
+        resumo = dataset.cubo_agregacao(*_limites_niveis(), *_filtros_da_chave(chave_filtros)).resumo_indicadores()
+        return (
+            f"{resumo['total_skus']:,}",
+            f"{resumo['qtd_total_estoque']:,.0f}",
+            f"{resumo['num_categorias']:,}",
+            f"{resumo['num_grupos']:,}",
         )
 
-        fig_categorias_estoque_baixo_geral = criar_grafico_categorias_com_estoque_baixo(df_estoque_realmente_baixo)
+    @app.callback(
+        Output('grafico-colunas-resumo-estoque', 'figure'),
+        CHAVE_FILTROS_PAINEL
+    )
+    @medir_etapa(TIPO_CALLBACK)
+    def atualizar_grafico_treemap_grupos(chave_filtros):
+        filtros = _filtros_da_chave(chave_filtros)
+        dataset, _, dff_filtrado_interativo, _, _ = _preparar_painel(*filtros)
+        return _saida_com_cache('treemap-grupos', dataset, filtros,
+                                lambda: _graficos().criar_grafico_colunas_estoque_por_grupo(dff_filtrado_interativo))
 
-        df_agrupado_para_grafico_principal = pd.DataFrame() 
-        if not dff_filtrado_interativo.empty:
-            df_grupo_sum = dff_filtrado_interativo.copy()
-            df_grupo_sum['Estoque'] = pd.to_numeric(df_grupo_sum['Estoque'], errors='coerce').fillna(0)
-            df_agrupado_para_grafico_principal = df_grupo_sum.groupby('Grupo', as_index=False)['Estoque'].sum()
+    @app.callback(
+        Output('grafico-estoque-grupo', 'figure'),
+        CHAVE_FILTROS_PAINEL
+    )
+    @medir_etapa(TIPO_CALLBACK)
+    def atualizar_grafico_estoque_grupo(chave_filtros):
+        filtros = _filtros_da_chave(chave_filtros)
+        dataset = obter_dataset_efetivo()
+
+        def montar_grafico():
+            cubo_filtrado = None if dataset.vazio else dataset.cubo_agregacao(*_limites_niveis(), *filtros)
+            if cubo_filtrado is None or cubo_filtrado.vazio:
+                return _graficos().criar_figura_vazia("Volume de Estoque por Grupo")
+            df_agrupado_para_grafico_principal = cubo_filtrado.por_grupo('estoque').rename('Estoque').reset_index()
             df_agrupado_para_grafico_principal = df_agrupado_para_grafico_principal[df_agrupado_para_grafico_principal['Estoque'] > 0]
-        fig_estoque_grupo = criar_grafico_estoque_por_grupo(df_agrupado_para_grafico_principal) 
-        fig_colunas_resumo = criar_grafico_colunas_estoque_por_grupo(dff_filtrado_interativo)
+            return _graficos().criar_grafico_estoque_por_grupo(df_agrupado_para_grafico_principal)
+        return _saida_com_cache('estoque-grupo', dataset, filtros, montar_grafico)
 
+    @app.callback(
+        [Output('container-tabela-alerta-estoque-baixo-geral', 'children'),
+         Output('grafico-categorias-estoque-baixo-visao-geral', 'figure')],
+        [CHAVE_FILTROS_PAINEL,
+         Input('span-config-atual-limite-baixo', 'children')]
+    )
+    @medir_etapa(TIPO_CALLBACK)
+    def atualizar_alerta_estoque_baixo(chave_filtros, ignore_limite_baixo):
+        filtros = _filtros_da_chave(chave_filtros)
+        categoria_selecionada, grupo_selecionado, nome_produto_filtrado = filtros
+        dataset, mascara_filtros, dff_filtrado_interativo, limite_baixo_atual, limite_medio_atual = _preparar_painel(*filtros)
+
+        def montar_alerta():
+            if dataset.vazio:
+                tabela_alerta_vazia = criar_tabela_produtos_criticos(pd.DataFrame(columns=['Produto', 'Estoque']), 'tabela-alerta-vazia-geral-cb-placeholder', "Produtos com Estoque Baixo", page_size=10, altura_tabela='250px')
+                return tabela_alerta_vazia, _graficos().criar_figura_vazia("Categorias com Estoque Baixo")
+
+            # A classificação por nível é compartilhada com o gráfico de níveis (mesmos filtros e limites)
+            classificacao_niveis = dataset.classificar_niveis(limite_baixo_atual, limite_medio_atual, mascara_filtros)
+            # A tabela é paginada no servidor: basta a primeira página e o total. Selecionar todas as
+            # linhas baixas copiaria as colunas de texto e, nos workers do gunicorn, as páginas de
+            # memória que eles dividem com o processo mestre (ver gunicorn.conf.py)
+            posicoes_baixos = np.flatnonzero(classificacao_niveis.mascara(NIVEL_BAIXO))
+            tabela_estoque_baixo_componente = criar_tabela_produtos_criticos(
+                dff_filtrado_interativo.iloc[posicoes_baixos[:TAMANHO_PAGINA_ALERTA]],
+                total_linhas=len(posicoes_baixos),
+                id_tabela='tabela-alerta-estoque-baixo-geral-cb',
+                titulo_alerta=f"Alerta: Estoque Baixo (≤ {limite_baixo_atual:g})",
+                page_size=TAMANHO_PAGINA_ALERTA,
+                altura_tabela='320px',
+                consulta={'origem': ORIGEM_ESTOQUE_BAIXO, 'categoria': categoria_selecionada, 'grupo': grupo_selecionado,
+                          'nome_produto': nome_produto_filtrado, 'limite_baixo': limite_baixo_atual, 'limite_medio': limite_medio_atual}
+            )
+            if dff_filtrado_interativo.empty:
+                return tabela_estoque_baixo_componente, _graficos().criar_figura_vazia("Categorias com Estoque Baixo")
+            contagem_baixos_por_categoria = dataset.cubo_agregacao(limite_baixo_atual, limite_medio_atual, *filtros).recortar(nivel=NIVEL_BAIXO).por_categoria()
+            return tabela_estoque_baixo_componente, _graficos().criar_grafico_categorias_com_estoque_baixo(
+                None, contagem_por_categoria=contagem_baixos_por_categoria)
+        # O limite médio só entra na classificação compartilhada, não no conteúdo do alerta
+        return _saida_com_cache('alerta-estoque-baixo', dataset, filtros, montar_alerta, limite_baixo_atual)
 
-        if not dff_filtrado_interativo.empty:
-            total_skus_filtrado = dff_filtrado_interativo['Código'].nunique()
-            qtd_total_estoque_filtrado = pd.to_numeric(dff_filtrado_interativo['Estoque'], errors='coerce').fillna(0).sum()
-            num_categorias_filtradas = dff_filtrado_interativo['Categoria'].nunique()
-            num_grupos_filtrados = dff_filtrado_interativo['Grupo'].nunique()
-            dados_tabela_filtrada = dff_filtrado_interativo.to_dict('records')
+    @app.callback(
+        Output('grafico-top-n-produtos', 'figure'),
+        CHAVE_FILTROS_PAINEL
+    )
+    @medir_etapa(TIPO_CALLBACK)
+    def atualizar_grafico_top_n(chave_filtros):
+        filtros = _filtros_da_chave(chave_filtros)
+        dataset, _, dff_filtrado_interativo, _, _ = _preparar_painel(*filtros)
+
+        def montar_grafico():
+            if dataset.vazio:
+                return _graficos().criar_figura_vazia("Top 7 Produtos")
+            if dff_filtrado_interativo.empty:
+                return _graficos().criar_figura_vazia(f"Top 7 Produtos (Sem dados com filtros atuais)")
+            return _graficos().criar_grafico_top_n_produtos_estoque(dff_filtrado_interativo, n=7)
+        return _saida_com_cache('top-n', dataset, filtros, montar_grafico)
 
-            fig_top_n = criar_grafico_top_n_produtos_estoque(dff_filtrado_interativo, n=7)
-            fig_niveis = criar_grafico_niveis_estoque(dff_filtrado_interativo, limite_baixo_atual, limite_medio_atual)
-            fig_populares = criar_grafico_estoque_produtos_populares(dff_filtrado_interativo, n=7)
-        else:
-            total_skus_filtrado, qtd_total_estoque_filtrado, num_categorias_filtradas, num_grupos_filtrados = 0,0,0,0
-            dados_tabela_filtrada = []
-            if df_agrupado_para_grafico_principal.empty: fig_estoque_grupo = fig_vazia_grupo
-            fig_top_n = criar_figura_vazia(f"Top 7 Produtos (Sem dados com filtros atuais)")
-            fig_niveis = criar_figura_vazia("Níveis de Estoque (Sem dados com filtros atuais)")
-            fig_populares = criar_figura_vazia("Estoque dos Produtos Populares (Sem dados com filtros atuais)")
-            if df_estoque_realmente_baixo.empty: fig_categorias_estoque_baixo_geral = fig_vazia_cat_baixo_geral
-            fig_colunas_resumo = fig_vazia_colunas_resumo
-
-
-        colunas_desejadas = ['Código', 'Produto', 'Un', 'Estoque', 'Categoria', 'Grupo']
-        colunas_base = dff_filtrado_interativo.columns if not dff_filtrado_interativo.empty else df_global_original.columns
-        colunas_existentes_ordenadas = [col for col in colunas_desejadas if col in colunas_base]
-        for col in colunas_base:
-            if col not in colunas_existentes_ordenadas:
-                colunas_existentes_ordenadas.append(col)
-        colunas_para_dash_filtradas = [{"name": i, "id": i} for i in colunas_existentes_ordenadas]
+    @app.callback(
+        Output('grafico-niveis-estoque', 'figure'),
+        [CHAVE_FILTROS_PAINEL,
+         Input('span-config-atual-limite-baixo', 'children'),
+         Input('span-config-atual-limite-medio', 'children')]
+    )
+    @medir_etapa(TIPO_CALLBACK)
+    def atualizar_grafico_niveis(chave_filtros, ignore_limite_baixo, ignore_limite_medio):
+        filtros = _filtros_da_chave(chave_filtros)
+        dataset, mascara_filtros, dff_filtrado_interativo, limite_baixo_atual, limite_medio_atual = _preparar_painel(*filtros)
+
+        def montar_grafico():
+            if dataset.vazio:
+                return _graficos().criar_figura_vazia("Produtos por Nível de Estoque")
+            if dff_filtrado_interativo.empty:
+                return _graficos().criar_figura_vazia("Níveis de Estoque (Sem dados com filtros atuais)")
+            classificacao_niveis = dataset.classificar_niveis(limite_baixo_atual, limite_medio_atual, mascara_filtros)
+            return _graficos().criar_grafico_niveis_estoque(dff_filtrado_interativo, limite_baixo_atual, limite_medio_atual, classificacao=classificacao_niveis)
+        return _saida_com_cache('niveis', dataset, filtros, montar_grafico, limite_baixo_atual, limite_medio_atual)
 
-        return (
-            f"{total_skus_filtrado:,}",
-            f"{qtd_total_estoque_filtrado:,.0f}",
-            f"{num_categorias_filtradas:,}",
-            f"{num_grupos_filtrados:,}",
-            fig_colunas_resumo,
-            #dados_tabela_filtrada,
-            #colunas_para_dash_filtradas,
-            fig_estoque_grupo,
-            tabela_estoque_baixo_componente,
-            fig_top_n,
-            fig_niveis,
-            fig_populares,
-            fig_categorias_estoque_baixo_geral
-        )
+    @app.callback(
+        Output('grafico-estoque-populares', 'figure'),
+        CHAVE_FILTROS_PAINEL
+    )
+    @medir_etapa(TIPO_CALLBACK)
+    def atualizar_grafico_populares(chave_filtros):
+        filtros = _filtros_da_chave(chave_filtros)
+        dataset, _, dff_filtrado_interativo, _, _ = _preparar_painel(*filtros)
+
+        def montar_grafico():
+            if dataset.vazio:
+                return _graficos().criar_figura_vazia("Estoque dos Produtos Populares")
+            if dff_filtrado_interativo.empty:
+                return _graficos().criar_figura_vazia("Estoque dos Produtos Populares (Sem dados com filtros atuais)")
+            return _graficos().criar_grafico_estoque_produtos_populares(dff_filtrado_interativo, n=7)
+        return _saida_com_cache('populares', dataset, filtros, montar_grafico)
 
     @app.callback(
         Output('dropdown-grupo-filtro', 'value', allow_duplicate=True),
         Input('dropdown-categoria-filtro', 'value'),
         prevent_initial_call=True
     )
+    @medir_etapa(TIPO_CALLBACK)
     def resetar_filtro_grupo(categoria_selecionada):
         if categoria_selecionada is not None: return None
         return no_update
@@ -162,6 +294,7 @@ def registrar_callbacks_gerais(df_global_original):
         Input('dropdown-grupo-filtro', 'value'),
         prevent_initial_call=True
     )
+    @medir_etapa(TIPO_CALLBACK)
     def resetar_filtro_categoria(grupo_selecionado):
         if grupo_selecionado is not None: return None
         return no_update
@@ -173,6 +306,7 @@ def registrar_callbacks_gerais(df_global_original):
         Input('btn-resetar-filtros', 'n_clicks'),
         prevent_initial_call=True
     )
+    @medir_etapa(TIPO_CALLBACK)
     def resetar_todos_filtros(n_clicks):
         return None, None, ''
 
@@ -187,6 +321,7 @@ def registrar_callbacks_gerais(df_global_original):
          State('input-limite-config-medio', 'value')],
         prevent_initial_call=True
     )
+    @medir_etapa(TIPO_CALLBACK)
     def salvar_configuracoes_niveis(n_clicks, limite_baixo_input, limite_medio_input):
         if limite_baixo_input is None or limite_medio_input is None:
             mensagem = dbc.Alert("Ambos os limites de níveis devem ser preenchidos.", color="danger", dismissable=True, duration=7000)
@@ -214,6 +349,7 @@ def registrar_callbacks_gerais(df_global_original):
          State('dropdown-excluir-produtos-codigos', 'value')],
         prevent_initial_call=True
     )
+    @medir_etapa(TIPO_CALLBACK)
     def salvar_config_exclusoes(n_clicks_salvar_exc, grupos_sel, categorias_sel, produtos_cod_sel):
         if n_clicks_salvar_exc is None:
             return no_update, no_update, no_update, no_update, no_update, no_update, no_update
@@ -224,6 +360,8 @@ def registrar_callbacks_gerais(df_global_original):
         status_msg_componente = dbc.Alert(msg_retorno, color=cor_alerta, dismissable=True, duration=7000)
         
         config_exc_recarregada = carregar_configuracoes_exclusao()
+        if sucesso:
+            reaplicar_exclusoes(config_exc_recarregada)
         grupos_exc_atuais = config_exc_recarregada.get("excluir_grupos", [])
         cat_exc_atuais = config_exc_recarregada.get("excluir_categorias", [])
         prod_cod_exc_atuais = config_exc_recarregada.get("excluir_produtos_codigos", [])
@@ -239,48 +377,51 @@ def registrar_callbacks_gerais(df_global_original):
         )
 
     @app.callback(
-        Output('conteudo-dinamico-aba-estoque-baixo', 'children'),
+        [Output('conteudo-dinamico-aba-estoque-baixo', 'children'),
+         Output(id_chave_aba_renderizada('tab-estoque-baixo'), 'data')],
         [Input('span-config-atual-limite-baixo', 'children'),
-         Input('abas-principais', 'active_tab')]
+         Input('abas-principais', 'active_tab'),
+         Input('store-versao-dados', 'data')],
+        State(id_chave_aba_renderizada('tab-estoque-baixo'), 'data')
     )
-    def atualizar_conteudo_aba_estoque_baixo(limite_baixo_salvo_str, aba_ativa):
-        if aba_ativa != "tab-estoque-baixo" or df_global_original is None or df_global_original.empty:
-            return "" 
-
+    @medir_etapa(TIPO_CALLBACK)
+    def atualizar_conteudo_aba_estoque_baixo(limite_baixo_salvo_str, aba_ativa, ignore_versao_dados, chave_renderizada):
+        if aba_ativa != "tab-estoque-baixo":
+            return no_update, no_update
+        dataset = obter_dataset_efetivo()
         config_niveis = carregar_definicoes_niveis_estoque()
+        limite_baixo_config = config_niveis.get("limite_estoque_baixo")
+        limite_medio = config_niveis.get("limite_estoque_medio", 100)
+        return _conteudo_aba_sob_demanda(
+            "tab-estoque-baixo", aba_ativa, chave_renderizada, dataset,
+            [dataset.hash_exclusao, limite_baixo_config, limite_medio],
+            lambda: _montar_conteudo_estoque_baixo(dataset, limite_baixo_config, limite_medio)
+        )
+
+    def _montar_conteudo_estoque_baixo(dataset, limite_baixo_config, limite_medio):
         try:
-            limite_baixo = float(config_niveis.get("limite_estoque_baixo")) 
+            limite_baixo = float(limite_baixo_config)
         except (ValueError, TypeError):
             return dbc.Alert("Configuração de limite de estoque baixo inválida.", color="danger")
 
-
-        config_exclusao = carregar_configuracoes_exclusao()
-        grupos_a_excluir = config_exclusao.get("excluir_grupos", [])
-        categorias_a_excluir = config_exclusao.get("excluir_categorias", [])
-        produtos_codigos_a_excluir = [str(p) for p in config_exclusao.get("excluir_produtos_codigos", [])]
-
-        df_para_analise_baixo = df_global_original.copy()
-
-        if grupos_a_excluir:
-            df_para_analise_baixo = df_para_analise_baixo[~df_para_analise_baixo['Grupo'].isin(grupos_a_excluir)]
-        if categorias_a_excluir:
-            df_para_analise_baixo = df_para_analise_baixo[~df_para_analise_baixo['Categoria'].isin(categorias_a_excluir)]
-        if produtos_codigos_a_excluir:
-            df_para_analise_baixo = df_para_analise_baixo[~df_para_analise_baixo['Código'].astype(str).isin(produtos_codigos_a_excluir)]
-
-        df_produtos_baixos = identificar_produtos_estoque_baixo(df_para_analise_baixo, limite_baixo)
+        classificacao_niveis = dataset.classificar_niveis(limite_baixo, limite_medio)
+        df_produtos_baixos = identificar_produtos_estoque_baixo(dataset.df, limite_baixo, classificacao_niveis)
 
         if df_produtos_baixos.empty:
             return dbc.Alert(f"Nenhum produto encontrado com estoque baixo (Estoque ≤ {limite_baixo:g}) após aplicar exclusões e filtros.", color="info", className="mt-3")
 
         grafico = dcc.Graph(
             id='grafico-categorias-estoque-baixo-tab',
-            figure=criar_grafico_categorias_com_estoque_baixo(df_produtos_baixos)
+            figure=_graficos().criar_grafico_categorias_com_estoque_baixo(
+                df_produtos_baixos,
+                contagem_por_categoria=dataset.cubo_agregacao(limite_baixo, limite_medio).recortar(nivel=NIVEL_BAIXO).por_categoria())
         )
         tabela = criar_tabela_estoque(
             df_produtos_baixos, 
             id_tabela='tabela-produtos-estoque-baixo-tab',
-            page_size=10
+            page_size=10,
+            consulta={'origem': ORIGEM_ESTOQUE_BAIXO, 'limite_baixo': limite_baixo,
+                      'limite_medio': limite_medio}
         )
         return html.Div([
             html.P(f"Encontrados {len(df_produtos_baixos)} produto(s) com estoque baixo (Estoque ≤ {limite_baixo:g}).", className="mt-3"),
@@ -288,39 +429,90 @@ def registrar_callbacks_gerais(df_global_original):
             html.Hr(),
             tabela
         ])
-    
+
     @app.callback(
-        Output("download-tabela-geral-excel", "data"),
-        Input("btn-exportar-tabela-geral", "n_clicks"),
-        State("tabela-estoque", "data"),
-        prevent_initial_call=True
+        [Output('conteudo-dinamico-aba-produtos-em-falta', 'children'),
+         Output(id_chave_aba_renderizada('tab-produtos-em-falta'), 'data')],
+        [Input('abas-principais', 'active_tab'),
+         Input('store-versao-dados', 'data')],
+        State(id_chave_aba_renderizada('tab-produtos-em-falta'), 'data')
     )
-    def exportar_tabela_principal_excel(n_clicks, dados_tabela_atual):
-        if n_clicks is None or not dados_tabela_atual:
-            return no_update 
-
-        df_para_exportar = pd.DataFrame(dados_tabela_atual)
-        
-        colunas_export = ['Código', 'Produto', 'Un', 'Estoque', 'Categoria', 'Grupo', 'VendaMensal'] 
-        colunas_presentes_para_export = [col for col in colunas_export if col in df_para_exportar.columns]
-        df_para_exportar = df_para_exportar[colunas_presentes_para_export]
+    @medir_etapa(TIPO_CALLBACK)
+    def atualizar_conteudo_aba_produtos_em_falta(aba_ativa, ignore_versao_dados, chave_renderizada):
+        '''
+        Monta a aba de Produtos em Falta ao ser aberta. A lista usa o DataFrame completo (sem
+        exclusões), então o conteúdo só muda com a versão dos dados.
+        '''
+        dataset = obter_dataset_efetivo()
+        return _conteudo_aba_sob_demanda(
+            "tab-produtos-em-falta", aba_ativa, chave_renderizada, dataset, [],
+            lambda: criar_conteudo_dinamico_aba_produtos_em_falta(dataset.df_base)
+        )
 
-        return dcc.send_data_frame(df_para_exportar.to_excel, "estoque_filtrado.xlsx", sheet_name="Estoque", index=False)
+    @app.callback(
+        [Output('dropdown-excluir-grupos', 'options'),
+         Output('dropdown-excluir-categorias', 'options'),
+         Output('dropdown-excluir-produtos-codigos', 'options', allow_duplicate=True),
+         Output(id_chave_aba_renderizada('tab-configuracoes'), 'data')],
+        [Input('abas-principais', 'active_tab'),
+         Input('store-versao-dados', 'data')],
+        [State(id_chave_aba_renderizada('tab-configuracoes'), 'data'),
+         State('dropdown-excluir-produtos-codigos', 'value')],
+        prevent_initial_call=True
+    )
+    @medir_etapa(TIPO_CALLBACK)
+    def atualizar_opcoes_aba_configuracoes(aba_ativa, ignore_versao_dados, chave_renderizada, codigos_selecionados):
+        '''
+        Preenche as opções dos dropdowns de grupos e categorias quando a aba de Configurações
+        é aberta, dá nome aos produtos já selecionados e começa a preparar o índice da busca
+        de produtos. O restante da aba (níveis e itens
+        excluídos) já vem no layout, pois outros callbacks leem seus valores.
+        '''
+        dataset = obter_dataset_efetivo()
+        opcoes, chave = _conteudo_aba_sob_demanda(
+            "tab-configuracoes", aba_ativa, chave_renderizada, dataset, [],
+            lambda: list(opcoes_exclusao(dataset.df_base))
+        )
+        if chave is no_update:
+            return no_update, no_update, no_update, no_update
+        preparar_indice_opcoes_produtos(dataset)
+        return (*opcoes, opcoes_codigos(dataset.df_base, codigos_selecionados), chave)
 
+    @app.callback(
+        Output('dropdown-excluir-produtos-codigos', 'options'),
+        Input('dropdown-excluir-produtos-codigos', 'search_value'),
+        State('dropdown-excluir-produtos-codigos', 'value'),
+        prevent_initial_call=True
+    )
+    @medir_etapa(TIPO_CALLBACK)
+    def buscar_opcoes_produtos_excluir(texto_busca, codigos_selecionados):
+        '''
+        Busca no servidor os produtos cujo "Produto (Cód: X)" contém o texto digitado e devolve
+        só as primeiras opções encontradas, junto com as dos produtos já selecionados (sem elas
+        o dropdown deixaria de mostrar a seleção).
+        '''
+        dataset = obter_dataset_efetivo()
+        if not texto_busca or dataset.vazio:
+            return no_update
+        indice_opcoes = obter_indice_opcoes_produtos(dataset)
+        opcoes_selecionadas = indice_opcoes.opcoes_codigos(codigos_selecionados)
+        codigos_ja_incluidos = {opcao['value'] for opcao in opcoes_selecionadas}
+        opcoes_encontradas = [opcao for opcao in indice_opcoes.buscar(texto_busca) if opcao['value'] not in codigos_ja_incluidos]
+        return opcoes_selecionadas + opcoes_encontradas
+    
     @app.callback(
         [Output("modal-grafico-donut-popup", "is_open"),
          Output("grafico-donut-modal", "figure")],
         [Input("card-clicavel-grafico-donut", "n_clicks"), 
          Input("btn-fechar-modal-donut", "n_clicks")],
         [State("modal-grafico-donut-popup", "is_open"),
-         State('dropdown-categoria-filtro', 'value'), 
-         State('dropdown-grupo-filtro', 'value'),
-         State('input-nome-produto-filtro', 'value')],
+         ESTADO_CHAVE_FILTROS_PAINEL],
         prevent_initial_call=True
     )
-    def toggle_e_atualizar_modal_grafico_donut(n_clicks_abrir_card, n_clicks_fechar, is_open_atual,
-                                               categoria_sel, grupo_sel, nome_prod_sel):
-        
+    @medir_etapa(TIPO_CALLBACK)
+    def toggle_e_atualizar_modal_grafico_donut(n_clicks_abrir_card, n_clicks_fechar, is_open_atual, chave_filtros):
+        categoria_sel, grupo_sel, nome_prod_sel = _filtros_da_chave(chave_filtros)
+
         ctx = dash.callback_context
         triggered_id = ctx.triggered_id if ctx.triggered_id else None
         
@@ -330,26 +522,12 @@ def registrar_callbacks_gerais(df_global_original):
         if triggered_id == "card-clicavel-grafico-donut":
             abrir_modal_agora = not is_open_atual 
             if abrir_modal_agora:
-                if df_global_original is not None and not df_global_original.empty:
-                    dff = df_global_original.copy()
-                    
-                    config_exclusao = carregar_configuracoes_exclusao()
-                    grupos_a_excluir = config_exclusao.get("excluir_grupos", [])
-                    categorias_a_excluir = config_exclusao.get("excluir_categorias", [])
-                    produtos_codigos_a_excluir = [str(p) for p in config_exclusao.get("excluir_produtos_codigos", [])]
-
-                    if grupos_a_excluir: dff = dff[~dff['Grupo'].isin(grupos_a_excluir)]
-                    if categorias_a_excluir: dff = dff[~dff['Categoria'].isin(categorias_a_excluir)]
-                    if produtos_codigos_a_excluir: dff = dff[~dff['Código'].astype(str).isin(produtos_codigos_a_excluir)]
-                    
-                    if categoria_sel: dff = dff[dff['Categoria'] == categoria_sel]
-                    if grupo_sel: dff = dff[dff['Grupo'] == grupo_sel]
-                    if nome_prod_sel and nome_prod_sel.strip() != "": 
-                        dff = dff[dff['Produto'].str.contains(nome_prod_sel, case=False, na=False)]
-                    
-                    figura_modal = criar_grafico_top_n_produtos_estoque(dff, n=7, height=600) 
+                dataset = obter_dataset_efetivo()
+                if not dataset.vazio:
+                    dff = dataset.filtrar(categoria_sel, grupo_sel, nome_prod_sel)
+                    figura_modal = _graficos().criar_grafico_top_n_produtos_estoque(dff, n=7, height=600) 
                 else:
-                    figura_modal = criar_figura_vazia("Top 7 Produtos (Sem dados)")
+                    figura_modal = _graficos().criar_figura_vazia("Top 7 Produtos (Sem dados)")
                     figura_modal.update_layout(height=600)
             
         elif triggered_id == "btn-fechar-modal-donut":
@@ -363,18 +541,17 @@ def registrar_callbacks_gerais(df_global_original):
         [Input("card-clicavel-grafico-niveis", "n_clicks"),
          Input("btn-fechar-modal-niveis", "n_clicks")],
         [State("modal-grafico-niveis-popup", "is_open"),
-         State('dropdown-categoria-filtro', 'value'),       
-         State('dropdown-grupo-filtro', 'value'),          
-         State('input-nome-produto-filtro', 'value'),     
+         ESTADO_CHAVE_FILTROS_PAINEL,
          State('span-config-atual-limite-baixo', 'children'),
          State('span-config-atual-limite-medio', 'children')],
         prevent_initial_call=True
     )
+    @medir_etapa(TIPO_CALLBACK)
     def toggle_e_atualizar_modal_grafico_niveis(
         n_clicks_abrir_card, n_clicks_fechar, is_open_atual,
-        categoria_sel, grupo_sel, nome_prod_sel, 
-        limite_baixo_str, limite_medio_str      
+        chave_filtros, limite_baixo_str, limite_medio_str
     ):
+        categoria_sel, grupo_sel, nome_prod_sel = _filtros_da_chave(chave_filtros)
         ctx = dash.callback_context
         
         triggered_component_id = None
@@ -388,27 +565,10 @@ def registrar_callbacks_gerais(df_global_original):
         if triggered_component_id == "card-clicavel-grafico-niveis":
             abrir_modal_agora = not is_open_atual
             if abrir_modal_agora: 
-                if df_global_original is not None and not df_global_original.empty:
-                    dff_modal = df_global_original.copy()
-
-                    config_exclusao = carregar_configuracoes_exclusao()
-                    grupos_a_excluir = config_exclusao.get("excluir_grupos", [])
-                    categorias_a_excluir = config_exclusao.get("excluir_categorias", [])
-                    produtos_codigos_a_excluir = [str(p) for p in config_exclusao.get("excluir_produtos_codigos", [])]
-
-                    if grupos_a_excluir:
-                        dff_modal = dff_modal[~dff_modal['Grupo'].isin(grupos_a_excluir)]
-                    if categorias_a_excluir:
-                        dff_modal = dff_modal[~dff_modal['Categoria'].isin(categorias_a_excluir)]
-                    if produtos_codigos_a_excluir:
-                        dff_modal = dff_modal[~dff_modal['Código'].astype(str).isin(produtos_codigos_a_excluir)]
-
-                    if categoria_sel:
-                        dff_modal = dff_modal[dff_modal['Categoria'] == categoria_sel]
-                    if grupo_sel:
-                        dff_modal = dff_modal[dff_modal['Grupo'] == grupo_sel]
-                    if nome_prod_sel and nome_prod_sel.strip() != "":
-                        dff_modal = dff_modal[dff_modal['Produto'].str.contains(nome_prod_sel, case=False, na=False)]
+                dataset = obter_dataset_efetivo()
+                if not dataset.vazio:
+                    mascara_filtros = dataset.mascara_filtros(categoria_sel, grupo_sel, nome_prod_sel)
+                    dff_modal = dataset.aplicar_mascara(mascara_filtros)
                     
                     config_niveis_atuais = carregar_definicoes_niveis_estoque()
                     limite_baixo_config = config_niveis_atuais.get("limite_estoque_baixo", 10)
@@ -425,11 +585,14 @@ def registrar_callbacks_gerais(df_global_original):
                         limite_medio = limite_medio_config
                         
                     if not dff_modal.empty:
-                        figura_modal = criar_grafico_niveis_estoque(dff_modal, limite_baixo, limite_medio, height=500)
+                        figura_modal = _graficos().criar_grafico_niveis_estoque(
+                            dff_modal, limite_baixo, limite_medio, height=500,
+                            classificacao=dataset.classificar_niveis(limite_baixo, limite_medio, mascara_filtros)
+                        )
                     else:
-                        figura_modal = criar_figura_vazia("Produtos por Nível de Estoque (Sem dados com filtros atuais)", height=500)
+                        figura_modal = _graficos().criar_figura_vazia("Produtos por Nível de Estoque (Sem dados com filtros atuais)", height=500)
                 else:
-                    figura_modal = criar_figura_vazia("Produtos por Nível de Estoque (Dados não carregados)", height=500)
+                    figura_modal = _graficos().criar_figura_vazia("Produtos por Nível de Estoque (Dados não carregados)", height=500)
 
         elif triggered_component_id == "btn-fechar-modal-niveis":
             abrir_modal_agora = False
@@ -440,19 +603,18 @@ def registrar_callbacks_gerais(df_global_original):
         Output('tabela-detalhes-nivel-estoque-modal-container', 'children'),
         [Input('grafico-niveis-modal', 'clickData')],
         [State("modal-grafico-niveis-popup", "is_open"),
-         State('dropdown-categoria-filtro', 'value'),
-         State('dropdown-grupo-filtro', 'value'),
-         State('input-nome-produto-filtro', 'value'),
+         ESTADO_CHAVE_FILTROS_PAINEL,
          State('span-config-atual-limite-baixo', 'children'), 
          State('span-config-atual-limite-medio', 'children')]
     )
-    def atualizar_tabela_detalhes_nivel_estoque(click_data, modal_is_open,
-                                                categoria_sel, grupo_sel, nome_prod_sel,
+    @medir_etapa(TIPO_CALLBACK)
+    def atualizar_tabela_detalhes_nivel_estoque(click_data, modal_is_open, chave_filtros,
                                                 limite_baixo_str, limite_medio_str):
         '''
         Atualiza a tabela de detalhes no modal de níveis de estoque.
         A tabela mostra os produtos correspondentes ao nível de estoque (barra) clicado no gráfico,
-        baseando-se na primeira palavra da label da barra e considerando os filtros globais.
+        identificado pelo código do nível em customdata (ou pela primeira palavra da label)
+        e considerando os filtros globais.
         '''
         if not modal_is_open or not click_data or not click_data['points']:
             return dbc.Alert("Clique em uma barra do gráfico acima para ver os produtos detalhados.", 
@@ -472,47 +634,39 @@ def registrar_callbacks_gerais(df_global_original):
         except (ValueError, TypeError):
             limite_medio = limite_medio_default
 
-        if df_global_original is None or df_global_original.empty:
+        dataset = obter_dataset_efetivo()
+        if dataset.vazio:
             return dbc.Alert("Os dados de estoque não estão disponíveis para gerar a tabela.", color="warning", className="mt-3")
+        categoria_sel, grupo_sel, nome_prod_sel = _filtros_da_chave(chave_filtros)
 
         try:
-            nivel_clicado_label_completa = click_data['points'][0]['x'] 
+            ponto_clicado = click_data['points'][0]
+            nivel_clicado_label_completa = ponto_clicado['x']
             primeira_palavra_label = nivel_clicado_label_completa.split()[0].lower()
         except (KeyError, IndexError, AttributeError):
             return dbc.Alert("Não foi possível identificar o nível de estoque clicado. Tente novamente.", color="danger", className="mt-3")
 
-        dff = df_global_original.copy()
-
-        config_exclusao = carregar_configuracoes_exclusao()
-        grupos_a_excluir = config_exclusao.get("excluir_grupos", [])
-        categorias_a_excluir = config_exclusao.get("excluir_categorias", [])
-        produtos_codigos_a_excluir = [str(p) for p in config_exclusao.get("excluir_produtos_codigos", [])]
-
-        if grupos_a_excluir: dff = dff[~dff['Grupo'].isin(grupos_a_excluir)]
-        if categorias_a_excluir: dff = dff[~dff['Categoria'].isin(categorias_a_excluir)]
-        if produtos_codigos_a_excluir: dff = dff[~dff['Código'].astype(str).isin(produtos_codigos_a_excluir)]
-
-        if categoria_sel: dff = dff[dff['Categoria'] == categoria_sel]
-        if grupo_sel: dff = dff[dff['Grupo'] == grupo_sel]
-        if nome_prod_sel and nome_prod_sel.strip() != "":
-            dff = dff[dff['Produto'].str.contains(nome_prod_sel, case=False, na=False)]
-        
-        dff['Estoque'] = pd.to_numeric(dff['Estoque'], errors='coerce')
-        dff.dropna(subset=['Estoque'], inplace=True)
-
-        df_nivel_selecionado = pd.DataFrame()
-        titulo_tabela = "Produtos no Nível Selecionado"
-        if primeira_palavra_label == "baixo":
-            df_nivel_selecionado = dff[dff['Estoque'] <= limite_baixo]
-            titulo_tabela = f"Produtos com Estoque Baixo (Estoque ≤ {limite_baixo:g})"
-        elif primeira_palavra_label == "médio" or primeira_palavra_label == "medio": # Mantendo a variação para "medio" por segurança
-            df_nivel_selecionado = dff[(dff['Estoque'] > limite_baixo) & (dff['Estoque'] <= limite_medio)]
-            titulo_tabela = f"Produtos com Estoque Médio (Estoque > {limite_baixo:g} e ≤ {limite_medio:g})"
-        elif primeira_palavra_label == "alto":
-            df_nivel_selecionado = dff[dff['Estoque'] > limite_medio]
-            titulo_tabela = f"Produtos com Estoque Alto (Estoque > {limite_medio:g})"
+        # O gráfico guarda o código do nível em customdata; a primeira palavra da label fica como alternativa
+        codigos_por_palavra = {"baixo": NIVEL_BAIXO, "médio": NIVEL_MEDIO, "medio": NIVEL_MEDIO, "alto": NIVEL_ALTO}
+        customdata_clicado = ponto_clicado.get('customdata')
+        if isinstance(customdata_clicado, list) and customdata_clicado:
+            codigo_nivel = customdata_clicado[0]
         else:
+            codigo_nivel = codigos_por_palavra.get(primeira_palavra_label)
+
+        titulos_por_nivel = {
+            NIVEL_BAIXO: f"Produtos com Estoque Baixo (Estoque ≤ {limite_baixo:g})",
+            NIVEL_MEDIO: f"Produtos com Estoque Médio (Estoque > {limite_baixo:g} e ≤ {limite_medio:g})",
+            NIVEL_ALTO: f"Produtos com Estoque Alto (Estoque > {limite_medio:g})",
+        }
+        if codigo_nivel not in titulos_por_nivel:
             return dbc.Alert(f"Nível de estoque com primeira palavra '{primeira_palavra_label}' (derivado de '{nivel_clicado_label_completa}') não reconhecido.", color="warning", className="mt-3")
+        titulo_tabela = titulos_por_nivel[codigo_nivel]
+
+        # Reaproveita a classificação já calculada para o gráfico (mesmos filtros e limites)
+        mascara_filtros = dataset.mascara_filtros(categoria_sel, grupo_sel, nome_prod_sel)
+        classificacao_niveis = dataset.classificar_niveis(limite_baixo, limite_medio, mascara_filtros)
+        df_nivel_selecionado = dataset.aplicar_mascara(mascara_filtros)[classificacao_niveis.mascara(codigo_nivel)]
 
         if df_nivel_selecionado.empty:
             nome_nivel_display = nivel_clicado_label_completa.split('(')[0].strip() if '(' in nivel_clicado_label_completa else primeira_palavra_label.capitalize()
@@ -521,7 +675,9 @@ def registrar_callbacks_gerais(df_global_original):
         tabela_componente = criar_tabela_estoque(
             df_nivel_selecionado, 
             id_tabela='tabela-produtos-detalhe-nivel-modal',
-            page_size=7
+            page_size=7,
+            consulta={'origem': ORIGEM_NIVEL, 'categoria': categoria_sel, 'grupo': grupo_sel, 'nome_produto': nome_prod_sel,
+                      'limite_baixo': limite_baixo, 'limite_medio': limite_medio, 'nivel': int(codigo_nivel)}
         )
         
         return html.Div([
@@ -529,12 +685,30 @@ def registrar_callbacks_gerais(df_global_original):
             tabela_componente
         ])
     
+    @app.callback(
+        Output('store-versao-dados', 'data'),
+        Input('intervalo-verificacao-versao-dados', 'n_intervals'),
+        State('store-versao-dados', 'data'),
+        prevent_initial_call=True
+    )
+    @medir_etapa(TIPO_CALLBACK)
+    def verificar_versao_dados(n_intervals, versao_dados_pagina):
+        '''
+        Avisa a página quando o monitor de relatórios publicou uma nova versão dos dados;
+        os callbacks que recebem 'store-versao-dados' são recalculados.
+        '''
+        versao_dados_atual = obter_dataset_efetivo().versao_dados
+        if versao_dados_atual == versao_dados_pagina:
+            return no_update
+        return versao_dados_atual
+
     @app.callback(
         Output("offcanvas-filtros-estoque-geral", "is_open"),
         Input("btn-toggle-painel-esquerdo", "n_clicks"), # Usando o ID do botão definido no layout
         State("offcanvas-filtros-estoque-geral", "is_open"),
         prevent_initial_call=True
     )
+    @medir_etapa(TIPO_CALLBACK)
     def toggle_filtros_offcanvas(n_clicks_toggle, is_open_offcanvas):
         '''
         Abre ou fecha o Offcanvas de filtros na aba de Estoque Geral.
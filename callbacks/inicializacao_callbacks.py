@@ -0,0 +1,34 @@
+from dash import Input, Output, no_update
+import dash_bootstrap_components as dbc
+import flask
+from app_instance import app
+
+from modules.inicializacao import situacao_carga, SITUACAO_ERRO
+
+def registrar_callbacks_inicializacao():
+    @app.callback(
+        [Output('store-situacao-carga', 'data'),
+         Output('mensagem-carga', 'children')],
+        Input('intervalo-verificacao-carga', 'n_intervals')
+    )
+    def verificar_carga_inicial(ignore_n_intervals):
+        '''Informa à página de "carregando" a situação da carga dos dados em segundo plano.'''
+        flask.g.ignorar_metricas = True
+        situacao, mensagem = situacao_carga()
+        if situacao == SITUACAO_ERRO:
+            return situacao, dbc.Alert(mensagem, color="danger", className="mt-3")
+        return situacao, no_update
+
+    # Com os dados prontos, recarrega a página (que passa a receber o layout principal) e para a verificação
+    app.clientside_callback(
+        """
+        function(situacao) {
+            if (situacao === 'pronto') {
+                window.location.reload();
+            }
+            return situacao === 'pronto' || situacao === 'erro';
+        }
+        """,
+        Output('intervalo-verificacao-carga', 'disabled'),
+        Input('store-situacao-carga', 'data')
+    )
@@ -0,0 +1,67 @@
+import dash
+from dash import Input, Output, State, html, no_update
+import dash_bootstrap_components as dbc
+from app_instance import app
+
+from components.tables.table1 import criar_tabela_estoque
+from modules.config_manager import carregar_configuracoes_sugestao_compra, salvar_configuracoes_sugestao_compra
+from modules.consulta_tabelas import ORIGEM_SUGESTAO_COMPRA
+from modules.dataset_efetivo import obter_dataset_efetivo
+from modules.reorder_engine import COLUNA_QTD_SUGERIDA, sugestao_compra_dataset, tabela_sugestao_compra
+
+TAMANHO_PAGINA_SUGESTAO = 15
+
+def registrar_callbacks_sugestao_compra():
+    @app.callback(
+        [Output('conteudo-dinamico-aba-sugestao-compra', 'children'),
+         Output('div-status-sugestao-compra', 'children')],
+        [Input('abas-principais', 'active_tab'),
+         Input('btn-salvar-sugestao-compra', 'n_clicks'),
+         Input('span-excluidos-grupos', 'children'),
+         Input('span-excluidos-categorias', 'children'),
+         Input('span-excluidos-produtos-codigos', 'children'),
+         Input('store-versao-dados', 'data')],
+        [State('input-horizonte-sugestao-compra', 'value'),
+         State('input-seguranca-sugestao-compra', 'value')]
+    )
+    def atualizar_conteudo_aba_sugestao_compra(aba_ativa, n_clicks_salvar, ignore_exc_grp, ignore_exc_cat,
+                                               ignore_exc_prod, ignore_versao_dados, horizonte_input, seguranca_input):
+        '''
+        Calcula a sugestão de compra quando a aba está aberta. O botão salva o horizonte e o
+        estoque de segurança na configuração antes de recalcular.
+        '''
+        status_mensagem_componente = no_update
+        propriedade_disparo = dash.callback_context.triggered[0]['prop_id'] if dash.callback_context.triggered else ''
+        if propriedade_disparo == 'btn-salvar-sugestao-compra.n_clicks' and n_clicks_salvar:
+            sucesso, msg_retorno_salvar = salvar_configuracoes_sugestao_compra(horizonte_input, seguranca_input)
+            status_mensagem_componente = dbc.Alert(msg_retorno_salvar, color="success" if sucesso else "danger", dismissable=True, duration=7000)
+
+        dataset = obter_dataset_efetivo()
+        if aba_ativa != "tab-sugestao-compra" or dataset.vazio:
+            return "", status_mensagem_componente
+
+        config_sugestao = carregar_configuracoes_sugestao_compra()
+        horizonte_dias = config_sugestao["horizonte_compra_dias"]
+        estoque_seguranca_dias = config_sugestao["estoque_seguranca_dias"]
+        df_sugestao = sugestao_compra_dataset(dataset, horizonte_dias, estoque_seguranca_dias)
+        if df_sugestao.empty:
+            return dbc.Alert("Não foi possível ler as colunas de venda do relatório publicado.", color="warning", className="mt-3"), status_mensagem_componente
+
+        df_tabela = tabela_sugestao_compra(df_sugestao)
+        if df_tabela.empty:
+            return dbc.Alert(f"Nenhum produto precisa de compra para cobrir {horizonte_dias} dia(s) de venda "
+                             f"mais {estoque_seguranca_dias} dia(s) de segurança.", color="success", className="mt-3"), status_mensagem_componente
+
+        tabela = criar_tabela_estoque(
+            df_tabela,
+            id_tabela='tabela-sugestao-compra',
+            page_size=TAMANHO_PAGINA_SUGESTAO,
+            consulta={'origem': ORIGEM_SUGESTAO_COMPRA, 'horizonte_dias': horizonte_dias,
+                      'estoque_seguranca_dias': estoque_seguranca_dias}
+        )
+        return html.Div([
+            html.P(f"{len(df_tabela)} de {len(df_sugestao)} produto(s) precisam de compra para cobrir {horizonte_dias} dia(s) "
+                   f"de venda mais {estoque_seguranca_dias} dia(s) de segurança "
+                   f"({df_tabela[COLUNA_QTD_SUGERIDA].sum():,.0f} unidades no total).", className="mt-3"),
+            tabela
+        ]), status_mensagem_componente
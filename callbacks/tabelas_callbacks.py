@@ -0,0 +1,53 @@
+import dash
+from dash import Input, Output, State, no_update
+from app_instance import app
+
+from components.tables.table1 import id_consulta_tabela
+from modules.consulta_tabelas import consultar_pagina
+
+# Tabelas criadas com `consulta` (paginação, ordenação e filtro no servidor)
+IDS_TABELAS_PAGINADAS = [
+    'tabela-estoque',
+    'tabela-alerta-estoque-baixo-geral-cb',
+    'tabela-produtos-estoque-baixo-tab',
+    'tabela-produtos-em-falta',
+    'tabela-produtos-detalhe-nivel-modal',
+    'tabela-sugestao-compra',
+]
+
+def _registrar_callback_paginacao(id_tabela):
+    @app.callback(
+        [Output(id_tabela, 'data'),
+         Output(id_tabela, 'page_count'),
+         Output(id_tabela, 'page_current')],
+        [Input(id_tabela, 'page_current'),
+         Input(id_tabela, 'page_size'),
+         Input(id_tabela, 'sort_by'),
+         Input(id_tabela, 'filter_query')],
+        State(id_consulta_tabela(id_tabela), 'data'),
+        prevent_initial_call=True
+    )
+    def atualizar_pagina_tabela(pagina_atual, tamanho_pagina, sort_by, filter_query, consulta):
+        '''
+        Monta no servidor a página pedida pela DataTable: refaz a consulta da tabela sobre o
+        dataset efetivo, aplica filtro e ordenação e devolve apenas as linhas da página.
+        '''
+        if not consulta or not tamanho_pagina:
+            return no_update, no_update, no_update
+
+        # Mudou o filtro ou a ordenação: volta para a primeira página
+        propriedade_disparo = dash.callback_context.triggered[0]['prop_id'] if dash.callback_context.triggered else ''
+        if propriedade_disparo.endswith('.sort_by') or propriedade_disparo.endswith('.filter_query'):
+            pagina_atual = 0
+
+        pagina_atual = pagina_atual or 0
+        registros, total_paginas, _ = consultar_pagina(consulta, pagina_atual, tamanho_pagina, sort_by, filter_query)
+        if pagina_atual >= total_paginas:
+            # O filtro reduziu o total de páginas: mostra a última
+            pagina_atual = total_paginas - 1
+            registros, total_paginas, _ = consultar_pagina(consulta, pagina_atual, tamanho_pagina, sort_by, filter_query)
+        return registros, total_paginas, pagina_atual
+
+def registrar_callbacks_tabelas():
+    for id_tabela in IDS_TABELAS_PAGINADAS:
+        _registrar_callback_paginacao(id_tabela)
@@ -1,7 +1,16 @@
 # components/graphs/graficos_estoque.py
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.io.json import to_json_plotly
+from modules.data_loader import serie_numerica, CASAS_DECIMAIS_FLOAT32
+from modules.instrumentacao import medir_etapa, TIPO_GRAFICO
+from modules.inventory_manager import (
+    classificar_niveis_estoque, rotulos_niveis_estoque, ORDEM_EXIBICAO_NIVEIS,
+    NIVEL_BAIXO, NIVEL_MEDIO, NIVEL_ALTO, NIVEL_DESCONHECIDO, NIVEL_LIMITES_INVALIDOS
+)
 
 # --- Paletas de Cores Laranja ---
 # Para gráficos de pizza, rosca ou barras com múltiplas categorias discretas
@@ -16,8 +25,56 @@ MARGENS_GRAFICO_PADRAO = dict(l=40, r=20, t=70, b=50)
 MARGENS_GRAFICO_HORIZONTAL = dict(l=120, r=20, t=70, b=40)
 MARGENS_GRAFICO_COMPACTO = dict(l=20, r=20, t=40, b=20)
 
+# --- Payload das Figuras ---
+# Máximo de pontos (grupos) desenhados por gráfico; o excedente é agrupado ou omitido
+MAX_PONTOS_GRAFICO = 200
+# Tamanho máximo esperado de uma figura serializada (ver tamanho_payload_figura e benchmarks.bench_suite)
+ORCAMENTO_PAYLOAD_FIGURA_BYTES = 64 * 1024
+# O template padrão do Plotly vai inteiro no JSON de cada figura (~7 KB) e quase tudo nele é de
+# tipos de gráfico que o dashboard não usa (3D, polar, geo, mapas...). Este mantém só o que muda
+# a aparência das barras, linhas, pizzas e treemaps daqui, com os mesmos valores do template padrão.
+# Cada função deste módulo o passa explicitamente (template=), sem mudar o padrão global do Plotly.
+PROPRIEDADES_LAYOUT_TEMPLATE = ('autotypenumbers', 'colorway', 'font', 'hovermode', 'hoverlabel', 'paper_bgcolor',
+                                'plot_bgcolor', 'coloraxis', 'xaxis', 'yaxis', 'shapedefaults', 'annotationdefaults', 'title')
+TIPOS_TRACOS_TEMPLATE = ('bar', 'pie', 'scatter')
+
+def _criar_template_graficos():
+    template_plotly = pio.templates['plotly']
+    layout_plotly = template_plotly.layout.to_plotly_json()
+    return go.layout.Template(
+        layout={propriedade: layout_plotly[propriedade] for propriedade in PROPRIEDADES_LAYOUT_TEMPLATE if propriedade in layout_plotly},
+        data={tipo: getattr(template_plotly.data, tipo) for tipo in TIPOS_TRACOS_TEMPLATE}
+    )
+
+TEMPLATE_GRAFICOS = _criar_template_graficos()
+
+def tamanho_payload_figura(fig):
+    """Tamanho em bytes da figura serializada como o Dash a envia ao navegador."""
+    return len(to_json_plotly(fig))
+
+def _limitar_pontos(df_agregado, coluna_valor, max_pontos, coluna_rotulo=None, rotulo_outros=None, colunas_soma=()):
+    """
+    Mantém as `max_pontos` linhas de maior `coluna_valor`. Com `coluna_rotulo`, as demais são
+    somadas (`coluna_valor` e `colunas_soma`) em uma última linha "`rotulo_outros` (N)".
+    """
+    if not max_pontos or len(df_agregado) <= max_pontos:
+        return df_agregado
+    if coluna_rotulo is None:
+        return df_agregado.nlargest(max_pontos, coluna_valor)
+    ordenado = df_agregado.sort_values(coluna_valor, ascending=False, kind='stable')
+    mantidos, agrupados = ordenado.iloc[:max_pontos - 1], ordenado.iloc[max_pontos - 1:]
+    linha_outros = {coluna: agrupados[coluna].sum() for coluna in (coluna_valor, *colunas_soma)}
+    linha_outros[coluna_rotulo] = f"{rotulo_outros} ({len(agrupados)})"
+    return pd.concat([mantidos, pd.DataFrame([linha_outros])], ignore_index=True)
+
+def _maiores_valores(df, coluna_valor, n):
+    """Posições das `n` linhas de maior `coluna_valor` (> 0), na ordem de DataFrame.nlargest, e a soma dos positivos."""
+    valores = serie_numerica(df[coluna_valor]).fillna(0).reset_index(drop=True)
+    positivos = valores[valores > 0]
+    return positivos.nlargest(n).index.to_numpy(), float(positivos.sum())
+
 def criar_figura_vazia(titulo="Sem dados para exibir", height=None):
-    fig = go.Figure()
+    fig = go.Figure(layout=dict(template=TEMPLATE_GRAFICOS))
     fig.update_layout(
         title_text=titulo,
         title_x=0.5,
@@ -33,22 +90,28 @@ def criar_figura_vazia(titulo="Sem dados para exibir", height=None):
     )
     return fig
 
-def criar_grafico_estoque_por_grupo(df):
+@medir_etapa(TIPO_GRAFICO)
+def criar_grafico_estoque_por_grupo(df, max_pontos=MAX_PONTOS_GRAFICO):
     """
     Cria um gráfico de linhas com área preenchida do volume de estoque por grupo,
-    em tons de laranja.
+    em tons de laranja. Com mais de `max_pontos` grupos, mostra só os de maior estoque.
     """
     if df.empty or 'Grupo' not in df.columns or 'Estoque' not in df.columns:
         return criar_figura_vazia("Volume de Estoque por Grupo (Sem Dados)")
     
     df_plot = df.copy()
-    df_plot['Estoque'] = pd.to_numeric(df_plot['Estoque'], errors='coerce').fillna(0)
+    df_plot['Estoque'] = serie_numerica(df_plot['Estoque']).fillna(0)
     
-    df_agrupado = df_plot.groupby('Grupo', as_index=False)['Estoque'].sum()
+    df_agrupado = df_plot.groupby('Grupo', as_index=False, observed=True)['Estoque'].sum()
     df_agrupado = df_agrupado[df_agrupado['Estoque'] > 0] 
     
     if df_agrupado.empty:
         return criar_figura_vazia("Volume de Estoque por Grupo (Sem Estoque > 0)")
+    num_grupos = len(df_agrupado)
+    df_agrupado = _limitar_pontos(df_agrupado, 'Estoque', max_pontos)
+    titulo = 'Volume de Estoque por Grupo'
+    if len(df_agrupado) < num_grupos:
+        titulo += f' ({len(df_agrupado)} maiores de {num_grupos})'
 
     try:
         df_agrupado['OrdemNumerica'] = df_agrupado['Grupo'].str.extract(r'^(\d+)').astype(float)
@@ -61,8 +124,9 @@ def criar_grafico_estoque_por_grupo(df):
                   x='Grupo', 
                   y='Estoque', 
                   markers=True,
-                  title='Volume de Estoque por Grupo',
-                  labels={'Estoque': 'Quantidade Total em Estoque', 'Grupo': 'Grupo'})
+                  title=titulo,
+                  labels={'Estoque': 'Quantidade Total em Estoque', 'Grupo': 'Grupo'},
+                  template=TEMPLATE_GRAFICOS)
     
     # --- ALTERAÇÃO DE COR ---
     cor_da_linha = f'rgba({MAIN_ORANGE_COLOR_RGB}, 0.9)'
@@ -96,6 +160,7 @@ def criar_grafico_estoque_por_grupo(df):
     )
     return fig
 
+@medir_etapa(TIPO_GRAFICO)
 def criar_grafico_top_n_produtos_estoque(df, n=7, height=None):
     """
     Cria um gráfico de Donut mostrando a proporção de estoque dos Top N produtos,
@@ -106,17 +171,17 @@ def criar_grafico_top_n_produtos_estoque(df, n=7, height=None):
         if height: fig_vazia.update_layout(height=height)
         return fig_vazia
 
-    df_plot = df.copy()
-    df_plot['Estoque'] = pd.to_numeric(df_plot['Estoque'], errors='coerce').fillna(0)
-    df_com_estoque = df_plot[df_plot['Estoque'] > 0].copy()
-
-    if df_com_estoque.empty:
+    # Só as n maiores linhas saem do DataFrame (que pode ter milhões de produtos)
+    posicoes_top_n, estoque_total_geral = _maiores_valores(df, 'Estoque', n)
+    if estoque_total_geral <= 0:
         fig_vazia = criar_figura_vazia(f"Top {n} Produtos por Estoque (Sem Estoque > 0)")
         if height: fig_vazia.update_layout(height=height)
         return fig_vazia
 
-    estoque_total_geral = df_com_estoque['Estoque'].sum()
-    top_n_df = df_com_estoque.nlargest(n, 'Estoque')
+    top_n_df = pd.DataFrame({
+        'Produto': df['Produto'].iloc[posicoes_top_n].to_numpy(),
+        'Estoque': serie_numerica(df['Estoque'].iloc[posicoes_top_n]).to_numpy(),
+    })
     
     if top_n_df.empty:
         fig_vazia = criar_figura_vazia(f"Top {n} Produtos por Estoque (Nenhum produto no Top N)")
@@ -143,7 +208,8 @@ def criar_grafico_top_n_produtos_estoque(df, n=7, height=None):
                  hole=.4,
                  labels={'Estoque': 'Quantidade em Estoque', 'NomeExibicao': 'Produto/Segmento'},
                  # --- ALTERAÇÃO DE COR ---
-                 color_discrete_sequence=px.colors.sequential.Oranges_r)
+                 color_discrete_sequence=px.colors.sequential.Oranges_r,
+                 template=TEMPLATE_GRAFICOS)
     
     fig.update_traces(
         textposition='inside', 
@@ -162,54 +228,29 @@ def criar_grafico_top_n_produtos_estoque(df, n=7, height=None):
     )
     return fig
 
-def _classificar_nivel_estoque(estoque_val, limite_baixo, limite_medio):
-    try:
-        lim_b = float(limite_baixo)
-        lim_m = float(limite_medio)
-    except (ValueError, TypeError):
-        return 'Desconhecido (Limites Inválidos)'
-    if pd.isna(estoque_val):
-        return 'Desconhecido'
-    try:
-        val = float(estoque_val)
-    except (ValueError, TypeError):
-        return 'Desconhecido'
-    if val <= lim_b:
-        return f'Baixo (≤{lim_b:g})'
-    elif val <= lim_m:
-        return f'Médio ({lim_b:g} < E ≤ {lim_m:g})'
-    else: 
-        return f'Alto (>{lim_m:g})'
-
-def criar_grafico_niveis_estoque(df, limite_baixo=10, limite_medio=100, height=None):
+@medir_etapa(TIPO_GRAFICO)
+def criar_grafico_niveis_estoque(df, limite_baixo=10, limite_medio=100, height=None, classificacao=None):
     """
     Cria um gráfico de barras da contagem de produtos por nível de estoque,
     com uma paleta de cores laranja aprimorada para todas as categorias.
+    `classificacao` (ClassificacaoNiveisEstoque de `df`) evita reclassificar os produtos;
+    cada barra leva o código do nível em customdata, usado ao clicar na barra.
     """
     if df.empty or 'Estoque' not in df.columns:
         fig_vazia = criar_figura_vazia("Produtos por Nível de Estoque")
         if height: fig_vazia.update_layout(height=height)
         return fig_vazia
 
-    df_plot = df.copy()
-    df_plot['EstoqueNum'] = pd.to_numeric(df_plot['Estoque'], errors='coerce') 
-    df_plot['NivelEstoque'] = df_plot['EstoqueNum'].apply(lambda x: _classificar_nivel_estoque(x, limite_baixo, limite_medio))
-    
-    contagem_niveis = df_plot['NivelEstoque'].value_counts().reset_index()
-    contagem_niveis.columns = ['NivelEstoque', 'Contagem']
-    
-    cat_baixo_label = f'Baixo (≤{float(limite_baixo):g})'
-    cat_medio_label = f'Médio ({float(limite_baixo):g} < E ≤ {float(limite_medio):g})'
-    cat_alto_label = f'Alto (>{float(limite_medio):g})'
-    
-    # Ordem de exibição no gráfico (do mais importante para o menos)
-    ordem_niveis_plot = [cat_alto_label, cat_medio_label, cat_baixo_label, 'Desconhecido', 'Desconhecido (Limites Inválidos)']
-    
-    niveis_presentes_dados = df_plot['NivelEstoque'].unique()
-    ordem_final_para_plot = [nivel for nivel in ordem_niveis_plot if nivel in niveis_presentes_dados]
+    if classificacao is None:
+        classificacao = classificar_niveis_estoque(df['Estoque'], limite_baixo, limite_medio)
+    rotulos_niveis = rotulos_niveis_estoque(limite_baixo, limite_medio)
 
-    contagem_niveis['NivelEstoque'] = pd.Categorical(contagem_niveis['NivelEstoque'], categories=ordem_final_para_plot, ordered=True)
-    contagem_niveis = contagem_niveis.sort_values('NivelEstoque').dropna(subset=['NivelEstoque'])
+    niveis_presentes = [nivel for nivel in ORDEM_EXIBICAO_NIVEIS if classificacao.contagens[nivel] > 0]
+    contagem_niveis = pd.DataFrame({
+        'NivelEstoque': [rotulos_niveis[nivel] for nivel in niveis_presentes],
+        'Contagem': [int(classificacao.contagens[nivel]) for nivel in niveis_presentes],
+        'CodigoNivel': niveis_presentes,
+    })
     
     if contagem_niveis.empty or contagem_niveis['Contagem'].sum() == 0:
         fig_vazia = criar_figura_vazia("Níveis de Estoque (Sem Produtos para Classificar)")
@@ -218,13 +259,14 @@ def criar_grafico_niveis_estoque(df, limite_baixo=10, limite_medio=100, height=N
 
     # --- COR DO BOTÃO ALTERADA ---
     # Ajustada a cor da categoria "Desconhecido" para um tom de laranja.
-    mapa_cores = {
-        cat_baixo_label: 'rgba(255, 87, 34, 0.8)',   # Laranja avermelhado (Deep Orange)
-        cat_medio_label: 'rgba(251, 140, 0, 0.8)',  # Laranja
-        cat_alto_label: 'rgba(255, 193, 7, 0.8)',   # Ambar (quase amarelo)
-        'Desconhecido': 'rgba(245, 172, 123, 0.8)',  # Laranja claro/pêssego para "Desconhecido"
-        'Desconhecido (Limites Inválidos)': 'rgba(205, 133, 63, 0.8)' # Laranja/marrom para erros
+    cores_niveis = {
+        NIVEL_BAIXO: 'rgba(255, 87, 34, 0.8)',   # Laranja avermelhado (Deep Orange)
+        NIVEL_MEDIO: 'rgba(251, 140, 0, 0.8)',  # Laranja
+        NIVEL_ALTO: 'rgba(255, 193, 7, 0.8)',   # Ambar (quase amarelo)
+        NIVEL_DESCONHECIDO: 'rgba(245, 172, 123, 0.8)',  # Laranja claro/pêssego para "Desconhecido"
+        NIVEL_LIMITES_INVALIDOS: 'rgba(205, 133, 63, 0.8)' # Laranja/marrom para erros
     }
+    mapa_cores = {rotulos_niveis[nivel]: cores_niveis[nivel] for nivel in rotulos_niveis}
 
     fig = px.bar(contagem_niveis, 
                  x='NivelEstoque', 
@@ -232,7 +274,9 @@ def criar_grafico_niveis_estoque(df, limite_baixo=10, limite_medio=100, height=N
                  title='Produtos por Nível de Estoque',
                  labels={'Contagem': 'Nº de Produtos', 'NivelEstoque': 'Nível de Estoque'},
                  color='NivelEstoque',
-                 color_discrete_map=mapa_cores)
+                 color_discrete_map=mapa_cores,
+                 custom_data=['CodigoNivel'],
+                 template=TEMPLATE_GRAFICOS)
                  
     fig.update_traces(textposition='outside')
     fig.update_layout(
@@ -249,12 +293,21 @@ def criar_grafico_niveis_estoque(df, limite_baixo=10, limite_medio=100, height=N
     return fig
 
 
-def criar_grafico_categorias_com_estoque_baixo(df_estoque_baixo, top_n=10):
-    if df_estoque_baixo is None or df_estoque_baixo.empty or 'Categoria' not in df_estoque_baixo.columns or 'Código' not in df_estoque_baixo.columns:
+@medir_etapa(TIPO_GRAFICO)
+def criar_grafico_categorias_com_estoque_baixo(df_estoque_baixo, top_n=10, contagem_por_categoria=None):
+    """
+    Barras horizontais das categorias com mais produtos em estoque baixo.
+    `contagem_por_categoria` (Series categoria -> nº de produtos baixos, como a de
+    CuboAgregacao.por_categoria) dispensa o agrupamento das linhas de `df_estoque_baixo`.
+    """
+    if contagem_por_categoria is None:
+        if df_estoque_baixo is None or df_estoque_baixo.empty or 'Categoria' not in df_estoque_baixo.columns or 'Código' not in df_estoque_baixo.columns:
+            return criar_figura_vazia(f"Categorias com Estoque Baixo (Sem Dados)")
+        contagem_por_categoria = df_estoque_baixo.groupby('Categoria', observed=True)['Código'].nunique()
+    elif contagem_por_categoria.empty:
         return criar_figura_vazia(f"Categorias com Estoque Baixo (Sem Dados)")
 
-    contagem_categorias = df_estoque_baixo.groupby('Categoria')['Código'].nunique().reset_index()
-    contagem_categorias.rename(columns={'Código': 'NumeroDeProdutosBaixos'}, inplace=True)
+    contagem_categorias = contagem_por_categoria.rename('NumeroDeProdutosBaixos').rename_axis('Categoria').reset_index()
     contagem_categorias_top_n = contagem_categorias.nlargest(top_n, 'NumeroDeProdutosBaixos')
     
     if contagem_categorias_top_n.empty:
@@ -268,7 +321,8 @@ def criar_grafico_categorias_com_estoque_baixo(df_estoque_baixo, top_n=10):
                  orientation='h',
                  title=f'Top {top_n} Categorias por Nº de Produtos em Estoque Baixo',
                  labels={'NumeroDeProdutosBaixos': 'Nº de Produtos Baixos', 'Categoria': 'Categoria'},
-                 color_discrete_sequence=[f'rgba({MAIN_ORANGE_COLOR_RGB}, 0.8)'])
+                 color_discrete_sequence=[f'rgba({MAIN_ORANGE_COLOR_RGB}, 0.8)'],
+                 template=TEMPLATE_GRAFICOS)
     fig.update_traces(textposition='outside')
     fig.update_layout(
         yaxis={'categoryorder':'total ascending', 'dtick': 1, 'ticksuffix': '  '},
@@ -281,23 +335,25 @@ def criar_grafico_categorias_com_estoque_baixo(df_estoque_baixo, top_n=10):
     )
     return fig
 
+@medir_etapa(TIPO_GRAFICO)
 def criar_grafico_estoque_produtos_populares(df, n=7):
     if df is None or df.empty or 'Produto' not in df.columns or \
        'VendaMensal' not in df.columns or 'Estoque' not in df.columns:
         return criar_figura_vazia(f"Venda vs. Estoque dos Top {n} Produtos (Sem Dados)")
 
-    df_plot = df.copy()
-    df_plot['VendaMensalNum'] = pd.to_numeric(df_plot['VendaMensal'], errors='coerce').fillna(0)
-    df_plot['EstoqueNum'] = pd.to_numeric(df_plot['Estoque'], errors='coerce').fillna(0)
-
-    produtos_populares_df = df_plot[df_plot['VendaMensalNum'] > 0].nlargest(n, 'VendaMensalNum')
+    posicoes_populares, _ = _maiores_valores(df, 'VendaMensal', n)
+    produtos_populares_df = pd.DataFrame({
+        'Produto': df['Produto'].iloc[posicoes_populares].to_numpy(),
+        'VendaMensalNum': serie_numerica(df['VendaMensal'].iloc[posicoes_populares]).fillna(0).to_numpy(),
+        'EstoqueNum': serie_numerica(df['Estoque'].iloc[posicoes_populares]).fillna(0).to_numpy(),
+    })
     
     if produtos_populares_df.empty:
         return criar_figura_vazia(f"Venda vs. Estoque dos Top {n} Produtos (Sem produtos com vendas)")
 
     produtos_populares_df = produtos_populares_df.sort_values(by='VendaMensalNum', ascending=False)
     
-    fig = go.Figure()
+    fig = go.Figure(layout=dict(template=TEMPLATE_GRAFICOS))
     
     # --- ALTERAÇÃO DE COR ---
     # Usando paleta sequencial de laranja para as barras de estoque
@@ -345,50 +401,65 @@ def criar_grafico_estoque_produtos_populares(df, n=7):
     )
     return fig
 
-def criar_grafico_colunas_estoque_por_grupo(df_filtrado):
+@medir_etapa(TIPO_GRAFICO)
+def criar_grafico_colunas_estoque_por_grupo(df_filtrado, max_pontos=MAX_PONTOS_GRAFICO):
+    """
+    Treemap do estoque por grupo. Os produtos são agregados por grupo antes de chegar ao
+    Plotly (o treemap só mostra os totais), com a cor de cada retângulo igual à média do
+    estoque ponderada pelo estoque (Σe² / Σe), como o px.treemap calculava a partir das linhas.
+    Com mais de `max_pontos` grupos, os menores viram um único retângulo "Outros grupos".
+    """
     titulo_grafico = "Estoque por Grupo (Treemap)"
     nova_altura_grafico = 450
 
     if df_filtrado.empty or 'Grupo' not in df_filtrado.columns or 'Estoque' not in df_filtrado.columns:
-        fig = px.treemap(title=f"{titulo_grafico} - Sem dados")
+        fig = px.treemap(title=f"{titulo_grafico} - Sem dados", template=TEMPLATE_GRAFICOS)
         fig.update_layout(height=nova_altura_grafico, margin=dict(t=50, b=5, l=5, r=5), paper_bgcolor='white', font_color="black")
         return fig
 
-    df_filtrado['Estoque'] = pd.to_numeric(df_filtrado['Estoque'], errors='coerce').fillna(0)
-    # Adicionado .copy() para evitar avisos do pandas
-    df_para_treemap = df_filtrado[df_filtrado['Estoque'] > 0].copy()
+    # Não altera df_filtrado: ele pode ser o DataFrame compartilhado entre os callbacks
+    estoque_numerico = serie_numerica(df_filtrado['Estoque']).fillna(0)
+    com_estoque = (estoque_numerico > 0).to_numpy()
+    estoque_positivo = estoque_numerico[com_estoque].astype('float64')
+    df_por_grupo = pd.DataFrame({'Estoque': estoque_positivo, 'EstoqueQuadrado': estoque_positivo * estoque_positivo}).groupby(
+        df_filtrado['Grupo'][com_estoque], observed=True).sum()
+    df_por_grupo = df_por_grupo[df_por_grupo['Estoque'] > 0]
 
-    if df_para_treemap.empty:
-        fig = px.treemap(title=f"{titulo_grafico} - Sem dados positivos")
+    if df_por_grupo.empty:
+        fig = px.treemap(title=f"{titulo_grafico} - Sem dados positivos", template=TEMPLATE_GRAFICOS)
         fig.update_layout(height=nova_altura_grafico, margin=dict(t=50, b=5, l=5, r=5), paper_bgcolor='white', font_color="black")
         return fig
 
-    # --- ALTERAÇÃO PRINCIPAL AQUI ---
-    # 1. Criamos uma nova coluna 'NomeGrupo' que remove o prefixo numérico.
-    #    Ex: "005 BEBIDAS QUENTES" se torna "BEBIDAS QUENTES"
-    df_para_treemap['NomeGrupo'] = df_para_treemap['Grupo'].str.replace(r'^\d+\s*', '', regex=True)
-
-    fig = px.treemap(
-        df_para_treemap,
-        # 2. Usamos a nova coluna 'NomeGrupo' para criar os caminhos (rótulos) do gráfico.
-        path=[px.Constant("Todos os Grupos"), 'NomeGrupo'],
-        values='Estoque',
-        title=titulo_grafico,
-        color='Estoque',
-        color_continuous_scale=ORANGE_PALETTE_CONTINUOUS,
-        # 3. Atualizamos o custom_data para que o nome limpo apareça também ao passar o mouse.
-        custom_data=['NomeGrupo', 'Estoque']
-    )
-    fig.update_traces(
+    # Os rótulos não levam o prefixo numérico ("005 BEBIDAS QUENTES" vira "BEBIDAS QUENTES");
+    # grupos que ficam com o mesmo nome são somados, como no path do px.treemap
+    nomes_grupos = pd.Series(df_por_grupo.index.astype(str), index=df_por_grupo.index).str.replace(r'^\d+\s*', '', regex=True)
+    df_por_nome = df_por_grupo.groupby(nomes_grupos.to_numpy()).sum().rename_axis('NomeGrupo').reset_index()
+    df_por_nome = _limitar_pontos(df_por_nome, 'Estoque', max_pontos, coluna_rotulo='NomeGrupo',
+                                  rotulo_outros='Outros grupos', colunas_soma=('EstoqueQuadrado',))
+    df_por_nome = df_por_nome.sort_values('NomeGrupo', kind='stable')
+
+    rotulo_raiz = "Todos os Grupos"
+    estoque_por_nome = np.round(df_por_nome['Estoque'].to_numpy(), CASAS_DECIMAIS_FLOAT32)
+    cores = (df_por_nome['EstoqueQuadrado'] / df_por_nome['Estoque']).to_numpy()
+    fig = go.Figure(go.Treemap(
+        ids=[f"{rotulo_raiz}/{nome}" for nome in df_por_nome['NomeGrupo']] + [rotulo_raiz],
+        labels=df_por_nome['NomeGrupo'].tolist() + [rotulo_raiz],
+        parents=[rotulo_raiz] * len(df_por_nome) + [""],
+        values=np.append(estoque_por_nome, np.round(estoque_por_nome.sum(), CASAS_DECIMAIS_FLOAT32)),
+        branchvalues='total',
+        marker=dict(colors=np.append(cores, df_por_nome['EstoqueQuadrado'].sum() / df_por_nome['Estoque'].sum()),
+                    coloraxis='coloraxis', line=dict(width=1, color='rgba(255,255,255,0.5)')),
+        domain=dict(x=[0.0, 1.0], y=[0.0, 1.0]),
+        name='',
         textinfo='label + percent root',
-        # O hovertemplate agora usa o 'NomeGrupo' (customdata[0])
-        hovertemplate='<b>%{customdata[0]}</b><br>Estoque: %{customdata[1]:,.0f}<extra></extra>',
+        hovertemplate='<b>%{label}</b><br>Estoque: %{value:,.0f}<extra></extra>',
         textposition='middle center',
         textfont=dict(family="Arial Black, sans-serif", size=11, color="black"),
-        marker_line_width=1,
-        marker_line_color='rgba(255,255,255,0.5)'
-    )
+    ), layout=dict(template=TEMPLATE_GRAFICOS))
     fig.update_layout(
+        title_text=titulo_grafico,
+        coloraxis=dict(colorscale=ORANGE_PALETTE_CONTINUOUS, colorbar=dict(title=dict(text='Estoque'))),
+        legend=dict(tracegroupgap=0),
         height=nova_altura_grafico,
         margin=dict(t=50, b=15, l=15, r=15),
         paper_bgcolor='white',
@@ -397,4 +468,4 @@ def criar_grafico_colunas_estoque_por_grupo(df_filtrado):
         title_font_size=18,
         title_x=0.5
     )
-    return fig
\ No newline at end of file
+    return fig
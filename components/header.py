@@ -1,5 +1,6 @@
 import dash_bootstrap_components as dbc
 from dash import html
+from modules.data_loader import serie_numerica
 
 def criar_cabecalho(df_completo):
 
@@ -7,7 +8,7 @@ def criar_cabecalho(df_completo):
         total_skus, qtd_total_estoque, num_categorias, num_grupos = 0, 0, 0, 0
     else:
         total_skus = df_completo['Código'].nunique()
-        qtd_total_estoque = df_completo['Estoque'].sum()
+        qtd_total_estoque = serie_numerica(df_completo['Estoque']).sum()
         num_categorias = df_completo['Categoria'].nunique()
         num_grupos = df_completo['Grupo'].nunique()
 
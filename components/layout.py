@@ -1,16 +1,48 @@
 import dash_bootstrap_components as dbc
-from dash import html
+from dash import html, dcc
 from .tabs.tab_estoque_geral import criar_conteudo_aba_estoque_geral
 from .tabs.tab_configuracoes import criar_conteudo_aba_configuracoes
 from .tabs.tab_estoque_baixo import criar_conteudo_aba_estoque_baixo
 from .tabs.tab_produtos_em_falta import criar_conteudo_aba_produtos_em_falta
+from .tabs.tab_sugestao_compra import criar_conteudo_aba_sugestao_compra
+from .tabs.tab_diagnostico import criar_conteudo_aba_diagnostico
 from components.header import criar_cabecalho
 
-def criar_layout_principal(df_completo, nome_arquivo, page_size_tabela=20):
+# De quanto em quanto tempo o navegador pergunta se o servidor publicou novos dados
+INTERVALO_VERIFICACAO_VERSAO_MS = 30 * 1000
+# Na página de "carregando" (início rápido), de quanto em quanto tempo perguntar se a carga terminou
+INTERVALO_VERIFICACAO_CARGA_MS = 1000
+# Abas cujo conteúdo só é montado (e enviado ao navegador) na primeira vez em que são abertas
+ABAS_SOB_DEMANDA = ("tab-configuracoes", "tab-estoque-baixo", "tab-produtos-em-falta")
+
+def id_chave_aba_renderizada(tab_id):
+    """Id do Store com a chave (versão dos dados e dependências) do conteúdo já montado na aba."""
+    return f"store-chave-renderizada-{tab_id}"
+
+def criar_layout_carregando():
+    """
+    Página servida enquanto os dados são carregados em segundo plano (início rápido).
+    Quando a carga termina a página é recarregada e recebe o layout principal.
+    """
+    return dbc.Container([
+        dcc.Store(id='store-situacao-carga'),
+        dcc.Interval(id='intervalo-verificacao-carga', interval=INTERVALO_VERIFICACAO_CARGA_MS),
+        html.Div([
+            dbc.Spinner(color="primary"),
+            html.H4("Carregando os dados do relatório...", className="mt-3"),
+            html.P("O painel abre automaticamente quando os dados estiverem prontos.", className="text-muted"),
+            html.Div(id='mensagem-carga')
+        ], className="text-center my-5")
+    ], fluid=True)
+
+def criar_layout_principal(df_completo, nome_arquivo, page_size_tabela=20, versao_dados=0):
     """
     Cria o layout principal do dashboard com sistema de abas,
     onde cada aba carrega seu conteúdo de um módulo separado,
     com melhorias de estilização e espaçamento.
+    `versao_dados` é a versão do dataset usada para montar a página; quando o servidor
+    publica outra, os gráficos são recalculados sem recarregar a página.
+    As abas de ABAS_SOB_DEMANDA saem vazias e são preenchidas por callbacks ao serem abertas.
     """
 
     titulo_app = dbc.Row(
@@ -28,7 +60,7 @@ def criar_layout_principal(df_completo, nome_arquivo, page_size_tabela=20):
             ),
             dbc.Tab(
                 label="Configurações", 
-                children=criar_conteudo_aba_configuracoes(df_completo),
+                children=criar_conteudo_aba_configuracoes(),
                 tab_id="tab-configuracoes",
                 className="py-3"
             ),
@@ -40,10 +72,22 @@ def criar_layout_principal(df_completo, nome_arquivo, page_size_tabela=20):
             ),
             dbc.Tab(
                 label="Produtos em Falta", 
-                children=criar_conteudo_aba_produtos_em_falta(df_completo), 
+                children=criar_conteudo_aba_produtos_em_falta(), 
                 tab_id="tab-produtos-em-falta",
                 className="py-3"
             ),
+            dbc.Tab(
+                label="Sugestão de Compra", 
+                children=criar_conteudo_aba_sugestao_compra(), 
+                tab_id="tab-sugestao-compra",
+                className="py-3"
+            ),
+            dbc.Tab(
+                label="Diagnóstico", 
+                children=criar_conteudo_aba_diagnostico(), 
+                tab_id="tab-diagnostico",
+                className="py-3"
+            ),
         ],
         id="abas-principais",
         active_tab="tab-estoque-geral",
@@ -53,6 +97,9 @@ def criar_layout_principal(df_completo, nome_arquivo, page_size_tabela=20):
 
 
     layout = dbc.Container([
+        dcc.Store(id='store-versao-dados', data=versao_dados),
+        *[dcc.Store(id=id_chave_aba_renderizada(tab_id)) for tab_id in ABAS_SOB_DEMANDA],
+        dcc.Interval(id='intervalo-verificacao-versao-dados', interval=INTERVALO_VERIFICACAO_VERSAO_MS),
         criar_cabecalho(df_completo),
         abas_componente 
     ], fluid=True, className="p-0")
@@ -1,24 +1,61 @@
 # components/tables/table1.py
 import pandas as pd
-from dash import dash_table, html
+from dash import dash_table, html, dcc
 import dash_bootstrap_components as dbc
+from modules.data_loader import colunas_float32_para_float64
+from modules.consulta_tabelas import registros_pagina, contar_paginas
+from modules.reorder_engine import COLUNA_VENDA_DIARIA, COLUNA_DIAS_COBERTURA, COLUNA_QTD_SUGERIDA
 
-def criar_tabela_estoque(df_dados_tabela, id_tabela='tabela-estoque', page_size=20):
+COLUNAS_NUMERICAS_TABELA = ['Estoque', 'VendaMensal', COLUNA_VENDA_DIARIA, COLUNA_DIAS_COBERTURA, COLUNA_QTD_SUGERIDA]
+
+def id_consulta_tabela(id_tabela):
+    """ID do dcc.Store que guarda a consulta de uma tabela paginada no servidor."""
+    return f"{id_tabela}-consulta"
+
+def _propriedades_paginacao_servidor(df_dados_tabela, colunas, page_size, total_linhas=None):
+    """
+    Propriedades da DataTable para paginação, ordenação e filtro no servidor
+    (callbacks em callbacks/tabelas_callbacks.py): só a primeira página vai no layout.
+    """
+    return dict(
+        data=registros_pagina(df_dados_tabela, 0, page_size, colunas),
+        page_action='custom',
+        page_current=0,
+        page_count=contar_paginas(len(df_dados_tabela) if total_linhas is None else total_linhas, page_size),
+        sort_action='custom',
+        sort_mode='single',
+        sort_by=[],
+        filter_action='custom',
+        filter_query='',
+        # O filtro começa insensível a maiúsculas (o botão "Aa" da tabela alterna)
+        filter_options={'case': 'insensitive'},
+    )
+
+def criar_tabela_estoque(df_dados_tabela, id_tabela='tabela-estoque', page_size=20, consulta=None):
+    """
+    Cria a DataTable de produtos. Com `consulta` (dict com a 'origem' dos dados e os filtros,
+    ver modules/consulta_tabelas.py) a tabela é paginada, ordenada e filtrada no servidor.
+    """
     if df_dados_tabela.empty:
         return dbc.Alert("Nenhum dado para exibir na tabela.", color="warning", className="text-center")
 
     colunas_desejadas = ['Código', 'Produto', 'Un', 'Estoque', 'Categoria', 'Grupo']
     colunas_existentes_ordenadas = [col for col in colunas_desejadas if col in df_dados_tabela.columns]
     for col in df_dados_tabela.columns:
-        if col not in colunas_existentes_ordenadas and col not in ['VendaMensal']:
+        if col not in colunas_existentes_ordenadas and col not in ['VendaMensal', 'CustoEstoque']:
             colunas_existentes_ordenadas.append(col)
     
     colunas_para_dash = [{"name": i, "id": i} for i in colunas_existentes_ordenadas]
+    if consulta is not None:
+        colunas_para_dash = [{**coluna, "type": "numeric"} if coluna["id"] in COLUNAS_NUMERICAS_TABELA else coluna for coluna in colunas_para_dash]
+        propriedades_dados = _propriedades_paginacao_servidor(df_dados_tabela, colunas_existentes_ordenadas, page_size)
+    else:
+        propriedades_dados = dict(data=colunas_float32_para_float64(df_dados_tabela).to_dict('records'))
 
-    return dash_table.DataTable(
+    tabela = dash_table.DataTable(
         id=id_tabela,
         columns=colunas_para_dash,
-        data=df_dados_tabela.to_dict('records'),
+        **propriedades_dados,
         page_size=page_size, # Paginação controlada aqui
         
         # export_format='xlsx', # REMOVIDO para usarmos um botão customizado
@@ -58,31 +95,48 @@ def criar_tabela_estoque(df_dados_tabela, id_tabela='tabela-estoque', page_size=
              'border': '1px solid rgba(0, 123, 255, 0.2)'}
         ]
     )
+    if consulta is None:
+        return tabela
+    return html.Div([
+        dcc.Store(id=id_consulta_tabela(id_tabela), data={**consulta, 'colunas': colunas_existentes_ordenadas}),
+        tabela
+    ])
 
-def criar_tabela_produtos_criticos(df_produtos, id_tabela, titulo_alerta, page_size=5, altura_tabela='300px'):
+def criar_tabela_produtos_criticos(df_produtos, id_tabela, titulo_alerta, page_size=5, altura_tabela='300px', consulta=None,
+                                   total_linhas=None):
     """
     Cria uma DataTable compacta para produtos críticos (baixo estoque).
     Esta tabela MANTÉM o scroll vertical interno e mostra todos os itens via page_size grande.
+    Com `consulta`, mostra páginas de `page_size` itens montadas no servidor; nesse caso
+    `df_produtos` pode trazer só as linhas da primeira página e `total_linhas` o total.
     """
-    if df_produtos.empty:
+    if (len(df_produtos) if total_linhas is None else total_linhas) == 0:
         return dbc.Alert(f"{titulo_alerta}: Nenhum produto encontrado.", color="info", className="mt-2")
 
     colunas_para_dash = [
         {"name": "Produto", "id": "Produto"},
         {"name": "Estoque Atual", "id": "Estoque"}
     ]
-    dados_para_tabela = df_produtos[['Produto', 'Estoque']].to_dict('records')
-
-    # Para mostrar todos os itens na área de scroll, page_size deve ser >= len(dados)
-    page_size_real = max(1, len(dados_para_tabela)) 
+    colunas_tabela = ['Produto', 'Estoque']
+    if consulta is not None:
+        colunas_para_dash = [{**coluna, "type": "numeric"} if coluna["id"] in COLUNAS_NUMERICAS_TABELA else coluna for coluna in colunas_para_dash]
+        propriedades_dados = _propriedades_paginacao_servidor(df_produtos, colunas_tabela, page_size, total_linhas)
+        page_size_real = page_size
+        componentes_consulta = [dcc.Store(id=id_consulta_tabela(id_tabela), data={**consulta, 'colunas': colunas_tabela})]
+    else:
+        propriedades_dados = dict(data=colunas_float32_para_float64(df_produtos[colunas_tabela]).to_dict('records'))
+        # Para mostrar todos os itens na área de scroll, page_size deve ser >= len(dados)
+        page_size_real = max(1, len(propriedades_dados['data']))
+        componentes_consulta = []
 
     return html.Div([
         html.H6(titulo_alerta, className="mt-3 text-danger fw-bold"),
+        *componentes_consulta,
         dash_table.DataTable(
             id=id_tabela,
             columns=colunas_para_dash,
-            data=dados_para_tabela,
-            page_size=page_size_real, # MOSTRA TODOS OS ITENS DENTRO DA ÁREA DE SCROLL
+            **propriedades_dados,
+            page_size=page_size_real, # MOSTRA TODOS OS ITENS DENTRO DA ÁREA DE SCROLL (sem consulta)
             style_table={
                 'height': altura_tabela, # ALTURA FIXA PARA SCROLL
                 'overflowY': 'auto',    # SCROLL VERTICAL INTERNO
@@ -1,16 +1,33 @@
 from dash import html, dcc
 import dash_bootstrap_components as dbc
-import pandas as pd
 from modules.config_manager import (
     carregar_definicoes_niveis_estoque, 
     VALORES_PADRAO_NIVEIS,
     carregar_configuracoes_exclusao
 )
 
-def criar_conteudo_aba_configuracoes(df_completo_para_opcoes):
+def _opcoes_valores(valores):
+    """Opções mínimas para os valores já selecionados (a lista completa chega ao abrir a aba)."""
+    return [{'label': str(valor), 'value': str(valor)} for valor in valores]
+
+def opcoes_exclusao(df_completo_para_opcoes):
+    """
+    Opções dos dropdowns de exclusão de grupos e de categorias, montadas a partir do
+    DataFrame completo, sem exclusões. As de produtos vêm da busca no servidor
+    (ver modules/opcoes_produtos.py).
+    """
+    if df_completo_para_opcoes is None or df_completo_para_opcoes.empty:
+        return [], []
+    opcoes_grupos_excluir = [{'label': str(grp), 'value': str(grp)} for grp in sorted(df_completo_para_opcoes['Grupo'].dropna().unique())]
+    opcoes_categorias_excluir = [{'label': str(cat), 'value': str(cat)} for cat in sorted(df_completo_para_opcoes['Categoria'].dropna().unique())]
+    return opcoes_grupos_excluir, opcoes_categorias_excluir
+
+def criar_conteudo_aba_configuracoes():
     """
     Cria o layout para a aba de Configurações, com seções distintas
     lado a lado para definições de níveis de estoque e exclusão de itens.
+    As opções dos dropdowns de exclusão são preenchidas por um callback na primeira vez
+    em que a aba é aberta (ver opcoes_exclusao); as de produtos, a cada busca digitada.
     """
     config_niveis_atuais = carregar_definicoes_niveis_estoque()
     valor_inicial_baixo = config_niveis_atuais.get("limite_estoque_baixo")
@@ -21,15 +38,9 @@ def criar_conteudo_aba_configuracoes(df_completo_para_opcoes):
     categorias_excluidas_atuais = config_exclusao_atuais.get("excluir_categorias", [])
     produtos_excluidos_atuais_codigos = config_exclusao_atuais.get("excluir_produtos_codigos", [])
 
-    opcoes_grupos_excluir, opcoes_categorias_excluir, opcoes_produtos_excluir = [], [], []
-    if df_completo_para_opcoes is not None and not df_completo_para_opcoes.empty:
-        opcoes_grupos_excluir = [{'label': str(grp), 'value': str(grp)} for grp in sorted(df_completo_para_opcoes['Grupo'].dropna().unique())]
-        opcoes_categorias_excluir = [{'label': str(cat), 'value': str(cat)} for cat in sorted(df_completo_para_opcoes['Categoria'].dropna().unique())]
-        produtos_unicos = df_completo_para_opcoes.drop_duplicates(subset=['Código'])
-        opcoes_produtos_excluir = sorted([
-            {'label': f"{row['Produto']} (Cód: {row['Código']})", 'value': str(row['Código'])} 
-            for index, row in produtos_unicos.iterrows() if pd.notna(row['Código']) and str(row['Código']).strip() != ''
-        ], key=lambda x: x['label'])
+    opcoes_grupos_excluir = _opcoes_valores(grupos_excluidos_atuais)
+    opcoes_categorias_excluir = _opcoes_valores(categorias_excluidas_atuais)
+    opcoes_produtos_excluir = _opcoes_valores(produtos_excluidos_atuais_codigos)
 
     card_definicoes_niveis = dbc.Card([
         dbc.CardHeader(html.H5("Definições de Níveis de Estoque", className="my-2")),
@@ -95,7 +106,7 @@ def criar_conteudo_aba_configuracoes(df_completo_para_opcoes):
             dcc.Dropdown(
                 id='dropdown-excluir-produtos-codigos', options=opcoes_produtos_excluir,
                 value=produtos_excluidos_atuais_codigos, multi=True, searchable=True,
-                placeholder="Busque e selecione Produtos"
+                placeholder="Digite o nome ou o código do produto"
             ),
             dbc.Button("Salvar Exclusões", id="btn-salvar-exclusoes", color="danger", className="mt-3 mb-3"),
             html.Div(id="div-status-salvar-exclusoes", className="mt-2"),
@@ -0,0 +1,39 @@
+from dash import html, dcc
+import dash_bootstrap_components as dbc
+from modules.config_manager import carregar_configuracoes_instrumentacao
+
+# De quanto em quanto tempo a tabela de medições é atualizada enquanto a aba está aberta
+INTERVALO_ATUALIZACAO_DIAGNOSTICO_MS = 5 * 1000
+
+def criar_conteudo_aba_diagnostico():
+    """
+    Cria a aba de Diagnóstico: tempos, tamanho das respostas e (no modo detalhado) pico de
+    memória de cada callback, gráfico e trecho instrumentado, com as mesmas medições de /metrics.
+    """
+    config_instrumentacao = carregar_configuracoes_instrumentacao()
+
+    card_controles = dbc.Card(dbc.CardBody([
+        html.P([
+            "Medições das últimas requisições, das etapas mais lentas para as mais rápidas. A linha do tipo ",
+            html.Code("requisicao"), " é o tempo total da chamada ao servidor (callback, serialização JSON e o "
+            "restante do Dash) e o tamanho da resposta enviada ao navegador. As mesmas medições ficam em ",
+            html.A(html.Code("/metrics"), href="/metrics", target="_blank"), ", no formato do Prometheus."
+        ]),
+        dbc.Row([
+            dbc.Col(dbc.Switch(
+                id="switch-instrumentacao-detalhada",
+                label="Modo detalhado (pico de memória e tamanho das figuras; deixa as respostas mais lentas)",
+                value=config_instrumentacao["instrumentacao_detalhada"],
+            ), md=8),
+            dbc.Col(dbc.Button("Limpar medições", id="btn-limpar-metricas", color="secondary", outline=True, size="sm"),
+                    md=4, className="text-md-end"),
+        ], className="align-items-center"),
+    ]), className="shadow-sm mb-3")
+
+    layout = html.Div([
+        html.H4("Diagnóstico de Desempenho", className="mt-4 mb-3"),
+        card_controles,
+        dcc.Interval(id="intervalo-atualizacao-diagnostico", interval=INTERVALO_ATUALIZACAO_DIAGNOSTICO_MS, disabled=True),
+        html.Div(id="conteudo-dinamico-aba-diagnostico")
+    ])
+    return layout
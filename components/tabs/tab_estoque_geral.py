@@ -2,6 +2,19 @@ import pandas as pd
 import dash_bootstrap_components as dbc
 from dash import html, dcc
 from ..tables.table1 import criar_tabela_estoque # Mantenha o seu import correto
+from modules.data_loader import serie_numerica
+from modules.consulta_tabelas import ORIGEM_ESTOQUE
+from modules.exportacao import formatos_disponiveis, FORMATO_XLSX, FORMATO_CSV, FORMATO_PARQUET
+
+ROTULOS_FORMATOS_EXPORTACAO = {
+    FORMATO_XLSX: ("bi bi-file-earmark-excel-fill", "Excel"),
+    FORMATO_CSV: ("bi bi-filetype-csv", "CSV"),
+    FORMATO_PARQUET: ("bi bi-file-earmark-binary", "Parquet"),
+}
+
+def id_link_exportacao_estoque(formato):
+    """ID do botão que baixa os produtos filtrados no formato indicado (href definido por callback)."""
+    return f"link-exportar-estoque-{formato}"
 
 def criar_conteudo_aba_estoque_geral(df_completo, page_size_tabela=20):
     '''
@@ -11,7 +24,7 @@ def criar_conteudo_aba_estoque_geral(df_completo, page_size_tabela=20):
     '''
     if not df_completo.empty:
         total_skus_inicial = df_completo['Código'].nunique()
-        qtd_total_estoque_inicial = pd.to_numeric(df_completo['Estoque'], errors='coerce').fillna(0).sum()
+        qtd_total_estoque_inicial = serie_numerica(df_completo['Estoque']).fillna(0).sum()
         num_categorias_inicial = df_completo['Categoria'].nunique()
         num_grupos_inicial = df_completo['Grupo'].nunique()
         opcoes_categoria = [{'label': str(cat), 'value': str(cat)} for cat in sorted(df_completo['Categoria'].dropna().unique())]
@@ -26,6 +39,14 @@ def criar_conteudo_aba_estoque_geral(df_completo, page_size_tabela=20):
         html.Div([dbc.Label("Categoria:", className="fw-bold"), dcc.Dropdown(id='dropdown-categoria-filtro', options=opcoes_categoria, value=None, multi=False, placeholder="Todas as Categorias")], className="mb-3"),
         html.Div([dbc.Label("Nome do Produto:", className="fw-bold"), dcc.Input(id='input-nome-produto-filtro', type='text', placeholder='Buscar por nome...', debounce=True, className="form-control")], className="mb-3"),
         dbc.Button("Resetar Todos os Filtros", id="btn-resetar-filtros", color="warning", outline=True, className="w-100 mb-4"),
+        html.Div([
+            dbc.Label("Exportar produtos filtrados:", className="fw-bold"),
+            dbc.ButtonGroup([
+                dbc.Button([html.I(className=f"{ROTULOS_FORMATOS_EXPORTACAO[formato][0]} me-2"), ROTULOS_FORMATOS_EXPORTACAO[formato][1]],
+                           id=id_link_exportacao_estoque(formato), external_link=True, color="warning", size="sm")
+                for formato in formatos_disponiveis()
+            ], className="w-100"),
+        ], className="mb-3"),
     ])
 
     botao_toggle_filtros_offcanvas = dbc.Button(
@@ -69,10 +90,7 @@ def criar_conteudo_aba_estoque_geral(df_completo, page_size_tabela=20):
     grafico_cat_estoque_baixo_card = dbc.Card([dbc.CardBody(dcc.Graph(id='grafico-categorias-estoque-baixo-visao-geral', config={'displayModeBar': False}))], className="shadow-sm")
 
     df_para_tabela_dash = df_completo if not df_completo.empty else pd.DataFrame()
-    tabela_estoque_principal_componente = criar_tabela_estoque(df_para_tabela_dash, page_size=page_size_tabela)
-
-    botao_exportar_excel = dbc.Button([html.I(className="bi bi-file-earmark-excel-fill me-2"), "Exportar para Excel"], id="btn-exportar-tabela-geral", color="warning", className="mb-2 mt-2", size="sm")
-    download_component = dcc.Download(id="download-tabela-geral-excel")
+    tabela_estoque_principal_componente = criar_tabela_estoque(df_para_tabela_dash, page_size=page_size_tabela, consulta={'origem': ORIGEM_ESTOQUE})
 
     # --- Modais (sem alterações no layout) ---
     modal_grafico_donut = dbc.Modal([dbc.ModalHeader(dbc.ModalTitle("Participação dos Top 7 Produtos no Estoque")), dbc.ModalBody(dcc.Graph(id='grafico-donut-modal', style={'height': '65vh'})), dbc.ModalFooter(dbc.Button("Fechar", id="btn-fechar-modal-donut", className="ms-auto", n_clicks=0, color="warning"))], id="modal-grafico-donut-popup", size="xl", is_open=False, centered=True)
@@ -126,12 +144,6 @@ def criar_conteudo_aba_estoque_geral(df_completo, page_size_tabela=20):
         #    dbc.Col(tabela_estoque_principal_componente, width=12)
         #]),
 
-        # --- Linha 6: Botão de Exportar ---
-        #dbc.Row([
-        #    dbc.Col(botao_exportar_excel, width="auto")
-        #], className="mt-2 justify-content-start"), # mt-2 para uma pequena margem superior
-
-        download_component,
         modal_grafico_donut,
         modal_grafico_niveis,
         store_dados_filtrados_modais
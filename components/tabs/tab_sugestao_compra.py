@@ -0,0 +1,50 @@
+from dash import html, dcc
+import dash_bootstrap_components as dbc
+from modules.config_manager import carregar_configuracoes_sugestao_compra, VALORES_PADRAO_SUGESTAO_COMPRA
+
+def criar_conteudo_aba_sugestao_compra():
+    """
+    Cria a aba de Sugestão de Compra: parâmetros (horizonte e estoque de segurança, em dias
+    de venda) e o contêiner do resultado, carregado por um callback quando a aba é aberta.
+    """
+    config_sugestao = carregar_configuracoes_sugestao_compra()
+
+    card_parametros = dbc.Card(dbc.CardBody([
+        html.P(
+            "A quantidade sugerida cobre a venda média diária durante o horizonte de compra mais o "
+            "estoque de segurança, descontando o estoque atual. A ruptura prevista é a data do estoque "
+            "do relatório somada aos dias de cobertura."
+        ),
+        dbc.Row([
+            dbc.Col([
+                dbc.Label("Horizonte de compra (dias):", html_for="input-horizonte-sugestao-compra", className="fw-bold"),
+                dcc.Input(
+                    id="input-horizonte-sugestao-compra", type="number",
+                    placeholder=f"Padrão: {VALORES_PADRAO_SUGESTAO_COMPRA['horizonte_compra_dias']}",
+                    min=1, step=1, value=config_sugestao["horizonte_compra_dias"],
+                    className="form-control mb-2", style={'maxWidth': '150px'}
+                ),
+            ], md=4),
+            dbc.Col([
+                dbc.Label("Estoque de segurança (dias):", html_for="input-seguranca-sugestao-compra", className="fw-bold"),
+                dcc.Input(
+                    id="input-seguranca-sugestao-compra", type="number",
+                    placeholder=f"Padrão: {VALORES_PADRAO_SUGESTAO_COMPRA['estoque_seguranca_dias']}",
+                    min=0, step=1, value=config_sugestao["estoque_seguranca_dias"],
+                    className="form-control mb-2", style={'maxWidth': '150px'}
+                ),
+            ], md=4),
+            dbc.Col(
+                dbc.Button("Salvar e Recalcular", id="btn-salvar-sugestao-compra", color="primary", className="mt-md-4"),
+                md=4
+            ),
+        ], className="mb-2"),
+        html.Div(id="div-status-sugestao-compra", className="mt-2"),
+    ]), className="shadow-sm mb-3")
+
+    layout = html.Div([
+        html.H4("Sugestão de Compra", className="mt-4 mb-3"),
+        card_parametros,
+        html.Div(id="conteudo-dinamico-aba-sugestao-compra")
+    ])
+    return layout
@@ -0,0 +1,89 @@
+"""
+Configuração do gunicorn para produção (Linux/macOS; o gunicorn não roda no Windows).
+
+Uso (a partir da raiz do projeto):
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Variáveis de ambiente opcionais:
+    DASHESTOQUE_BIND      endereço:porta (padrão 127.0.0.1:8050)
+    DASHESTOQUE_WORKERS   número de processos (padrão: número de CPUs)
+    DASHESTOQUE_THREADS   threads por processo (padrão 4)
+
+Memória: com preload_app o processo mestre importa o wsgi.py (lê o relatório, monta o índice de
+busca, as máscaras de exclusão e o cubo de agregados) e só então cria os workers por fork, que
+compartilham essas páginas com o mestre enquanto não as alteram. As colunas numéricas vindas do
+cache de snapshots já são arquivos mapeados em memória (compartilhados pelo cache de páginas do
+sistema); o restante (colunas de texto, índice de busca) é compartilhado por cópia sob demanda.
+O gc.freeze() antes de cada fork tira esses objetos das varreduras do coletor de lixo, que de
+outro modo escreveria nos cabeçalhos de todos eles e copiaria as páginas para cada worker. No
+glibc, o limite fixo de mmap faz os arrays temporários dos callbacks irem para mapeamentos
+próprios em vez de reaproveitar o heap do mestre (o que também copiaria páginas compartilhadas).
+Assim o consumo total cresce pouco a cada worker adicionado, em vez de uma cópia dos dados por worker.
+
+Novos relatórios: o monitor de data/ roda só no mestre. Ao publicar uma nova versão dos dados,
+ele envia SIGHUP ao próprio mestre, que cria workers novos a partir do estado atualizado e encerra
+os antigos depois de terminarem as requisições em andamento. As páginas abertas percebem a nova
+versão pelo intervalo de verificação.
+
+Exclusões salvas em um worker não recriam os workers: cada processo percebe a gravação pela
+assinatura do arquivo de configuração na próxima requisição e reaplica as exclusões localmente
+(obter_dataset_efetivo), mantendo seus caches.
+"""
+import ctypes
+import gc
+import multiprocessing
+import os
+import signal
+
+# Lida pelo wsgi.py: o monitor de data/ é iniciado aqui (when_ready), não em cada worker
+os.environ["DASHESTOQUE_MONITOR_NO_MESTRE"] = "1"
+# O preload só faz sentido com os dados já carregados antes do fork: sem início rápido
+os.environ["DASHESTOQUE_INICIO_RAPIDO"] = "0"
+
+# mallopt(M_MMAP_THRESHOLD): alocações a partir deste tamanho sempre usam mmap. Sem um valor fixo
+# o glibc sobe o limite depois que o mestre libera os buffers da leitura do relatório
+M_MMAP_THRESHOLD = -3
+LIMITE_MMAP_BYTES = 128 * 1024
+try:
+    ctypes.CDLL("libc.so.6").mallopt(M_MMAP_THRESHOLD, LIMITE_MMAP_BYTES)
+except (OSError, AttributeError):
+    pass  # Outra libc (macOS, musl): segue com o alocador padrão
+
+bind = os.environ.get("DASHESTOQUE_BIND", "127.0.0.1:8050")
+workers = int(os.environ.get("DASHESTOQUE_WORKERS", multiprocessing.cpu_count()))
+# O Dash dispara vários callbacks em paralelo por página; threads dividem a memória do worker
+worker_class = "gthread"
+threads = int(os.environ.get("DASHESTOQUE_THREADS", 4))
+preload_app = True
+# A primeira montagem de alguns gráficos sobre relatórios grandes passa do padrão de 30 s
+timeout = 120
+graceful_timeout = 60
+
+# Versão dos dados com que os workers atuais foram criados
+_versao_dados_workers = None
+
+def _recriar_workers(dataset):
+    """
+    Chamado pelo monitor (no mestre) a cada publicação: prepara o dataset novo e recria os workers.
+    Se só as exclusões mudaram (mesma versão dos dados), os workers já as reaplicam sozinhos.
+    """
+    global _versao_dados_workers
+    if dataset.versao_dados == _versao_dados_workers:
+        return
+    _versao_dados_workers = dataset.versao_dados
+    from wsgi import preaquecer_dataset
+    preaquecer_dataset(dataset)
+    # Objetos congelados no fork anterior (o dataset antigo) voltam a poder ser coletados
+    gc.unfreeze()
+    gc.collect()
+    os.kill(os.getpid(), signal.SIGHUP)
+
+def when_ready(server):
+    global _versao_dados_workers
+    from modules.dataset_efetivo import obter_dataset_efetivo
+    from modules.monitor_relatorios import iniciar_monitor_relatorios
+    _versao_dados_workers = obter_dataset_efetivo().versao_dados
+    iniciar_monitor_relatorios(obter_dataset_efetivo().origem, ao_publicar=_recriar_workers)
+
+def pre_fork(server, worker):
+    gc.freeze()
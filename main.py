@@ -1,20 +1,67 @@
+import os
+import time
+INICIO_PROCESSO = time.perf_counter()
 from app_instance import app, server 
-from modules.data_loader import carregar_produtos_com_hierarquia
-from components.layout import criar_layout_principal
+from modules.dataset_efetivo import obter_dataset_efetivo
+from modules.inicializacao import (
+    carregar_dados_iniciais, inicio_rapido_ativo, iniciar_carga_em_segundo_plano, registrar_tempo_inicializacao, situacao_carga,
+    ETAPA_IMPORTACAO, ETAPA_LAYOUT, SITUACAO_CARREGANDO, SITUACAO_ERRO
+)
+from modules.monitor_relatorios import iniciar_monitor_relatorios
+from components.layout import criar_layout_principal, criar_layout_carregando
 from callbacks.geral_callbacks import registrar_callbacks_gerais
-caminho_arquivo_csv = "data/DAMI29-05.CSV"
-df_visualizar_global = carregar_produtos_com_hierarquia(caminho_arquivo_csv)
-registrar_callbacks_gerais(df_visualizar_global) 
+from callbacks.tabelas_callbacks import registrar_callbacks_tabelas
+from callbacks.sugestao_compra_callbacks import registrar_callbacks_sugestao_compra
+from callbacks.diagnostico_callbacks import registrar_callbacks_diagnostico
+from callbacks.exportacao_callbacks import registrar_callbacks_exportacao
+from callbacks.inicializacao_callbacks import registrar_callbacks_inicializacao
+registrar_tempo_inicializacao(ETAPA_IMPORTACAO, time.perf_counter() - INICIO_PROCESSO)
 
-app.layout = criar_layout_principal(
-    df_completo=df_visualizar_global,
-    nome_arquivo=caminho_arquivo_csv,
-    page_size_tabela=20
-)
+# Ingere no histórico os relatórios novos de data/ e abre o de data de estoque mais recente.
+# No início rápido (DASHESTOQUE_INICIO_RAPIDO=1) isso acontece em segundo plano, depois de o
+# servidor abrir a porta, e até lá as páginas recebem o layout de "carregando".
+INICIO_RAPIDO = inicio_rapido_ativo()
+if not INICIO_RAPIDO:
+    carregar_dados_iniciais()
+registrar_callbacks_gerais()
+registrar_callbacks_tabelas()
+registrar_callbacks_sugestao_compra()
+registrar_callbacks_diagnostico()
+registrar_callbacks_exportacao()
+registrar_callbacks_inicializacao()
+
+def criar_layout_atual():
+    """Layout montado a cada carregamento da página, com a versão dos dados publicada no momento."""
+    if situacao_carga()[0] in (SITUACAO_CARREGANDO, SITUACAO_ERRO):
+        return criar_layout_carregando()
+    inicio = time.perf_counter()
+    dataset = obter_dataset_efetivo()
+    layout = criar_layout_principal(
+        df_completo=dataset.df_base,
+        nome_arquivo=dataset.origem,
+        page_size_tabela=20,
+        versao_dados=dataset.versao_dados
+    )
+    registrar_tempo_inicializacao(ETAPA_LAYOUT, time.perf_counter() - inicio)
+    return layout
+
+app.layout = criar_layout_atual
 
 if __name__ == '__main__':
-    if df_visualizar_global is not None and not df_visualizar_global.empty:
+    # No modo debug o reloader do Werkzeug executa este módulo também no processo que só vigia
+    # o código-fonte; a carga em segundo plano e o monitor de data/ rodam apenas no processo que
+    # atende as requisições. Em produção quem os inicia é o wsgi.py (ou o gunicorn.conf.py).
+    processo_servidor = os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+    if INICIO_RAPIDO:
+        if processo_servidor:
+            iniciar_carga_em_segundo_plano(ao_concluir=lambda dataset: iniciar_monitor_relatorios(dataset.origem))
+            print(f"Início rápido: servidor Dash iniciando {time.perf_counter() - INICIO_PROCESSO:.2f} s após o início; "
+                  "os dados são carregados em segundo plano.")
+        app.run(debug=True, host='127.0.0.1', port=8050)
+    elif not obter_dataset_efetivo().vazio:
+        if processo_servidor:
+            iniciar_monitor_relatorios(obter_dataset_efetivo().origem)
         print("Dados para visualização carregados com sucesso. Iniciando o servidor Dash...")
         app.run(debug=True, host='127.0.0.1', port=8050)
     else:
-        print("Não foi possível iniciar o servidor pois os dados para visualização não foram carregados ou o DataFrame está vazio.")
\ No newline at end of file
+        print("Não foi possível iniciar o servidor pois os dados para visualização não foram carregados ou o DataFrame está vazio.")
@@ -0,0 +1,87 @@
+# modules/cache_figuras.py
+import json
+import threading
+import time
+from collections import OrderedDict
+from plotly.io.json import to_json_plotly
+from modules.indice_busca import normalizar_texto_busca
+
+def normalizar_filtro_nome(nome_produto):
+    """Normaliza o texto do filtro por nome para uso em chaves de cache (o filtro ignora maiúsculas, acentos e os espaços das pontas)."""
+    if not nome_produto or nome_produto.strip() == "":
+        return ""
+    return normalizar_texto_busca(nome_produto.strip())
+
+class CacheFiguras:
+    """
+    Cache LRU com expiração (TTL) para as saídas serializadas dos callbacks de gráficos.
+
+    As saídas (figuras Plotly e componentes Dash) são guardadas já serializadas em JSON,
+    o que permite limitar o cache pelo total de bytes em `limite_bytes`. A chave deve
+    identificar tudo de que a saída depende (versão dos dados, exclusões, filtros e limites).
+    """
+
+    def __init__(self, limite_bytes, ttl_segundos):
+        self.limite_bytes = limite_bytes
+        self.ttl_segundos = ttl_segundos
+        self._entradas = OrderedDict()
+        self._bytes_em_uso = 0
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.remocoes = 0
+
+    def obter(self, chave):
+        """Retorna a saída desserializada guardada para `chave`, ou None."""
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self.falhas += 1
+                return None
+            criado_em, serializado = entrada
+            if time.monotonic() - criado_em > self.ttl_segundos:
+                self._remover(chave)
+                self.falhas += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+        return json.loads(serializado)
+
+    def guardar(self, chave, saida):
+        """Serializa e guarda `saida`; retorna a própria saída para facilitar o uso no callback."""
+        serializado = to_json_plotly(saida)
+        tamanho = len(serializado)
+        if tamanho > self.limite_bytes:
+            return saida
+        with self._lock:
+            if chave in self._entradas:
+                self._remover(chave)
+            self._entradas[chave] = (time.monotonic(), serializado)
+            self._bytes_em_uso += tamanho
+            while self._bytes_em_uso > self.limite_bytes:
+                chave_mais_antiga = next(iter(self._entradas))
+                self._remover(chave_mais_antiga)
+                self.remocoes += 1
+        return saida
+
+    def _remover(self, chave):
+        _, serializado = self._entradas.pop(chave)
+        self._bytes_em_uso -= len(serializado)
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes_em_uso = 0
+
+    def estatisticas(self):
+        with self._lock:
+            total_consultas = self.acertos + self.falhas
+            return {
+                "entradas": len(self._entradas),
+                "bytes_em_uso": self._bytes_em_uso,
+                "limite_bytes": self.limite_bytes,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "remocoes": self.remocoes,
+                "taxa_acerto": (self.acertos / total_consultas) if total_consultas else 0.0,
+            }
@@ -1,5 +1,8 @@
+import copy
 import json
 import os
+import tempfile
+import threading
 
 CONFIG_FILE_PATH = "dashboard_config.json"
 VALORES_PADRAO_NIVEIS = {
@@ -11,29 +14,95 @@ VALORES_PADRAO_EXCLUSAO = {
     "excluir_categorias": [],
     "excluir_produtos_codigos": []
 }
+VALORES_PADRAO_CACHE_FIGURAS = {
+    "cache_figuras_limite_mb": 64,
+    "cache_figuras_ttl_segundos": 900
+}
+VALORES_PADRAO_SUGESTAO_COMPRA = {
+    "horizonte_compra_dias": 30,
+    "estoque_seguranca_dias": 7
+}
+VALORES_PADRAO_INSTRUMENTACAO = {
+    "instrumentacao_ativa": True,
+    "instrumentacao_detalhada": False,
+    "metricas_apenas_local": True
+}
 
-def _carregar_config_completa():
-    """Função auxiliar para carregar todo o JSON de configuração."""
-    if not os.path.exists(CONFIG_FILE_PATH):
-        return {**VALORES_PADRAO_NIVEIS, **VALORES_PADRAO_EXCLUSAO}
+# Cache do JSON de configuração compartilhado pelas threads do servidor.
+# A assinatura (mtime, inode, tamanho) detecta alterações feitas por fora deste processo.
+_lock_config = threading.RLock()
+_cache_config = {"assinatura": None, "dados": None}
+
+def _assinatura_arquivo_config():
     try:
-        with open(CONFIG_FILE_PATH, 'r') as f:
-            config = json.load(f)
-        return config
-    except (json.JSONDecodeError, Exception) as e:
-        print(f"Erro ao ler arquivo de configuração '{CONFIG_FILE_PATH}': {e}. Usando todos os padrões.")
-        return {**VALORES_PADRAO_NIVEIS, **VALORES_PADRAO_EXCLUSAO}
+        estado = os.stat(CONFIG_FILE_PATH)
+    except OSError:
+        return None
+    return (estado.st_mtime_ns, estado.st_ino, estado.st_size)
+
+def assinatura_config():
+    """
+    Assinatura (mtime, inode, tamanho) do arquivo de configuração, ou None se ele não existe.
+    Muda a cada gravação, inclusive as feitas por outros processos (workers do gunicorn).
+    """
+    return _assinatura_arquivo_config()
+
+def _carregar_config_completa():
+    """Função auxiliar para carregar todo o JSON de configuração (com cache em memória)."""
+    with _lock_config:
+        assinatura = _assinatura_arquivo_config()
+        if assinatura is None:
+            return {**VALORES_PADRAO_NIVEIS, **VALORES_PADRAO_EXCLUSAO}
+        if assinatura == _cache_config["assinatura"]:
+            return copy.deepcopy(_cache_config["dados"])
+        try:
+            with open(CONFIG_FILE_PATH, 'r') as f:
+                config = json.load(f)
+            _cache_config["assinatura"] = assinatura
+            _cache_config["dados"] = config
+            return copy.deepcopy(config)
+        except (json.JSONDecodeError, Exception) as e:
+            print(f"Erro ao ler arquivo de configuração '{CONFIG_FILE_PATH}': {e}. Usando todos os padrões.")
+            return {**VALORES_PADRAO_NIVEIS, **VALORES_PADRAO_EXCLUSAO}
 
 def _salvar_config_completa(config_data):
-    """Função auxiliar para salvar todo o JSON de configuração."""
-    try:
-        with open(CONFIG_FILE_PATH, 'w') as f:
-            json.dump(config_data, f, indent=4)
-        print(f"Configurações salvas em '{CONFIG_FILE_PATH}'")
-        return True
-    except Exception as e:
-        print(f"Erro inesperado ao salvar configuração completa: {e}")
-        return False
+    """
+    Função auxiliar para salvar todo o JSON de configuração.
+    Grava em um arquivo temporário no mesmo diretório e o renomeia sobre o original,
+    para que nenhum leitor (thread ou processo) veja o arquivo pela metade.
+    """
+    with _lock_config:
+        caminho_temporario = None
+        try:
+            diretorio = os.path.dirname(os.path.abspath(CONFIG_FILE_PATH))
+            with tempfile.NamedTemporaryFile('w', dir=diretorio, prefix=".config-", suffix=".tmp", delete=False) as f:
+                caminho_temporario = f.name
+                json.dump(config_data, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            # O arquivo temporário nasce com permissão 0600; mantém a do arquivo original
+            if os.path.exists(CONFIG_FILE_PATH):
+                os.chmod(caminho_temporario, os.stat(CONFIG_FILE_PATH).st_mode & 0o777)
+            os.replace(caminho_temporario, CONFIG_FILE_PATH)
+            _cache_config["assinatura"] = _assinatura_arquivo_config()
+            _cache_config["dados"] = copy.deepcopy(config_data)
+            print(f"Configurações salvas em '{CONFIG_FILE_PATH}'")
+            return True
+        except Exception as e:
+            print(f"Erro inesperado ao salvar configuração completa: {e}")
+            if caminho_temporario and os.path.exists(caminho_temporario):
+                os.remove(caminho_temporario)
+            return False
+
+def _atualizar_config_completa(valores):
+    """
+    Lê a configuração, altera as chaves de `valores` e grava, tudo sob _lock_config: dois
+    salvamentos simultâneos (por exemplo, níveis e exclusões) não apagam as chaves um do outro.
+    """
+    with _lock_config:
+        config_completa = _carregar_config_completa()
+        config_completa.update(valores)
+        return _salvar_config_completa(config_completa)
 
 def carregar_definicoes_niveis_estoque():
     config_completa = _carregar_config_completa()
@@ -60,11 +129,7 @@ def salvar_definicoes_niveis_estoque(limite_baixo, limite_medio):
         if val_limite_medio <= val_limite_baixo:
             return False, "Limite para Estoque Médio deve ser maior que o Limite para Estoque Baixo."
 
-        config_completa = _carregar_config_completa()
-        config_completa["limite_estoque_baixo"] = val_limite_baixo
-        config_completa["limite_estoque_medio"] = val_limite_medio
-        
-        if _salvar_config_completa(config_completa):
+        if _atualizar_config_completa({"limite_estoque_baixo": val_limite_baixo, "limite_estoque_medio": val_limite_medio}):
             return True, "Definições de níveis de estoque salvas com sucesso!"
         else:
             return False, "Falha ao salvar o arquivo de configuração."
@@ -99,16 +164,69 @@ def salvar_configuracoes_exclusao(grupos_excluir, categorias_excluir, produtos_c
         lista_categorias = [str(c) for c in lista_categorias]
         lista_produtos_codigos = [str(p) for p in lista_produtos_codigos]
 
-        config_completa = _carregar_config_completa()
-        config_completa["excluir_grupos"] = lista_grupos
-        config_completa["excluir_categorias"] = lista_categorias
-        config_completa["excluir_produtos_codigos"] = lista_produtos_codigos
-
-        if _salvar_config_completa(config_completa):
+        if _atualizar_config_completa({"excluir_grupos": lista_grupos,
+                                       "excluir_categorias": lista_categorias,
+                                       "excluir_produtos_codigos": lista_produtos_codigos}):
             return True, "Configurações de exclusão salvas com sucesso!"
         else:
             return False, "Falha ao salvar o arquivo de configuração."
 
     except Exception as e:
         print(f"Erro inesperado ao salvar configurações de exclusão: {e}")
-        return False, f"Erro inesperado ao salvar exclusões: {str(e)}"
\ No newline at end of file
+        return False, f"Erro inesperado ao salvar exclusões: {str(e)}"
+
+def carregar_configuracoes_cache_figuras():
+    """Carrega o limite de memória (MB) e o TTL (segundos) do cache de figuras; usa os padrões se ausentes ou inválidos."""
+    config_completa = _carregar_config_completa()
+    config_cache = {}
+    for chave, valor_padrao in VALORES_PADRAO_CACHE_FIGURAS.items():
+        try:
+            valor = float(config_completa.get(chave, valor_padrao))
+            config_cache[chave] = valor if valor >= 0 else valor_padrao
+        except (ValueError, TypeError):
+            config_cache[chave] = valor_padrao
+    return config_cache
+
+def carregar_configuracoes_instrumentacao():
+    """
+    Carrega as opções de instrumentação: medições ligadas, modo detalhado (tracemalloc e tamanho
+    das figuras) e se /metrics só responde a requisições locais; usa os padrões se ausentes ou inválidos.
+    """
+    config_completa = _carregar_config_completa()
+    config_instrumentacao = {}
+    for chave, valor_padrao in VALORES_PADRAO_INSTRUMENTACAO.items():
+        valor = config_completa.get(chave, valor_padrao)
+        config_instrumentacao[chave] = valor if isinstance(valor, bool) else valor_padrao
+    return config_instrumentacao
+
+def carregar_configuracoes_sugestao_compra():
+    """Carrega o horizonte de compra e o estoque de segurança (em dias de venda); usa os padrões se ausentes ou inválidos."""
+    config_completa = _carregar_config_completa()
+    config_sugestao = {}
+    for chave, valor_padrao in VALORES_PADRAO_SUGESTAO_COMPRA.items():
+        try:
+            valor = int(config_completa.get(chave, valor_padrao))
+            config_sugestao[chave] = valor if valor >= 0 else valor_padrao
+        except (ValueError, TypeError):
+            config_sugestao[chave] = valor_padrao
+    return config_sugestao
+
+def salvar_configuracoes_sugestao_compra(horizonte_dias, estoque_seguranca_dias):
+    try:
+        val_horizonte = int(horizonte_dias)
+        val_seguranca = int(estoque_seguranca_dias)
+
+        if val_horizonte <= 0:
+            return False, "O horizonte de compra deve ser de pelo menos 1 dia."
+        if val_seguranca < 0:
+            return False, "O estoque de segurança não pode ser negativo."
+
+        if _atualizar_config_completa({"horizonte_compra_dias": val_horizonte, "estoque_seguranca_dias": val_seguranca}):
+            return True, "Parâmetros da sugestão de compra salvos com sucesso!"
+        else:
+            return False, "Falha ao salvar o arquivo de configuração."
+
+    except (ValueError, TypeError):
+        return False, "Valores inválidos. Horizonte e estoque de segurança devem ser números inteiros de dias."
+    except Exception as e:
+        return False, f"Erro inesperado ao salvar a sugestão de compra: {str(e)}"
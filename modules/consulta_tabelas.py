@@ -0,0 +1,223 @@
+# modules/consulta_tabelas.py
+import json
+import math
+import operator
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from modules.data_loader import serie_numerica, colunas_float32_para_float64
+from modules.dataset_efetivo import obter_dataset_efetivo
+from modules.inventory_manager import identificar_produtos_estoque_baixo, identificar_produtos_em_falta
+from modules.reorder_engine import obter_produtos_sugestao, sugerir_compras, sugestao_compra_dataset, tabela_sugestao_compra
+
+# Origens de dados das tabelas paginadas no servidor (chave 'origem' da consulta)
+ORIGEM_ESTOQUE = "estoque"
+ORIGEM_ESTOQUE_BAIXO = "estoque_baixo"
+ORIGEM_EM_FALTA = "em_falta"
+ORIGEM_NIVEL = "nivel"
+ORIGEM_SUGESTAO_COMPRA = "sugestao_compra"
+# Memória total das posições de linhas guardadas por consulta (ver _posicoes_consulta)
+MAX_BYTES_CONSULTAS_EM_MEMORIA = 32 * 1024 * 1024
+
+# Expressão "{Coluna} operador valor" gerada pelo filter_query das DataTables. Como no filtro
+# nativo, o prefixo "i" torna o operador insensível a maiúsculas e "s" (ou nenhum) sensível
+REGEX_CONDICAO_FILTRO = re.compile(
+    r'^\s*\{(?P<coluna>[^}]+)\}\s*'
+    r'(?P<operador>datestartswith\b|(?:i|s)?(?:>=|<=|!=|=|<|>|contains\b|(?:eq|ne|lt|le|gt|ge)\b))\s*'
+    r'(?P<valor>.*?)\s*$',
+    re.IGNORECASE
+)
+OPERADORES_COMPARACAO = {
+    '=': operator.eq, 'eq': operator.eq, '!=': operator.ne, 'ne': operator.ne,
+    '<': operator.lt, 'lt': operator.lt, '<=': operator.le, 'le': operator.le,
+    '>': operator.gt, 'gt': operator.gt, '>=': operator.ge, 'ge': operator.ge,
+}
+
+_lock_consultas = threading.Lock()
+_consultas_recentes = OrderedDict()
+_bytes_consultas = 0
+
+def _interpretar_valor_filtro(texto_valor, aceitar_numero=True):
+    """Remove aspas do valor digitado no filtro; valores sem aspas que parecem números viram float."""
+    if len(texto_valor) >= 2 and texto_valor[0] == texto_valor[-1] and texto_valor[0] in ('"', "'", '`'):
+        return texto_valor[1:-1].replace('\\' + texto_valor[0], texto_valor[0])
+    if not aceitar_numero:
+        return texto_valor
+    try:
+        return float(texto_valor.replace(',', '.'))
+    except ValueError:
+        return texto_valor
+
+def interpretar_filter_query(filter_query):
+    """
+    Converte o filter_query de uma DataTable (ex.: "{Produto} contains skol && {Estoque} <= 10")
+    em uma lista de (coluna, operador, valor). Partes não reconhecidas são ignoradas.
+    O operador mantém o prefixo "i" (insensível a maiúsculas); o prefixo "s" é o padrão e sai.
+    """
+    condicoes = []
+    if not filter_query:
+        return condicoes
+    for parte in filter_query.split(' && '):
+        correspondencia = REGEX_CONDICAO_FILTRO.match(parte)
+        if not correspondencia or correspondencia.group('valor') == '':
+            continue
+        operador = correspondencia.group('operador').lower()
+        if operador[0] == 's' and operador != 'datestartswith':
+            operador = operador[1:]
+        operador_base = operador[1:] if operador[0] == 'i' else operador
+        valor = _interpretar_valor_filtro(correspondencia.group('valor'), aceitar_numero=operador_base in OPERADORES_COMPARACAO)
+        condicoes.append((correspondencia.group('coluna'), operador, valor))
+    return condicoes
+
+def _mascara_condicao(df, coluna, operador, valor):
+    serie = df[coluna]
+    if operador == 'datestartswith':
+        return serie.astype(str).str.startswith(str(valor), na=False)
+    insensivel = operador[0] == 'i'
+    operador = operador[1:] if insensivel else operador
+    if operador == 'contains':
+        return serie.astype(str).str.contains(str(valor), case=not insensivel, regex=False, na=False)
+    if isinstance(valor, float):
+        return OPERADORES_COMPARACAO[operador](serie_numerica(serie), valor)
+    if insensivel:
+        return OPERADORES_COMPARACAO[operador](serie.astype(str).str.casefold(), str(valor).casefold())
+    return OPERADORES_COMPARACAO[operador](serie.astype(str), str(valor))
+
+def filtrar_e_ordenar(df, filter_query=None, sort_by=None):
+    """Aplica o filter_query e o sort_by (formato das DataTables) a `df`."""
+    mascara = None
+    for coluna, operador, valor in interpretar_filter_query(filter_query):
+        if coluna not in df.columns:
+            continue
+        mascara_condicao = _mascara_condicao(df, coluna, operador, valor).to_numpy()
+        mascara = mascara_condicao if mascara is None else mascara & mascara_condicao
+    if mascara is not None:
+        df = df[mascara]
+
+    ordenacao = [criterio for criterio in (sort_by or []) if criterio.get('column_id') in df.columns]
+    if ordenacao and not df.empty:
+        df = df.sort_values(
+            by=[criterio['column_id'] for criterio in ordenacao],
+            ascending=[criterio.get('direction', 'asc') == 'asc' for criterio in ordenacao],
+            kind='mergesort', na_position='last'
+        )
+    return df
+
+def resolver_origem_tabela(consulta, dataset=None):
+    """
+    Reconstrói, a partir do dataset efetivo atual (ou de `dataset`), o DataFrame completo descrito
+    por uma consulta de tabela paginada (origem, filtros interativos, limites, nível e parâmetros da sugestão de compra).
+    """
+    dataset = dataset or obter_dataset_efetivo()
+    origem = (consulta or {}).get('origem')
+    if dataset.vazio or origem is None:
+        return pd.DataFrame()
+    if origem == ORIGEM_EM_FALTA:
+        return identificar_produtos_em_falta(dataset.df_base)
+    if origem == ORIGEM_SUGESTAO_COMPRA:
+        return tabela_sugestao_compra(sugestao_compra_dataset(dataset, consulta.get('horizonte_dias'), consulta.get('estoque_seguranca_dias')))
+
+    mascara_filtros = dataset.mascara_filtros(consulta.get('categoria'), consulta.get('grupo'), consulta.get('nome_produto'))
+    dff = dataset.aplicar_mascara(mascara_filtros)
+    if origem == ORIGEM_ESTOQUE:
+        return dff
+
+    limite_baixo = consulta.get('limite_baixo')
+    limite_medio = consulta.get('limite_medio', limite_baixo)
+    if origem == ORIGEM_ESTOQUE_BAIXO:
+        classificacao = dataset.classificar_niveis(limite_baixo, limite_medio, mascara_filtros)
+        return identificar_produtos_estoque_baixo(dff, limite_baixo, classificacao)
+    if origem == ORIGEM_NIVEL:
+        classificacao = dataset.classificar_niveis(limite_baixo, limite_medio, mascara_filtros)
+        return dff[classificacao.mascara(consulta.get('nivel'))]
+    return pd.DataFrame()
+
+def _fonte_consulta(consulta, dataset):
+    """
+    DataFrame de onde saem as linhas de uma consulta: os produtos da sugestão de compra ou o
+    `df_base` do dataset (as demais origens são recortes dele, com o mesmo índice).
+    """
+    if consulta.get('origem') == ORIGEM_SUGESTAO_COMPRA:
+        return obter_produtos_sugestao(dataset)[0]
+    return dataset.df_base
+
+def _converter_linhas(consulta, dataset, linhas):
+    """Aplica às linhas de _fonte_consulta as mesmas conversões de resolver_origem_tabela."""
+    origem = consulta.get('origem')
+    if origem == ORIGEM_EM_FALTA:
+        return linhas.assign(Estoque=serie_numerica(linhas['Estoque']))
+    if origem == ORIGEM_SUGESTAO_COMPRA:
+        cabecalho = obter_produtos_sugestao(dataset)[1]
+        df_sugestao = sugerir_compras(linhas, consulta.get('horizonte_dias'), consulta.get('estoque_seguranca_dias'),
+                                      data_estoque=cabecalho.get('data_estoque'), dias_media=cabecalho.get('dias_media'),
+                                      ordenar=False)
+        return tabela_sugestao_compra(df_sugestao, apenas_com_sugestao=False)
+    return linhas
+
+def _descartar_consultas_obsoletas(versao_dados, hash_exclusao):
+    """Remove as posições guardadas para outras versões dos dados ou exclusões (chamar com _lock_consultas)."""
+    global _bytes_consultas
+    for chave in [chave for chave in _consultas_recentes if chave[:2] != (versao_dados, hash_exclusao)]:
+        _bytes_consultas -= _consultas_recentes.pop(chave).nbytes
+
+def _posicoes_consulta(consulta, filter_query, sort_by, dataset, fonte):
+    """
+    Posições (int32, em `fonte`) das linhas da consulta já filtradas e ordenadas. Só as
+    posições ficam guardadas, por versão dos dados e exclusões, até MAX_BYTES_CONSULTAS_EM_MEMORIA
+    no total; as de versões ou exclusões anteriores são descartadas.
+    """
+    global _bytes_consultas
+    chave = (dataset.versao_dados, dataset.hash_exclusao,
+             json.dumps(consulta, sort_keys=True, ensure_ascii=False),
+             filter_query or '', json.dumps(sort_by or [], sort_keys=True))
+    with _lock_consultas:
+        _descartar_consultas_obsoletas(dataset.versao_dados, dataset.hash_exclusao)
+        posicoes = _consultas_recentes.get(chave)
+        if posicoes is not None:
+            _consultas_recentes.move_to_end(chave)
+            return posicoes
+
+    resultado = filtrar_e_ordenar(resolver_origem_tabela(consulta, dataset), filter_query, sort_by)
+    posicoes = fonte.index.get_indexer(resultado.index).astype(np.int32)
+    if posicoes.nbytes > MAX_BYTES_CONSULTAS_EM_MEMORIA:
+        return posicoes
+    with _lock_consultas:
+        _descartar_consultas_obsoletas(dataset.versao_dados, dataset.hash_exclusao)
+        if chave not in _consultas_recentes:
+            _consultas_recentes[chave] = posicoes
+            _bytes_consultas += posicoes.nbytes
+        while _bytes_consultas > MAX_BYTES_CONSULTAS_EM_MEMORIA:
+            _, posicoes_antigas = _consultas_recentes.popitem(last=False)
+            _bytes_consultas -= posicoes_antigas.nbytes
+    return posicoes
+
+def registros_pagina(df, pagina_atual, tamanho_pagina, colunas=None):
+    """Converte apenas as linhas da página pedida em registros para a DataTable."""
+    inicio = max(0, int(pagina_atual or 0)) * tamanho_pagina
+    df_pagina = df.iloc[inicio:inicio + tamanho_pagina]
+    if colunas:
+        df_pagina = df_pagina[[coluna for coluna in colunas if coluna in df_pagina.columns]]
+    return colunas_float32_para_float64(df_pagina).to_dict('records')
+
+def contar_paginas(total_linhas, tamanho_pagina):
+    return max(1, math.ceil(total_linhas / tamanho_pagina))
+
+def consultar_pagina(consulta, pagina_atual, tamanho_pagina, sort_by=None, filter_query=None):
+    """
+    Retorna (registros da página, número de páginas, total de linhas) de uma tabela paginada
+    no servidor. Só as `tamanho_pagina` linhas da página são copiadas, convertidas e enviadas
+    ao navegador.
+    """
+    consulta = consulta or {}
+    dataset = obter_dataset_efetivo()
+    fonte = _fonte_consulta(consulta, dataset)
+    posicoes = _posicoes_consulta(consulta, filter_query, sort_by, dataset, fonte)
+    inicio = max(0, int(pagina_atual or 0)) * tamanho_pagina
+    posicoes_pagina = posicoes[inicio:inicio + tamanho_pagina]
+    registros = []
+    if len(posicoes_pagina):
+        linhas = _converter_linhas(consulta, dataset, fonte.iloc[posicoes_pagina])
+        registros = registros_pagina(linhas, 0, tamanho_pagina, consulta.get('colunas'))
+    return registros, contar_paginas(len(posicoes), tamanho_pagina), len(posicoes)
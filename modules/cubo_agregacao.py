@@ -0,0 +1,142 @@
+# modules/cubo_agregacao.py
+import numpy as np
+import pandas as pd
+from modules.data_loader import serie_numerica, CASAS_DECIMAIS_FLOAT32
+from modules.inventory_manager import QUANTIDADE_NIVEIS
+
+# Medida somada em cada célula do cubo -> coluna do DataFrame de produtos
+MEDIDAS_SOMADAS_CUBO = {'estoque': 'Estoque', 'venda': 'VendaMensal', 'custo': 'CustoEstoque'}
+MEDIDA_SKUS = 'skus'
+
+def _codificar_dimensao(serie):
+    """
+    Códigos inteiros (-1 = ausente) e nomes ordenados de uma coluna de texto.
+    Colunas Categorical com categorias já ordenadas (esquema compacto) reaproveitam os códigos.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype) and serie.cat.categories.is_monotonic_increasing:
+        return serie.cat.codes.to_numpy(dtype='int64'), serie.cat.categories
+    codigos, nomes = pd.factorize(serie, sort=True)
+    return codigos.astype('int64', copy=False), pd.Index(nomes)
+
+def _contar_presentes(codigos_celulas, quantidade_nomes):
+    """Quantos códigos distintos (ignorando ausentes) aparecem nas células."""
+    return int(np.count_nonzero(np.bincount(codigos_celulas[codigos_celulas >= 0], minlength=quantidade_nomes)))
+
+def _arredondar_soma(valores):
+    """
+    Os valores do relatório têm no máximo CASAS_DECIMAIS_FLOAT32 casas decimais; arredondar
+    as somas descarta o erro de ponto flutuante que depende da ordem em que as células são somadas.
+    """
+    return np.round(valores, CASAS_DECIMAIS_FLOAT32)
+
+class CuboAgregacao:
+    """
+    Agregados do DataFrame de produtos por célula (Grupo, Categoria, nível de estoque):
+    número de SKUs (uma linha de produto do relatório por SKU) e somas de estoque, venda
+    mensal e custo do estoque. Só as células com produtos são guardadas.
+
+    Construído uma vez por dataset e por combinação de limites (DatasetEfetivo.cubo_agregacao).
+    Recortar por categoria ou grupo filtra apenas as células; os totais por grupo, por
+    categoria e os cards de resumo saem de bincounts sobre as células, sem percorrer os produtos.
+    """
+
+    def __init__(self, nomes_grupos, nomes_categorias, grupo, categoria, nivel, skus, somas):
+        self.nomes_grupos = nomes_grupos
+        self.nomes_categorias = nomes_categorias
+        self.grupo = grupo
+        self.categoria = categoria
+        self.nivel = nivel
+        self.skus = skus
+        self.somas = somas
+
+    @classmethod
+    def construir(cls, df, codigos_niveis):
+        """
+        Agrega `df` pelas células (Grupo, Categoria, nível), com o código de nível de cada
+        linha vindo de uma ClassificacaoNiveisEstoque (`codigos_niveis`, alinhado a `df`).
+        """
+        codigos_grupos, nomes_grupos = _codificar_dimensao(df['Grupo'])
+        codigos_categorias, nomes_categorias = _codificar_dimensao(df['Categoria'])
+
+        # Identificador único da célula; os ausentes (-1) viram a posição 0 de cada dimensão
+        num_categorias = len(nomes_categorias) + 1
+        ids_linhas = ((codigos_grupos + 1) * num_categorias + (codigos_categorias + 1)) * QUANTIDADE_NIVEIS
+        ids_linhas += np.asarray(codigos_niveis, dtype='int64')
+        celula_da_linha, ids_celulas = pd.factorize(ids_linhas)
+        ids_celulas = np.asarray(ids_celulas, dtype='int64')
+        num_celulas = len(ids_celulas)
+
+        somas = {}
+        for medida, coluna in MEDIDAS_SOMADAS_CUBO.items():
+            if coluna in df.columns:
+                valores = serie_numerica(df[coluna]).fillna(0).to_numpy(dtype='float64')
+                somas[medida] = np.bincount(celula_da_linha, weights=valores, minlength=num_celulas)
+
+        grupo_categoria, nivel = np.divmod(ids_celulas, QUANTIDADE_NIVEIS)
+        grupo, categoria = np.divmod(grupo_categoria, num_categorias)
+        return cls(nomes_grupos, nomes_categorias, grupo - 1, categoria - 1, nivel,
+                   np.bincount(celula_da_linha, minlength=num_celulas), somas)
+
+    @property
+    def vazio(self):
+        return len(self.skus) == 0
+
+    def _selecionar(self, mascara_celulas):
+        return CuboAgregacao(self.nomes_grupos, self.nomes_categorias, self.grupo[mascara_celulas],
+                             self.categoria[mascara_celulas], self.nivel[mascara_celulas], self.skus[mascara_celulas],
+                             {medida: valores[mascara_celulas] for medida, valores in self.somas.items()})
+
+    def recortar(self, categoria=None, grupo=None, nivel=None):
+        """Cubo com apenas as células da categoria, do grupo e do nível informados (None = todos)."""
+        mascara_celulas = None
+        for codigos_celulas, nomes, valor in ((self.categoria, self.nomes_categorias, categoria),
+                                              (self.grupo, self.nomes_grupos, grupo)):
+            if not valor:
+                continue
+            posicao = nomes.get_indexer([valor])[0]
+            mascara = codigos_celulas == posicao if posicao >= 0 else np.zeros(len(codigos_celulas), dtype=bool)
+            mascara_celulas = mascara if mascara_celulas is None else mascara_celulas & mascara
+        if nivel is not None:
+            mascara = self.nivel == nivel
+            mascara_celulas = mascara if mascara_celulas is None else mascara_celulas & mascara
+        return self if mascara_celulas is None else self._selecionar(mascara_celulas)
+
+    def _valores_medida(self, medida):
+        if medida == MEDIDA_SKUS:
+            return self.skus
+        if medida not in self.somas:
+            raise KeyError(f"Medida '{medida}' não está no cubo (coluna ausente no relatório).")
+        return self.somas[medida]
+
+    def _totais_por_dimensao(self, codigos_celulas, nomes, medida, nome_indice):
+        presentes = codigos_celulas >= 0
+        codigos = codigos_celulas[presentes]
+        contagem = np.bincount(codigos, weights=self.skus[presentes], minlength=len(nomes))
+        totais = np.bincount(codigos, weights=self._valores_medida(medida)[presentes], minlength=len(nomes))
+        com_produtos = np.flatnonzero(contagem)
+        totais = totais.astype('int64') if medida == MEDIDA_SKUS else _arredondar_soma(totais)
+        return pd.Series(totais[com_produtos], index=pd.Index(nomes[com_produtos], name=nome_indice), name=medida)
+
+    def por_grupo(self, medida='estoque'):
+        """Total da medida por grupo (só grupos com produtos), ordenado pelo nome do grupo."""
+        return self._totais_por_dimensao(self.grupo, self.nomes_grupos, medida, 'Grupo')
+
+    def por_categoria(self, medida=MEDIDA_SKUS):
+        """Total da medida por categoria (só categorias com produtos), ordenado pelo nome da categoria."""
+        return self._totais_por_dimensao(self.categoria, self.nomes_categorias, medida, 'Categoria')
+
+    def contagens_niveis(self):
+        """Número de SKUs em cada código de nível (mesmo formato de ClassificacaoNiveisEstoque.contagens)."""
+        return np.bincount(self.nivel, weights=self.skus, minlength=QUANTIDADE_NIVEIS).astype('int64')
+
+    def total(self, medida='estoque'):
+        return float(_arredondar_soma(self._valores_medida(medida).sum()))
+
+    def resumo_indicadores(self):
+        """Valores dos cards de resumo: SKUs, soma do estoque, categorias e grupos com produtos."""
+        return {
+            'total_skus': int(self.skus.sum()),
+            'qtd_total_estoque': self.total('estoque'),
+            'num_categorias': _contar_presentes(self.categoria, len(self.nomes_categorias)),
+            'num_grupos': _contar_presentes(self.grupo, len(self.nomes_grupos)),
+        }
@@ -1,11 +1,37 @@
 # modules/data_loader.py
+import csv
+import itertools
+import os
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from xml.parsers import expat
+import numpy as np
 import pandas as pd
 
 PREFIXO_CATEGORIA = "* Total Categoria :"
 PREFIXO_GRUPO = "* Total GRUPO :"
 
+# --- Leitura em streaming do relatório "NECESSIDADE ESTOQUE ONLINE" ---
+# Arquivos acima deste tamanho são lidos em blocos por carregar_produtos_com_hierarquia
+LIMITE_BYTES_LEITURA_STREAMING = 64 * 1024 * 1024
+TAMANHO_BLOCO_PADRAO = 50_000
+MAX_LINHAS_CABECALHO = 20
+# Os arrays das colunas lidas em streaming crescem por este fator quando enchem
+FATOR_CRESCIMENTO_COLUNA = 1.5
+# Posições usadas quando a linha de cabeçalho ("Código;Un;Produto;...") não é encontrada
+POSICOES_PADRAO_RELATORIO = {'Código': 0, 'Un': 1, 'Produto': 2, 'Venda': 4, 'Estoque': 7, 'Custo Estoque': 9}
+# Coluna de saída -> coluna do relatório, no mesmo esquema de carregar_produtos_com_hierarquia
+COLUNAS_NUMERICAS_HIERARQUIA = {'Estoque': 'Estoque', 'VendaMensal': 'Venda', 'CustoEstoque': 'Custo Estoque'}
+REGEX_DATA_ESTOQUE = re.compile(r"Estoque:'(\d{2}/\d{2}/\d{2,4})")
+REGEX_CARACTERES_NAO_ASCII = re.compile(r'[^A-Za-z ]')
+
 def _limpar_valor_numerico(serie_valores): 
     """Converte uma série de strings para numérico, tratando separadores e erros."""
+    if pd.api.types.is_numeric_dtype(serie_valores):
+        # Valores já numéricos (células da planilha .xlsx) não passam pela limpeza de texto
+        return serie_valores.astype('float64')
     if not pd.api.types.is_string_dtype(serie_valores):
         serie_valores = serie_valores.astype(str)
     
@@ -13,22 +39,76 @@ def _limpar_valor_numerico(serie_valores):
     serie_limpa = serie_limpa.str.replace(',', '.', regex=False)
     return pd.to_numeric(serie_limpa, errors='coerce')
 
+def _extrair_nome_total(serie_produto_strip, prefixo):
+    """Extrai o nome após o prefixo nas linhas de total; demais linhas ficam como pd.NA."""
+    mascara = serie_produto_strip.str.startswith(prefixo, na=False)
+    nomes = serie_produto_strip.str.slice(len(prefixo)).str.strip()
+    return nomes.where(mascara, pd.NA)
+
+def _atribuir_hierarquia(df_full, coluna_produto):
+    """
+    Atribui Categoria e Grupo a todas as linhas de forma vetorizada.
+    Localiza as linhas de total ("* Total Categoria :" / "* Total GRUPO :") com operações
+    de string sobre a coluna inteira e propaga os nomes para cima (bfill), já que no
+    relatório do ERP a linha de total aparece depois dos produtos que ela resume.
+    """
+    produto_strip = df_full[coluna_produto].str.strip()
+    df_full['CategoriaExtraida'] = _extrair_nome_total(produto_strip, PREFIXO_CATEGORIA)
+    df_full['GrupoExtraido'] = _extrair_nome_total(produto_strip, PREFIXO_GRUPO)
+
+    df_full['Categoria'] = df_full['CategoriaExtraida'].bfill()
+    df_full['Grupo'] = df_full['GrupoExtraido'].bfill()
+    return df_full
+
+def _separar_produtos_com_hierarquia(df_full, colunas_numericas=None):
+    """
+    Etapas comuns à leitura do CSV e da planilha: atribui a hierarquia, mantém só as linhas
+    de produto e converte os valores. `df_full` tem todas as linhas do relatório nas colunas
+    Código, Un, Produto_Original e <coluna>_Original para cada coluna de `colunas_numericas`
+    (padrão: as de COLUNAS_NUMERICAS_HIERARQUIA).
+    """
+    nomes_numericos = list(colunas_numericas or COLUNAS_NUMERICAS_HIERARQUIA)
+    df_full = _atribuir_hierarquia(df_full, 'Produto_Original')
+
+    df_produtos = df_full.copy()
+
+    df_produtos.dropna(subset=['Código'], inplace=True)
+    df_produtos['Código'] = df_produtos['Código'].str.strip()
+    df_produtos = df_produtos[df_produtos['Código'] != '']
+
+    df_produtos['Produto_Original_strip'] = df_produtos['Produto_Original'].str.strip()
+    df_produtos = df_produtos[~df_produtos['Produto_Original_strip'].str.startswith(PREFIXO_CATEGORIA, na=False)]
+    df_produtos = df_produtos[~df_produtos['Produto_Original_strip'].str.startswith(PREFIXO_GRUPO, na=False)]
+
+    # Selecionar e renomear colunas finais
+    df_produtos = df_produtos[['Código', 'Un', 'Produto_Original',
+                               *[f'{nome}_Original' for nome in nomes_numericos],
+                               'Categoria', 'Grupo']].copy()
+    df_produtos.rename(columns={'Produto_Original': 'Produto', **{f'{nome}_Original': nome for nome in nomes_numericos}}, inplace=True)
+
+    for nome in nomes_numericos:
+        df_produtos[nome] = _limpar_valor_numerico(df_produtos[nome])
+    return df_produtos
+
 def carregar_apenas_produtos(caminho_arquivo):
     """
     Carrega e prepara os dados de estoque do arquivo CSV, retornando apenas linhas de produtos.
-    Lê colunas: Código(A), Un(B), Produto(C), VendaMensal(E), Estoque(H).
+    Lê colunas: Código(A), Un(B), Produto(C), VendaMensal(E), Estoque(H), nas posições dadas
+    por posicoes_colunas_relatorio.
     """
     try:
+        posicoes = posicoes_colunas_relatorio(ler_cabecalho_relatorio(caminho_arquivo)['posicoes'],
+                                              ['Código', 'Un', 'Produto', 'Venda', 'Estoque'])
         df = pd.read_csv(
             caminho_arquivo,
             delimiter=';',
             encoding='latin-1',
             skiprows=4,
-            usecols=[0, 1, 2, 4, 7],
+            usecols=posicoes,
             header=None,
             low_memory=False,
             dtype=str 
-        )
+        )[posicoes]
         df.columns = ['Código', 'Un', 'Produto', 'VendaMensal', 'Estoque']
 
         df.dropna(subset=['Código'], inplace=True)
@@ -55,73 +135,682 @@ def carregar_apenas_produtos(caminho_arquivo):
         print(f"Erro ao carregar (apenas produtos) os dados de estoque: {e}")
         return pd.DataFrame(columns=['Código', 'Un', 'Produto', 'VendaMensal', 'Estoque'])
 
-def carregar_produtos_com_hierarquia(caminho_arquivo):
+def carregar_produtos_com_hierarquia(caminho_arquivo, compactar=False):
     """
     Carrega produtos e atribui Categoria e Grupo extraídos das linhas de totais.
-    Lê colunas: Código(A), Un(B), Produto_Original(C), VendaMensal_Original(E), Estoque_Original(H).
+    Lê colunas: Código(A), Un(B), Produto_Original(C), VendaMensal_Original(E), Estoque_Original(H)
+    e Custo Estoque, nas posições dadas por posicoes_colunas_relatorio (a de Custo Estoque muda
+    entre layouts do relatório).
+    Arquivos maiores que LIMITE_BYTES_LEITURA_STREAMING são lidos em blocos por
+    carregar_produtos_streaming, mantendo o pico de memória próximo ao tamanho do resultado.
+    Relatórios em planilha (.xlsx) são lidos por carregar_produtos_planilha.
+    Com `compactar`, o resultado vem no esquema de compactar_dataframe_estoque (na leitura em
+    streaming, já montado assim bloco a bloco).
     """
     try:
+        if eh_relatorio_planilha(caminho_arquivo):
+            df_produtos = carregar_produtos_planilha(caminho_arquivo)
+            return compactar_dataframe_estoque(df_produtos) if compactar else df_produtos
+        if os.path.getsize(caminho_arquivo) > LIMITE_BYTES_LEITURA_STREAMING:
+            return carregar_produtos_streaming(caminho_arquivo, compactar=compactar)
+
+        posicoes = posicoes_colunas_relatorio(ler_cabecalho_relatorio(caminho_arquivo)['posicoes'],
+                                              ['Código', 'Un', 'Produto', 'Venda', 'Estoque', 'Custo Estoque'])
         df_full = pd.read_csv(
             caminho_arquivo,
             delimiter=';',
             encoding='latin-1',
             skiprows=4,
-            usecols=[0, 1, 2, 4, 7],
+            usecols=posicoes,
             header=None,
             low_memory=False,
             dtype=str
-        )
-        df_full.columns = ['Código', 'Un', 'Produto_Original', 'VendaMensal_Original', 'Estoque_Original']
-
-        df_full['CategoriaExtraida'] = pd.NA
-        df_full['GrupoExtraido'] = pd.NA
-
-        for index, row in df_full.iterrows():
-            produto_original_strip = row['Produto_Original'].strip() if pd.notna(row['Produto_Original']) else ''
-            
-            if produto_original_strip.startswith(PREFIXO_CATEGORIA):
-                nome_categoria = produto_original_strip[len(PREFIXO_CATEGORIA):].strip()
-                df_full.loc[index, 'CategoriaExtraida'] = nome_categoria
-            
-            if produto_original_strip.startswith(PREFIXO_GRUPO):
-                nome_grupo = produto_original_strip[len(PREFIXO_GRUPO):].strip()
-                df_full.loc[index, 'GrupoExtraido'] = nome_grupo
-        
-        df_full['Categoria'] = df_full['CategoriaExtraida'].bfill()
-        df_full['Grupo'] = df_full['GrupoExtraido'].bfill()
-
-        df_produtos = df_full.copy()
-
-        df_produtos.dropna(subset=['Código'], inplace=True)
-        df_produtos['Código'] = df_produtos['Código'].str.strip()
-        df_produtos = df_produtos[df_produtos['Código'] != '']
+        )[posicoes]
+        df_full.columns = ['Código', 'Un', 'Produto_Original', 'VendaMensal_Original', 'Estoque_Original', 'CustoEstoque_Original']
 
-        df_produtos['Produto_Original_strip'] = df_produtos['Produto_Original'].str.strip()
-        df_produtos = df_produtos[~df_produtos['Produto_Original_strip'].str.startswith(PREFIXO_CATEGORIA, na=False)]
-        df_produtos = df_produtos[~df_produtos['Produto_Original_strip'].str.startswith(PREFIXO_GRUPO, na=False)]
-        
-        # Selecionar e renomear colunas finais, incluindo VendaMensal
-        df_produtos = df_produtos[['Código', 'Un', 'Produto_Original', 
-                                   'Estoque_Original', 'VendaMensal_Original', # Adicionada VendaMensal_Original
-                                   'Categoria', 'Grupo']].copy()
-        df_produtos.rename(columns={
-            'Produto_Original': 'Produto', 
-            'Estoque_Original': 'Estoque',
-            'VendaMensal_Original': 'VendaMensal' # Renomear VendaMensal
-            }, inplace=True)
-
-        df_produtos['Estoque'] = _limpar_valor_numerico(df_produtos['Estoque'])
-        df_produtos['VendaMensal'] = _limpar_valor_numerico(df_produtos['VendaMensal']) # Limpar nova coluna
+        df_produtos = _separar_produtos_com_hierarquia(df_full)
 
         if df_produtos.empty:
             print(f"Nenhum produto encontrado após atribuição de hierarquia e filtragem no arquivo: {caminho_arquivo}")
         else:
             print(f"Produtos com hierarquia carregados: {len(df_produtos)} do arquivo: {caminho_arquivo}")
         
-        return df_produtos
+        return compactar_dataframe_estoque(df_produtos) if compactar else df_produtos
     except FileNotFoundError:
         print(f"Erro: O arquivo {caminho_arquivo} não foi encontrado.")
         return pd.DataFrame()
     except Exception as e:
         print(f"Erro ao carregar (com hierarquia) os dados de estoque: {e}")
-        return pd.DataFrame(columns=['Código', 'Un', 'Produto', 'Estoque', 'VendaMensal', 'Categoria', 'Grupo'])
\ No newline at end of file
+        return pd.DataFrame(columns=['Código', 'Un', 'Produto', 'Estoque', 'VendaMensal', 'CustoEstoque', 'Categoria', 'Grupo'])
+
+def _converter_decimal_br(texto):
+    """Converte um número no formato brasileiro ("1.324,98") para float; vazio ou inválido vira NaN."""
+    if not texto:
+        return np.nan
+    try:
+        return float(texto.replace('.', '').replace(',', '.'))
+    except ValueError:
+        return np.nan
+
+def _normalizar_nome_coluna(nome):
+    """
+    Reduz o nome da coluna a letras ASCII maiúsculas ("Média" -> "MDIA").
+    O ERP grava os acentos em cp850, que lidos como latin-1 viram outros caracteres;
+    removê-los permite reconhecer o cabeçalho nas duas codificações.
+    """
+    return REGEX_CARACTERES_NAO_ASCII.sub('', nome).strip().upper()
+
+def _eh_linha_cabecalho_colunas(campos):
+    return bool(campos) and _normalizar_nome_coluna(campos[0]) == _normalizar_nome_coluna('Código')
+
+def _interpretar_cabecalho(linhas_cabecalho):
+    """
+    Interpreta o bloco de cabeçalho do relatório.
+    Retorna a data do estoque ("Estoque:'27/05/25"), os dias usados na média e o mapa
+    nome normalizado da coluna -> posição, lido da linha "Código;Un;Produto;...".
+    """
+    info = {'data_estoque': None, 'dias_media': None, 'posicoes': None}
+    for campos in linhas_cabecalho:
+        if not campos:
+            continue
+        primeiro_campo = campos[0].strip()
+        if info['data_estoque'] is None:
+            encontrado = REGEX_DATA_ESTOQUE.search(primeiro_campo)
+            if encontrado:
+                info['data_estoque'] = pd.to_datetime(encontrado.group(1), format='%d/%m/%y' if len(encontrado.group(1)) == 8 else '%d/%m/%Y')
+        if _normalizar_nome_coluna(primeiro_campo).startswith('DIAS M') and len(campos) > 1:
+            try:
+                info['dias_media'] = int(campos[1].strip())
+            except ValueError:
+                pass
+        if _eh_linha_cabecalho_colunas(campos):
+            info['posicoes'] = {_normalizar_nome_coluna(nome): indice for indice, nome in enumerate(campos) if nome.strip()}
+    return info
+
+def _ler_linhas_cabecalho(leitor):
+    """Consome as linhas do leitor até a linha "Código;Un;Produto;..." (inclusive)."""
+    linhas_cabecalho = []
+    for campos in leitor:
+        linhas_cabecalho.append(campos)
+        if _eh_linha_cabecalho_colunas(campos) or len(linhas_cabecalho) >= MAX_LINHAS_CABECALHO:
+            break
+    return linhas_cabecalho
+
+def posicoes_colunas_relatorio(posicoes_cabecalho, nomes_colunas):
+    """
+    Posição de cada coluna de `nomes_colunas` no relatório: a da linha de cabeçalho
+    (`posicoes` de _interpretar_cabecalho) quando ela traz a coluna, senão a de
+    POSICOES_PADRAO_RELATORIO (None se a coluna não tem posição padrão).
+    Todos os carregadores usam esta função, então leem as mesmas colunas do mesmo arquivo.
+    """
+    posicoes_cabecalho = posicoes_cabecalho or {}
+    return [posicoes_cabecalho.get(_normalizar_nome_coluna(nome), POSICOES_PADRAO_RELATORIO.get(nome)) for nome in nomes_colunas]
+
+def ler_cabecalho_relatorio(caminho_arquivo):
+    """Lê apenas o bloco de cabeçalho do relatório (ver _interpretar_cabecalho)."""
+    if eh_relatorio_planilha(caminho_arquivo):
+        return _interpretar_cabecalho(_ler_cabecalho_planilha(caminho_arquivo)[0])
+    with open(caminho_arquivo, 'r', encoding='latin-1', newline='') as arquivo:
+        linhas_cabecalho = _ler_linhas_cabecalho(csv.reader(arquivo, delimiter=';'))
+    return _interpretar_cabecalho(linhas_cabecalho)
+
+def _campo_por_posicao(campos, posicao):
+    if posicao is None or posicao >= len(campos):
+        return ''
+    return campos[posicao]
+
+def _montar_bloco(linhas, categorias, grupos, nomes_saida_numericos):
+    """Monta um DataFrame tipado a partir das linhas de produto acumuladas."""
+    colunas = list(zip(*linhas)) if linhas else [()] * (3 + len(nomes_saida_numericos))
+    dados = {
+        'Código': np.array(colunas[0], dtype=object),
+        'Un': np.array(colunas[1], dtype=object),
+        'Produto': np.array(colunas[2], dtype=object),
+    }
+    for deslocamento, nome_saida in enumerate(nomes_saida_numericos):
+        dados[nome_saida] = np.array(colunas[3 + deslocamento], dtype='float64')
+    dados['Categoria'] = np.array(categorias, dtype=object)
+    dados['Grupo'] = np.array(grupos, dtype=object)
+    return pd.DataFrame(dados)
+
+def iterar_relatorio_em_blocos(caminho_arquivo, tamanho_bloco=TAMANHO_BLOCO_PADRAO, colunas_numericas=None):
+    """
+    Lê o relatório "NECESSIDADE ESTOQUE" em uma única passada, sem carregar o arquivo inteiro.
+
+    Reconhece o bloco de cabeçalho, as linhas de produto e as linhas de total, converte
+    os valores numéricos no formato brasileiro e gera DataFrames de até `tamanho_bloco`
+    produtos com as colunas Código, Un, Produto, <colunas_numericas>, Categoria e Grupo.
+
+    Como as linhas de total vêm depois dos produtos que resumem, os produtos ficam
+    pendentes apenas até o próximo total de grupo; a memória usada depende do tamanho
+    do bloco e do maior grupo, não do tamanho do arquivo.
+
+    Args:
+        caminho_arquivo (str): Caminho do CSV (latin-1, separado por ';').
+        tamanho_bloco (int): Número máximo de produtos por DataFrame gerado.
+        colunas_numericas (dict): Coluna de saída -> nome da coluna no cabeçalho do relatório.
+                                  Padrão: COLUNAS_NUMERICAS_HIERARQUIA.
+    """
+    colunas_numericas = colunas_numericas or COLUNAS_NUMERICAS_HIERARQUIA
+    nomes_saida_numericos = list(colunas_numericas)
+
+    with open(caminho_arquivo, 'r', encoding='latin-1', newline='') as arquivo:
+        leitor = csv.reader(arquivo, delimiter=';')
+
+        linhas_cabecalho = _ler_linhas_cabecalho(leitor)
+        info_cabecalho = _interpretar_cabecalho(linhas_cabecalho)
+        if info_cabecalho['posicoes'] is None:
+            # Sem linha de cabeçalho: mesmo comportamento do skiprows=4 da leitura com pandas
+            linhas_pendentes_cabecalho = linhas_cabecalho[4:]
+        else:
+            linhas_pendentes_cabecalho = []
+
+        pos_codigo, pos_un, pos_produto, *pos_numericas = posicoes_colunas_relatorio(
+            info_cabecalho['posicoes'], ['Código', 'Un', 'Produto', *colunas_numericas.values()])
+
+        linhas, categorias, grupos = [], [], []
+        inicio_sem_categoria = 0
+        inicio_sem_grupo = 0
+
+        for campos in itertools.chain(linhas_pendentes_cabecalho, leitor):
+            if not campos:
+                continue
+            produto = _campo_por_posicao(campos, pos_produto)
+            produto_strip = produto.strip()
+
+            if produto_strip.startswith(PREFIXO_CATEGORIA):
+                nome_categoria = produto_strip[len(PREFIXO_CATEGORIA):].strip()
+                categorias[inicio_sem_categoria:] = [nome_categoria] * (len(linhas) - inicio_sem_categoria)
+                inicio_sem_categoria = len(linhas)
+                continue
+
+            if produto_strip.startswith(PREFIXO_GRUPO):
+                nome_grupo = produto_strip[len(PREFIXO_GRUPO):].strip()
+                grupos[inicio_sem_grupo:] = [nome_grupo] * (len(linhas) - inicio_sem_grupo)
+                inicio_sem_grupo = len(linhas)
+
+                completos = min(inicio_sem_categoria, inicio_sem_grupo)
+                if completos >= tamanho_bloco:
+                    yield _montar_bloco(linhas[:completos], categorias[:completos], grupos[:completos], nomes_saida_numericos)
+                    del linhas[:completos], categorias[:completos], grupos[:completos]
+                    inicio_sem_categoria -= completos
+                    inicio_sem_grupo -= completos
+                continue
+
+            codigo = _campo_por_posicao(campos, pos_codigo).strip()
+            if not codigo:
+                continue
+
+            un = _campo_por_posicao(campos, pos_un)
+            linhas.append((
+                codigo,
+                un if un else np.nan,
+                produto if produto else np.nan,
+                *[_converter_decimal_br(_campo_por_posicao(campos, posicao)) for posicao in pos_numericas]
+            ))
+            categorias.append(np.nan)
+            grupos.append(np.nan)
+
+        if linhas:
+            yield _montar_bloco(linhas, categorias, grupos, nomes_saida_numericos)
+
+class _ColunaEmBlocos:
+    """
+    Junta os valores de uma coluna, bloco a bloco, em um único array que cresce por
+    realocação (FATOR_CRESCIMENTO_COLUNA), para que cada bloco possa ser liberado assim que lido.
+
+    Com `compactar`, a coluna já é guardada no esquema de compactar_dataframe_estoque:
+    colunas de COLUNAS_TEXTO_COMPACTAVEIS viram códigos inteiros de um dicionário de valores
+    (enquanto tiverem no máximo FRACAO_MAX_VALORES_DISTINTOS de valores distintos) e colunas
+    numéricas ficam em float32 enquanto nenhum bloco perder valores na conversão. O resultado
+    de finalizar() é o mesmo de compactar_dataframe_estoque sobre a coluna inteira.
+    """
+
+    def __init__(self, nome, compactar=False):
+        self.nome = nome
+        self._compactar = compactar
+        self._dados = None
+        self._tamanho = 0
+        self._valores_codigos = None
+
+    def _anexar(self, valores):
+        if self._dados is None:
+            self._dados = np.empty(max(len(valores), 1), dtype=valores.dtype)
+        elif self._tamanho + len(valores) > len(self._dados):
+            self._dados.resize(max(self._tamanho + len(valores), int(len(self._dados) * FATOR_CRESCIMENTO_COLUNA)), refcheck=False)
+        self._dados[self._tamanho:self._tamanho + len(valores)] = valores
+        self._tamanho += len(valores)
+
+    def _trocar_dados(self, dados):
+        """Substitui o conteúdo (mesmo tamanho, outro tipo) mantendo a folga para os próximos blocos."""
+        self._dados = np.empty(len(self._dados), dtype=dados.dtype)
+        self._dados[:self._tamanho] = dados
+
+    def __len__(self):
+        return self._tamanho
+
+    def _codigos_para_valores(self):
+        """Troca os códigos do dicionário pelos textos (códigos -1 viram NaN)."""
+        valores = np.array(list(self._valores_codigos), dtype=object)
+        codigos = self._dados[:self._tamanho]
+        texto = np.full(self._tamanho, np.nan, dtype=object)
+        texto[codigos >= 0] = valores[codigos[codigos >= 0]]
+        return texto
+
+    def acrescentar(self, valores):
+        if self._dados is None and self._compactar and valores.dtype == object and self.nome in COLUNAS_TEXTO_COMPACTAVEIS:
+            self._valores_codigos = {}
+
+        if self._valores_codigos is not None:
+            codigos_bloco, unicos = pd.factorize(valores)
+            codigo_global = np.fromiter((self._valores_codigos.setdefault(valor, len(self._valores_codigos)) for valor in unicos),
+                                        dtype='int32', count=len(unicos))
+            codigos = np.full(len(valores), -1, dtype='int32')
+            codigos[codigos_bloco >= 0] = codigo_global[codigos_bloco[codigos_bloco >= 0]]
+            self._anexar(codigos)
+            if len(self._valores_codigos) > FRACAO_MAX_VALORES_DISTINTOS * self._tamanho:
+                # Valores quase todos distintos (Código, Produto): o dicionário não compensa
+                self._trocar_dados(self._codigos_para_valores())
+                self._valores_codigos = None
+            return
+
+        if valores.dtype == 'float64' and self._compactar:
+            if self._dados is None or self._dados.dtype == 'float32':
+                if _float32_sem_perda(valores):
+                    self._anexar(valores.astype('float32'))
+                    return
+                if self._dados is not None:
+                    # Os valores anteriores passaram na conferência e voltam exatos para float64
+                    self._trocar_dados(np.round(self._dados[:self._tamanho].astype('float64'), CASAS_DECIMAIS_FLOAT32))
+        self._anexar(valores)
+
+    def finalizar(self):
+        """Devolve a coluna completa (np.ndarray ou pd.Categorical) e libera a folga do array."""
+        if self._dados is None:
+            return np.array([], dtype=object)
+        self._dados.resize(self._tamanho, refcheck=False)
+
+        if self._valores_codigos is not None:
+            if len(self._valores_codigos) > FRACAO_MAX_VALORES_DISTINTOS * self._tamanho:
+                return self._codigos_para_valores()
+            # Categorias em ordem alfabética, como em astype('category')
+            valores = np.array(list(self._valores_codigos), dtype=object)
+            ordem = np.argsort(valores, kind='stable')
+            nova_posicao = np.empty(len(ordem), dtype='int32')
+            nova_posicao[ordem] = np.arange(len(ordem), dtype='int32')
+            codigos = np.full(self._tamanho, -1, dtype='int32')
+            codigos[self._dados >= 0] = nova_posicao[self._dados[self._dados >= 0]]
+            return pd.Categorical.from_codes(codigos, categories=pd.Index(valores[ordem], dtype=object))
+
+        if self._compactar and self._dados.dtype == object and self.nome in COLUNAS_TEXTO_COMPACTAVEIS:
+            serie = pd.Series(self._dados, copy=False)
+            if serie.nunique(dropna=True) <= FRACAO_MAX_VALORES_DISTINTOS * self._tamanho:
+                return serie.astype('category').array
+        return self._dados
+
+def carregar_produtos_streaming(caminho_arquivo, tamanho_bloco=TAMANHO_BLOCO_PADRAO, colunas_numericas=None, compactar=False):
+    """
+    Carrega o relatório com iterar_relatorio_em_blocos, copiando cada bloco para arrays por
+    coluna (_ColunaEmBlocos) e descartando-o em seguida: o pico de memória fica próximo ao
+    tamanho do resultado, não à soma dos blocos.
+    Com as colunas padrão o resultado tem o mesmo esquema de carregar_produtos_com_hierarquia;
+    com `compactar`, o mesmo de compactar_dataframe_estoque, montado sem a cópia intermediária.
+    Planilhas (.xlsx) vão para carregar_produtos_planilha, que já lê a aba linha a linha.
+    """
+    colunas_saida = ['Código', 'Un', 'Produto', *(colunas_numericas or COLUNAS_NUMERICAS_HIERARQUIA), 'Categoria', 'Grupo']
+    if eh_relatorio_planilha(caminho_arquivo):
+        df_produtos = carregar_produtos_planilha(caminho_arquivo, colunas_numericas)
+        return compactar_dataframe_estoque(df_produtos) if compactar else df_produtos
+    try:
+        colunas = {nome: _ColunaEmBlocos(nome, compactar) for nome in colunas_saida}
+        for bloco in iterar_relatorio_em_blocos(caminho_arquivo, tamanho_bloco, colunas_numericas):
+            for nome, coluna in colunas.items():
+                coluna.acrescentar(bloco[nome].to_numpy())
+            del bloco
+        if len(colunas['Código']):
+            df_produtos = pd.DataFrame({nome: coluna.finalizar() for nome, coluna in colunas.items()}, copy=False)
+        else:
+            df_produtos = pd.DataFrame(columns=colunas_saida)
+
+        if df_produtos.empty:
+            print(f"Nenhum produto encontrado na leitura em streaming do arquivo: {caminho_arquivo}")
+        else:
+            print(f"Produtos carregados em streaming: {len(df_produtos)} do arquivo: {caminho_arquivo}")
+        return df_produtos
+    except FileNotFoundError:
+        print(f"Erro: O arquivo {caminho_arquivo} não foi encontrado.")
+        return pd.DataFrame()
+    except Exception as e:
+        print(f"Erro ao carregar em streaming os dados de estoque: {e}")
+        return pd.DataFrame(columns=colunas_saida)
+
+# --- Relatório em planilha (.xlsx) ---
+# Algumas filiais exportam o mesmo relatório como planilha: mesma disposição de linhas e
+# colunas, com os valores já como números
+EXTENSOES_PLANILHA = ('.xlsx', '.xlsm')
+ESPACO_NOMES_PLANILHA = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+ESPACO_NOMES_RELACOES = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+ESPACO_NOMES_RELACOES_PACOTE = 'http://schemas.openxmlformats.org/package/2006/relationships'
+# Nomes dos elementos como o expat os entrega com namespace_separator=' '
+ELEMENTO_LINHA, ELEMENTO_CELULA, ELEMENTO_VALOR, ELEMENTO_TEXTO, ELEMENTO_TEXTO_COMPARTILHADO, ELEMENTO_FONETICA = (
+    f'{ESPACO_NOMES_PLANILHA} {nome}' for nome in ('row', 'c', 'v', 't', 'si', 'rPh')
+)
+TAMANHO_PEDACO_XML = 64 * 1024
+
+def eh_relatorio_planilha(caminho_arquivo):
+    return str(caminho_arquivo).lower().endswith(EXTENSOES_PLANILHA)
+
+def _indice_coluna(referencia):
+    """Índice (a partir de 0) da coluna de uma referência de célula ("J12" -> 9)."""
+    indice = 0
+    for caractere in referencia:
+        if caractere < 'A':
+            break
+        indice = indice * 26 + ord(caractere) - 64
+    return indice - 1
+
+def _alvo_relacao(planilha, caminho_relacoes, id_relacao=None, tipo=None):
+    """Caminho, dentro do pacote, do destino de uma relação (por id ou pelo fim do tipo)."""
+    diretorio = posixpath.dirname(posixpath.dirname(caminho_relacoes))
+    for relacao in ET.fromstring(planilha.read(caminho_relacoes)).iter(f'{{{ESPACO_NOMES_RELACOES_PACOTE}}}Relationship'):
+        if relacao.get('Id') == id_relacao or (tipo and relacao.get('Type', '').endswith(tipo)):
+            alvo = relacao.get('Target')
+            return alvo.lstrip('/') if alvo.startswith('/') else posixpath.normpath(posixpath.join(diretorio, alvo))
+    raise KeyError(f"Relação não encontrada em {caminho_relacoes}")
+
+def _caminho_primeira_aba(planilha):
+    """Caminho do XML da primeira aba, seguindo as relações do pacote (como o Excel)."""
+    caminho_pasta = _alvo_relacao(planilha, '_rels/.rels', tipo='/officeDocument')
+    primeira_aba = ET.fromstring(planilha.read(caminho_pasta)).find(f'{{{ESPACO_NOMES_PLANILHA}}}sheets/{{{ESPACO_NOMES_PLANILHA}}}sheet')
+    caminho_relacoes = posixpath.join(posixpath.dirname(caminho_pasta), '_rels', posixpath.basename(caminho_pasta) + '.rels')
+    return _alvo_relacao(planilha, caminho_relacoes, id_relacao=primeira_aba.get(f'{{{ESPACO_NOMES_RELACOES}}}id')), caminho_pasta
+
+def _analisar_xml(arquivo_xml, inicio, fim, texto, concluido=lambda: False):
+    """Passa o XML pelo expat em pedaços, parando quando `concluido()` fica verdadeiro."""
+    analisador = expat.ParserCreate(namespace_separator=' ')
+    analisador.buffer_text = True
+    analisador.StartElementHandler, analisador.EndElementHandler, analisador.CharacterDataHandler = inicio, fim, texto
+    while not concluido():
+        pedaco = arquivo_xml.read(TAMANHO_PEDACO_XML)
+        analisador.Parse(pedaco, not pedaco)
+        if not pedaco:
+            break
+
+def _textos_compartilhados(planilha, caminho_pasta):
+    """Tabela de textos compartilhados da planilha (vazia se a planilha só usa textos inline)."""
+    try:
+        caminho = _alvo_relacao(planilha, posixpath.join(posixpath.dirname(caminho_pasta), '_rels', posixpath.basename(caminho_pasta) + '.rels'),
+                                tipo='/sharedStrings')
+    except KeyError:
+        return []
+    textos, partes, dentro_fonetica = [], None, False
+
+    def inicio(nome, atributos):
+        nonlocal partes, dentro_fonetica
+        if nome == ELEMENTO_TEXTO_COMPARTILHADO:
+            partes = []
+        elif nome == ELEMENTO_FONETICA:
+            dentro_fonetica = True
+
+    def fim(nome):
+        nonlocal partes, dentro_fonetica
+        if nome == ELEMENTO_TEXTO_COMPARTILHADO:
+            textos.append(''.join(partes))
+            partes = None
+        elif nome == ELEMENTO_FONETICA:
+            dentro_fonetica = False
+
+    def texto(conteudo):
+        # O expat só entrega texto dentro de <t>; fora dele há apenas espaços de formatação
+        if partes is not None and not dentro_fonetica:
+            partes.append(conteudo)
+
+    with planilha.open(caminho) as arquivo_xml:
+        _analisar_xml(arquivo_xml, inicio, fim, texto)
+    return textos
+
+class _LeitorAbaPlanilha:
+    """
+    Lê a aba de uma planilha .xlsx direto do XML com o expat, sem criar objetos de célula
+    nem a árvore do documento: a memória usada é só a das colunas guardadas.
+
+    Com `posicoes`, guarda em `colunas` os valores dessas colunas (uma lista por posição) das
+    linhas a partir de `linha_inicial`; sem `posicoes`, guarda em `linhas` as linhas inteiras
+    até `linha_final`. Números vêm como float, textos como str e células vazias como None.
+    """
+    def __init__(self, textos_compartilhados, posicoes=None, linha_inicial=1, linha_final=None):
+        self.textos_compartilhados = textos_compartilhados
+        self.linha_inicial, self.linha_final = linha_inicial, linha_final
+        self.colunas = {posicao: [] for posicao in posicoes} if posicoes is not None else None
+        self.linhas = []
+        self.numero_linha = 0
+        self.linha_ativa = False
+        self.valores_linha = {}
+        self.coluna_celula = -1
+        self.celula_ativa = False
+        self.tipo_celula = None
+        self.partes = None
+        self.dentro_fonetica = False
+
+    def _guardar_linha(self, valores):
+        if self.colunas is not None:
+            for posicao, valores_coluna in self.colunas.items():
+                valores_coluna.append(valores.get(posicao))
+        else:
+            self.linhas.append([valores.get(posicao) for posicao in range(max(valores, default=-1) + 1)])
+
+    def _linha_no_intervalo(self, numero):
+        return numero >= self.linha_inicial and (self.linha_final is None or numero <= self.linha_final)
+
+    def _inicio(self, nome, atributos):
+        if nome == ELEMENTO_CELULA:
+            referencia = atributos.get('r')
+            self.coluna_celula = _indice_coluna(referencia) if referencia else self.coluna_celula + 1
+            self.celula_ativa = self.linha_ativa and (self.colunas is None or self.coluna_celula in self.colunas)
+            self.tipo_celula = atributos.get('t')
+        elif nome == ELEMENTO_LINHA:
+            numero = int(atributos['r']) if 'r' in atributos else self.numero_linha + 1
+            # Linhas vazias não aparecem no XML; entram como linhas sem valores, como no CSV
+            for numero_vazio in range(self.numero_linha + 1, numero):
+                if self._linha_no_intervalo(numero_vazio):
+                    self._guardar_linha({})
+            self.numero_linha = numero
+            self.linha_ativa = self._linha_no_intervalo(numero)
+            self.coluna_celula = -1
+        elif self.celula_ativa and (nome == ELEMENTO_VALOR or nome == ELEMENTO_TEXTO):
+            if self.partes is None:
+                self.partes = []
+        elif nome == ELEMENTO_FONETICA:
+            self.dentro_fonetica = True
+
+    def _fim(self, nome):
+        if nome == ELEMENTO_CELULA:
+            if self.partes is not None:
+                self.valores_linha[self.coluna_celula] = self._valor_celula(''.join(self.partes))
+                self.partes = None
+            self.celula_ativa = False
+        elif nome == ELEMENTO_LINHA:
+            if self.linha_ativa:
+                self._guardar_linha(self.valores_linha)
+            self.valores_linha = {}
+            self.linha_ativa = False
+        elif nome == ELEMENTO_FONETICA:
+            self.dentro_fonetica = False
+
+    def _texto(self, conteudo):
+        if self.partes is not None and not self.dentro_fonetica:
+            self.partes.append(conteudo)
+
+    def _valor_celula(self, conteudo):
+        tipo = self.tipo_celula
+        if tipo is None or tipo == 'n':
+            try:
+                return float(conteudo)
+            except ValueError:
+                return conteudo or None
+        if tipo == 's':
+            return self.textos_compartilhados[int(conteudo)]
+        if tipo == 'b':
+            return conteudo == '1'
+        if tipo == 'e':
+            return None
+        return conteudo  # 'inlineStr', 'str' (resultado de fórmula) e 'd' (data ISO)
+
+    def ler(self, arquivo_xml):
+        _analisar_xml(arquivo_xml, self._inicio, self._fim, self._texto,
+                      concluido=lambda: self.linha_final is not None and self.numero_linha > self.linha_final)
+        return self
+
+def _ler_aba_relatorio(caminho_arquivo, **opcoes_leitor):
+    """Lê a primeira aba (a do relatório) com _LeitorAbaPlanilha(**opcoes_leitor)."""
+    with zipfile.ZipFile(caminho_arquivo) as planilha:
+        caminho_aba, caminho_pasta = _caminho_primeira_aba(planilha)
+        leitor = _LeitorAbaPlanilha(_textos_compartilhados(planilha, caminho_pasta), **opcoes_leitor)
+        with planilha.open(caminho_aba) as arquivo_xml:
+            return leitor.ler(arquivo_xml)
+
+def _texto_celula(valor):
+    """Valor da célula como o campo do CSV: vazio vira '' e número inteiro perde o '.0' (códigos)."""
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+def _ler_cabecalho_planilha(caminho_arquivo):
+    """
+    Lê o bloco de cabeçalho da planilha como listas de texto (ver _ler_linhas_cabecalho).
+    Retorna as linhas e o número (a partir de 1) da primeira linha depois delas.
+    """
+    linhas = _ler_aba_relatorio(caminho_arquivo, linha_final=MAX_LINHAS_CABECALHO).linhas
+    linhas_cabecalho = _ler_linhas_cabecalho([_texto_celula(valor) for valor in linha] for linha in linhas)
+    return linhas_cabecalho, len(linhas_cabecalho) + 1
+
+def _coluna_texto_planilha(valores):
+    """Coluna de texto como a do CSV lido com dtype=str (códigos numéricos viram texto, vazio vira NaN)."""
+    serie = pd.Series(valores, dtype=object)
+    if pd.api.types.infer_dtype(serie, skipna=True) != 'string':
+        serie = serie.map(_texto_celula, na_action='ignore')
+    return serie.where(serie != '')
+
+def _coluna_numerica_planilha(valores):
+    """Coluna numérica em float64; células gravadas como texto ("1.324,98") são convertidas como no CSV."""
+    serie = pd.Series(valores, dtype=object)
+    if pd.api.types.infer_dtype(serie, skipna=True) in ('integer', 'floating', 'mixed-integer-float', 'decimal', 'empty'):
+        return serie.astype('float64')
+    eh_texto = serie.map(type).eq(str)
+    numeros = pd.to_numeric(serie.where(~eh_texto), errors='coerce').astype('float64')
+    numeros[eh_texto] = _limpar_valor_numerico(serie[eh_texto].astype(str))
+    return numeros
+
+def carregar_produtos_planilha(caminho_arquivo, colunas_numericas=None):
+    """
+    Carrega o relatório exportado como planilha (.xlsx) no mesmo esquema de
+    carregar_produtos_com_hierarquia (ou de carregar_produtos_streaming, com `colunas_numericas`).
+
+    A primeira aba é lida do XML em uma passada guardando só as colunas usadas; a hierarquia, a filtragem das linhas de produto e a conversão dos valores são as mesmas
+    etapas vetorizadas da leitura do CSV (_separar_produtos_com_hierarquia).
+    """
+    colunas_numericas = colunas_numericas or COLUNAS_NUMERICAS_HIERARQUIA
+    colunas_saida = ['Código', 'Un', 'Produto', *colunas_numericas, 'Categoria', 'Grupo']
+    try:
+        linhas_cabecalho, linha_inicial = _ler_cabecalho_planilha(caminho_arquivo)
+        posicoes = _interpretar_cabecalho(linhas_cabecalho)['posicoes']
+        if posicoes is None:
+            # Sem linha de cabeçalho: mesmo comportamento do skiprows=4 da leitura do CSV
+            linha_inicial = 5
+        posicoes_lidas = posicoes_colunas_relatorio(posicoes, ['Código', 'Un', 'Produto', *colunas_numericas.values()])
+        colunas_lidas = _ler_aba_relatorio(caminho_arquivo, posicoes=[posicao for posicao in posicoes_lidas if posicao is not None],
+                                           linha_inicial=linha_inicial).colunas
+        num_linhas = len(next(iter(colunas_lidas.values()), []))
+        colunas = [colunas_lidas[posicao] if posicao is not None else [None] * num_linhas for posicao in posicoes_lidas]
+
+        dados = {
+            'Código': _coluna_texto_planilha(colunas[0]),
+            'Un': _coluna_texto_planilha(colunas[1]),
+            'Produto_Original': _coluna_texto_planilha(colunas[2]),
+        }
+        for nome_saida, valores in zip(colunas_numericas, colunas[3:]):
+            dados[f'{nome_saida}_Original'] = _coluna_numerica_planilha(valores)
+        df_produtos = _separar_produtos_com_hierarquia(pd.DataFrame(dados), colunas_numericas)
+
+        if df_produtos.empty:
+            print(f"Nenhum produto encontrado na planilha: {caminho_arquivo}")
+        else:
+            print(f"Produtos carregados da planilha: {len(df_produtos)} do arquivo: {caminho_arquivo}")
+        return df_produtos
+    except FileNotFoundError:
+        print(f"Erro: O arquivo {caminho_arquivo} não foi encontrado.")
+        return pd.DataFrame()
+    except Exception as e:
+        print(f"Erro ao carregar a planilha de estoque: {e}")
+        return pd.DataFrame(columns=colunas_saida)
+
+# --- Esquema compacto do DataFrame de produtos ---
+COLUNAS_TEXTO_COMPACTAVEIS = ['Código', 'Un', 'Produto', 'Categoria', 'Grupo']
+# Uma coluna de texto só vira Categorical se tiver no máximo esta fração de valores distintos
+# (Código e Produto costumam ser únicos por linha e não ganham nada com categorias)
+FRACAO_MAX_VALORES_DISTINTOS = 0.5
+# Casas decimais usadas para conferir (e desfazer) a conversão para float32
+CASAS_DECIMAIS_FLOAT32 = 3
+
+def _float32_sem_perda(valores):
+    """Indica se os valores (Series ou np.ndarray) voltam exatamente ao original após float32 -> float64 arredondado."""
+    valores_64 = np.asarray(valores, dtype='float64')
+    ida_e_volta = np.round(valores_64.astype('float32').astype('float64'), CASAS_DECIMAIS_FLOAT32)
+    return np.array_equal(ida_e_volta, valores_64, equal_nan=True)
+
+def compactar_dataframe_estoque(df):
+    """
+    Retorna uma cópia compacta do DataFrame de produtos: colunas de texto repetitivas
+    (Un, Categoria, Grupo...) viram pandas Categorical, e colunas float64 viram float32
+    quando isso não altera nenhum valor (conferido com CASAS_DECIMAIS_FLOAT32 casas).
+
+    Filtros de igualdade, isin e groupby sobre colunas Categorical rodam sobre os códigos
+    inteiros. Para contas e exibição, leia as colunas numéricas com serie_numerica.
+    """
+    if df is None or df.empty:
+        return df
+
+    df_compacto = df.copy()
+    for coluna in COLUNAS_TEXTO_COMPACTAVEIS:
+        if coluna not in df_compacto.columns or isinstance(df_compacto[coluna].dtype, pd.CategoricalDtype):
+            continue
+        if df_compacto[coluna].nunique(dropna=True) <= FRACAO_MAX_VALORES_DISTINTOS * len(df_compacto):
+            df_compacto[coluna] = df_compacto[coluna].astype('category')
+
+    for coluna in df_compacto.columns:
+        if df_compacto[coluna].dtype == 'float64' and _float32_sem_perda(df_compacto[coluna]):
+            df_compacto[coluna] = df_compacto[coluna].astype('float32')
+    return df_compacto
+
+def serie_numerica(serie):
+    """
+    Converte uma coluna para float64 (valores inválidos viram NaN).
+    Colunas float32 do esquema compacto são arredondadas de volta aos valores originais.
+    """
+    if serie.dtype == 'float32':
+        return serie.astype('float64').round(CASAS_DECIMAIS_FLOAT32)
+    return pd.to_numeric(serie, errors='coerce')
+
+def colunas_float32_para_float64(df):
+    """Converte as colunas float32 de `df` com serie_numerica (para tabelas e exportação)."""
+    colunas_float32 = [coluna for coluna in df.columns if df[coluna].dtype == 'float32']
+    if not colunas_float32:
+        return df
+    return df.assign(**{coluna: serie_numerica(df[coluna]) for coluna in colunas_float32})
+
+def relatorio_memoria_por_linha(df):
+    """Retorna os bytes por linha de cada coluna (memory_usage deep) e o total."""
+    if df is None or len(df) == 0:
+        return {'linhas': 0, 'colunas': {}, 'total': 0.0}
+    uso_memoria = df.memory_usage(deep=True, index=False)
+    return {
+        'linhas': len(df),
+        'colunas': {coluna: uso_memoria[coluna] / len(df) for coluna in df.columns},
+        'total': uso_memoria.sum() / len(df),
+    }
+
+def carregar_produtos_compactos(caminho_arquivo):
+    """carregar_produtos_com_hierarquia já no esquema de compactar_dataframe_estoque."""
+    return carregar_produtos_com_hierarquia(caminho_arquivo, compactar=True)
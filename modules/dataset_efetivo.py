@@ -0,0 +1,230 @@
+# modules/dataset_efetivo.py
+import hashlib
+import json
+import threading
+import numpy as np
+import pandas as pd
+from modules.config_manager import assinatura_config, carregar_configuracoes_exclusao
+from modules.cubo_agregacao import CuboAgregacao
+from modules.indice_busca import IndiceBuscaProdutos
+from modules.inventory_manager import classificar_niveis_estoque
+
+_lock_dataset = threading.Lock()
+_dataset_atual = None
+_contador_versoes = 0
+# Assinatura do arquivo de configuração cujas exclusões já foram conferidas contra o dataset
+_lock_sincronizacao_exclusoes = threading.Lock()
+_assinatura_config_sincronizada = None
+# Quantas combinações de limites (baixo, médio) ficam com a classificação e o cubo guardados por dataset
+MAX_CLASSIFICACOES_NIVEIS = 4
+# Quantas combinações de filtros interativos ficam com a máscara guardada por dataset
+MAX_MASCARAS_FILTROS = 8
+
+def calcular_hash_exclusao(config_exclusao):
+    """Gera um hash estável da configuração de exclusão (usado como parte de chaves de cache)."""
+    serializado = json.dumps(config_exclusao, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(serializado.encode('utf-8'), digest_size=8).hexdigest()
+
+def mascara_exclusoes(df_base, config_exclusao):
+    """
+    Combina as exclusões de grupos, categorias e códigos em uma única máscara booleana
+    (True = manter). Retorna None quando não há nada a excluir.
+    """
+    grupos_a_excluir = config_exclusao.get("excluir_grupos", [])
+    categorias_a_excluir = config_exclusao.get("excluir_categorias", [])
+    produtos_codigos_a_excluir = [str(p) for p in config_exclusao.get("excluir_produtos_codigos", [])]
+
+    if df_base.empty or not (grupos_a_excluir or categorias_a_excluir or produtos_codigos_a_excluir):
+        return None
+
+    mascara_manter = pd.Series(True, index=df_base.index)
+    if grupos_a_excluir:
+        mascara_manter &= ~df_base['Grupo'].isin(grupos_a_excluir)
+    if categorias_a_excluir:
+        mascara_manter &= ~df_base['Categoria'].isin(categorias_a_excluir)
+    if produtos_codigos_a_excluir:
+        mascara_manter &= ~df_base['Código'].astype(str).isin(produtos_codigos_a_excluir)
+    return mascara_manter.to_numpy()
+
+class DatasetEfetivo:
+    """
+    Conjunto de dados compartilhado pelos callbacks: o DataFrame carregado (`df_base`)
+    e o DataFrame com as exclusões da configuração já aplicadas (`df`).
+
+    É tratado como imutável: uma nova configuração de exclusão gera um novo objeto,
+    e os callbacks nunca devem alterar `df` nem `df_base` no lugar.
+
+    O índice de busca por nome (`indice_busca`) é construído sobre `df_base` e pode ser
+    reaproveitado entre datasets da mesma versão dos dados.
+    """
+
+    def __init__(self, df_base, config_exclusao, versao_dados, indice_busca=None, origem=None):
+        self.df_base = df_base if df_base is not None else pd.DataFrame()
+        self.origem = origem
+        self.config_exclusao = config_exclusao
+        self.hash_exclusao = calcular_hash_exclusao(config_exclusao)
+        self.versao_dados = versao_dados
+        mascara_manter = mascara_exclusoes(self.df_base, config_exclusao)
+        if mascara_manter is None:
+            self.df = self.df_base
+            self._posicoes_na_base = None
+        else:
+            self.df = self.df_base[mascara_manter]
+            self._posicoes_na_base = np.flatnonzero(mascara_manter)
+        if indice_busca is None and not self.df_base.empty and 'Produto' in self.df_base.columns:
+            indice_busca = IndiceBuscaProdutos(self.df_base['Produto'].tolist())
+        self.indice_busca = indice_busca
+        # Vários callbacks do painel pedem as mesmas máscaras e classificações ao mesmo tempo
+        self._lock_memorizacao = threading.Lock()
+        self._classificacoes_niveis = {}
+        self._mascaras_filtros = {}
+        self._cubos_agregacao = {}
+
+    @property
+    def vazio(self):
+        return self.df_base.empty
+
+    def _memorizar(self, memoria, chave, valor, limite):
+        with self._lock_memorizacao:
+            if chave not in memoria and len(memoria) >= limite:
+                memoria.pop(next(iter(memoria)), None)
+            memoria[chave] = valor
+        return valor
+
+    def mascara_filtros(self, categoria=None, grupo=None, nome_produto=None):
+        """
+        Máscara booleana (np.ndarray alinhado a `df`) dos filtros interativos de categoria,
+        grupo e nome do produto (sem os espaços das pontas). Retorna None quando nenhum filtro está ativo.
+        A máscara é guardada por combinação de filtros e não deve ser alterada.
+        """
+        if self.df.empty:
+            return None
+
+        nome = nome_produto.strip() if nome_produto else ""
+        chave = (categoria or None, grupo or None, nome)
+        if chave in self._mascaras_filtros:
+            return self._mascaras_filtros[chave]
+
+        mascara = None
+        if categoria:
+            mascara = (self.df['Categoria'] == categoria).to_numpy()
+        if grupo:
+            mascara_grupo = (self.df['Grupo'] == grupo).to_numpy()
+            mascara = mascara_grupo if mascara is None else mascara & mascara_grupo
+        if nome != "":
+            mascara_nome = self._mascara_nome(nome)
+            mascara = mascara_nome if mascara is None else mascara & mascara_nome
+        return self._memorizar(self._mascaras_filtros, chave, mascara, MAX_MASCARAS_FILTROS)
+
+    def filtrar(self, categoria=None, grupo=None, nome_produto=None):
+        """
+        Aplica os filtros interativos (categoria, grupo e nome do produto) sobre `df`.
+        Sem filtros, devolve o próprio `df` (sem cópia).
+        """
+        return self.aplicar_mascara(self.mascara_filtros(categoria, grupo, nome_produto))
+
+    def aplicar_mascara(self, mascara):
+        """Linhas de `df` selecionadas por uma máscara de mascara_filtros (None = todas, sem cópia)."""
+        return self.df if mascara is None else self.df[mascara]
+
+    def classificar_niveis(self, limite_baixo, limite_medio, mascara=None):
+        """
+        Classificação de níveis de estoque de `df` (ver classificar_niveis_estoque), calculada
+        uma vez por combinação de limites e restrita às linhas de `mascara` (de mascara_filtros).
+        """
+        chave = (limite_baixo, limite_medio)
+        classificacao = self._classificacoes_niveis.get(chave)
+        if classificacao is None:
+            classificacao = self._memorizar(self._classificacoes_niveis, chave,
+                                            classificar_niveis_estoque(self.df['Estoque'], limite_baixo, limite_medio),
+                                            MAX_CLASSIFICACOES_NIVEIS)
+        return classificacao.subconjunto(mascara)
+
+    def cubo_agregacao(self, limite_baixo, limite_medio, categoria=None, grupo=None, nome_produto=None):
+        """
+        Cubo de agregados (Grupo, Categoria, nível) de `df` já recortado pelos filtros interativos.
+        O cubo completo é montado uma vez por combinação de limites e os filtros de categoria e
+        grupo só selecionam células; o filtro por nome não tem dimensão no cubo, então nesse caso
+        o cubo é montado a partir das linhas encontradas pelo índice de busca. Como em
+        mascara_filtros, espaços nas pontas do nome são ignorados.
+        """
+        nome = nome_produto.strip() if nome_produto else ""
+        if nome != "":
+            mascara = self.mascara_filtros(categoria, grupo, nome)
+            classificacao = self.classificar_niveis(limite_baixo, limite_medio, mascara)
+            return CuboAgregacao.construir(self.aplicar_mascara(mascara), classificacao.codigos)
+
+        chave = (limite_baixo, limite_medio)
+        cubo = self._cubos_agregacao.get(chave)
+        if cubo is None:
+            classificacao = self.classificar_niveis(limite_baixo, limite_medio)
+            cubo = self._memorizar(self._cubos_agregacao, chave, CuboAgregacao.construir(self.df, classificacao.codigos),
+                                   MAX_CLASSIFICACOES_NIVEIS)
+        return cubo.recortar(categoria, grupo)
+
+    def _mascara_nome(self, nome_produto):
+        """Máscara (alinhada a `df`) dos produtos cujo nome contém o texto, via índice de busca."""
+        if self.indice_busca is None:
+            return self.df['Produto'].str.contains(nome_produto, case=False, na=False, regex=False).to_numpy()
+        mascara_base = np.zeros(len(self.df_base), dtype=bool)
+        mascara_base[self.indice_busca.buscar(nome_produto)] = True
+        if self._posicoes_na_base is None:
+            return mascara_base
+        return mascara_base[self._posicoes_na_base]
+
+def publicar_dataset_base(df_base, origem=None):
+    """
+    Publica um novo DataFrame carregado (lido de `origem`), aplicando as exclusões salvas
+    na configuração. Cada publicação recebe um número de versão maior que o anterior.
+    """
+    global _dataset_atual, _contador_versoes
+    with _lock_dataset:
+        _contador_versoes += 1
+        _dataset_atual = DatasetEfetivo(df_base, carregar_configuracoes_exclusao(), _contador_versoes, origem=origem)
+        return _dataset_atual
+
+def reaplicar_exclusoes(config_exclusao=None):
+    """
+    Reconstrói o dataset efetivo com a configuração de exclusão atual (ou a informada).
+    Deve ser chamado depois que salvar_configuracoes_exclusao grava uma nova configuração.
+    """
+    global _dataset_atual
+    with _lock_dataset:
+        if _dataset_atual is None:
+            return None
+        config = config_exclusao if config_exclusao is not None else carregar_configuracoes_exclusao()
+        _dataset_atual = DatasetEfetivo(_dataset_atual.df_base, config, _dataset_atual.versao_dados,
+                                        indice_busca=_dataset_atual.indice_busca, origem=_dataset_atual.origem)
+        return _dataset_atual
+
+def _sincronizar_exclusoes():
+    """
+    Reaplica as exclusões se o arquivo de configuração mudou (pela assinatura de
+    config_manager) e as exclusões gravadas diferem das aplicadas. Cobre as gravações feitas
+    por outro processo, como outro worker do gunicorn, sem reiniciar este processo nem
+    descartar o que não depende das exclusões (como o índice de busca).
+    """
+    global _assinatura_config_sincronizada
+    assinatura = assinatura_config()
+    if assinatura == _assinatura_config_sincronizada:
+        return
+    with _lock_sincronizacao_exclusoes:
+        if assinatura == _assinatura_config_sincronizada:
+            return
+        config = carregar_configuracoes_exclusao()
+        if _dataset_atual is not None and _dataset_atual.hash_exclusao != calcular_hash_exclusao(config):
+            print("Configuração de exclusão alterada por outro processo; reaplicando as exclusões.")
+            reaplicar_exclusoes(config)
+        _assinatura_config_sincronizada = assinatura
+
+def obter_dataset_efetivo():
+    """
+    Retorna o dataset efetivo publicado (ou um dataset vazio se nada foi carregado), antes
+    reaplicando as exclusões se outro processo gravou uma configuração diferente.
+    """
+    if _dataset_atual is not None:
+        _sincronizar_exclusoes()
+    dataset = _dataset_atual
+    if dataset is None:
+        return DatasetEfetivo(pd.DataFrame(), {}, 0)
+    return dataset
@@ -0,0 +1,89 @@
+# modules/exportacao.py
+import csv
+import importlib.util
+import io
+from modules.data_loader import colunas_float32_para_float64
+
+# openpyxl e pyarrow só são importados ao gerar um arquivo: a rota de exportação e os botões
+# da aba não atrasam a inicialização do servidor. Sem pyarrow, não há exportação em Parquet.
+PARQUET_DISPONIVEL = importlib.util.find_spec("pyarrow") is not None
+
+FORMATO_XLSX = "xlsx"
+FORMATO_CSV = "csv"
+FORMATO_PARQUET = "parquet"
+TIPOS_CONTEUDO_EXPORTACAO = {
+    FORMATO_XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    FORMATO_CSV: "text/csv; charset=utf-8",
+    FORMATO_PARQUET: "application/vnd.apache.parquet",
+}
+COLUNAS_EXPORTACAO_PADRAO = ['Código', 'Produto', 'Un', 'Estoque', 'Categoria', 'Grupo', 'VendaMensal']
+# Linhas convertidas de cada vez: a memória da exportação não cresce com o tamanho da tabela
+LINHAS_POR_BLOCO_EXPORTACAO = 10_000
+# CSV no padrão do Excel em português (separador ';' e vírgula decimal); o BOM faz o Excel ler UTF-8
+SEPARADOR_CSV = ';'
+DECIMAL_CSV = ','
+BOM_UTF8 = '\ufeff'
+
+def formatos_disponiveis():
+    """Formatos de exportação que podem ser gerados neste ambiente."""
+    formatos = [FORMATO_XLSX, FORMATO_CSV]
+    if PARQUET_DISPONIVEL:
+        formatos.append(FORMATO_PARQUET)
+    return formatos
+
+def colunas_exportacao(df, colunas=None):
+    """Colunas pedidas (ou COLUNAS_EXPORTACAO_PADRAO) que existem em `df`, na ordem pedida."""
+    return [coluna for coluna in (colunas or COLUNAS_EXPORTACAO_PADRAO) if coluna in df.columns]
+
+def _blocos(df, colunas):
+    """Fatias de LINHAS_POR_BLOCO_EXPORTACAO linhas de `df[colunas]`, com float32 já convertido."""
+    for inicio in range(0, len(df), LINHAS_POR_BLOCO_EXPORTACAO):
+        yield colunas_float32_para_float64(df.iloc[inicio:inicio + LINHAS_POR_BLOCO_EXPORTACAO][colunas])
+
+def gerar_csv(df, colunas):
+    """Gera o CSV de `df[colunas]` em pedaços de texto (para uma resposta em streaming)."""
+    saida = io.StringIO()
+    csv.writer(saida, delimiter=SEPARADOR_CSV, lineterminator='\n').writerow(colunas)
+    yield BOM_UTF8 + saida.getvalue()
+    for bloco in _blocos(df, colunas):
+        yield bloco.to_csv(sep=SEPARADOR_CSV, decimal=DECIMAL_CSV, index=False, header=False)
+
+def _linhas_planilha(bloco):
+    """Linhas de um bloco como tuplas de valores Python (vazios viram None)."""
+    valores = bloco.astype(object).to_numpy()
+    valores[bloco.isna().to_numpy()] = None
+    return map(tuple, valores)
+
+def gravar_xlsx(df, colunas, destino, nome_planilha="Estoque"):
+    """
+    Grava `df[colunas]` como planilha em `destino` (caminho ou arquivo aberto em modo binário).
+    O modo write-only do openpyxl grava cada linha em um arquivo temporário em vez de montar a
+    planilha inteira na memória.
+    """
+    from openpyxl import Workbook
+    planilha = Workbook(write_only=True)
+    aba = planilha.create_sheet(nome_planilha)
+    aba.append(colunas)
+    for bloco in _blocos(df, colunas):
+        for linha in _linhas_planilha(bloco):
+            aba.append(linha)
+    planilha.save(destino)
+
+def gravar_parquet(df, colunas, destino):
+    """Grava `df[colunas]` em Parquet em `destino`, um row group por bloco (requer pyarrow)."""
+    if not PARQUET_DISPONIVEL:
+        raise RuntimeError("A exportação em Parquet requer o pacote pyarrow.")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    escritor = None
+    try:
+        for bloco in _blocos(df, colunas):
+            tabela = pa.Table.from_pandas(bloco, preserve_index=False)
+            if escritor is None:
+                escritor = pq.ParquetWriter(destino, tabela.schema)
+            escritor.write_table(tabela.cast(escritor.schema))
+        if escritor is None:
+            escritor = pq.ParquetWriter(destino, pa.Table.from_pandas(df.iloc[:0][colunas], preserve_index=False).schema)
+    finally:
+        if escritor is not None:
+            escritor.close()
@@ -0,0 +1,407 @@
+# modules/historico_snapshots.py
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from modules.data_loader import carregar_produtos_streaming, ler_cabecalho_relatorio
+from modules.snapshot_cache import _hash_conteudo
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+DIRETORIO_DADOS_PADRAO = "data"
+# Fora de DIRETORIO_CACHE_PADRAO: a limpeza do cache de snapshots remove o que não reconhece
+DIRETORIO_HISTORICO_PADRAO = ".historico_estoque"
+# Incrementar ao mudar o formato dos segmentos ou do manifesto
+VERSAO_FORMATO_HISTORICO = 1
+ARQUIVO_MANIFESTO = "manifesto.json"
+ARQUIVO_TRAVA = ".trava"
+EXTENSOES_RELATORIO = ('.csv', '.xlsx', '.xlsm')
+# Com o CSV e a planilha do mesmo relatório no diretório, vale o CSV (o export usado até aqui)
+EXTENSOES_PREFERIDAS_MESMA_DATA = ('.csv',)
+# Coluna guardada no histórico -> nome da coluna no cabeçalho do relatório
+COLUNAS_NUMERICAS_HISTORICO = {'Estoque': 'Estoque', 'VendaMensal': 'Venda', 'CustoEstoque': 'Custo Estoque'}
+# Colunas de texto guardadas como códigos em dicionários globais (só crescem, nunca reordenam)
+COLUNAS_TEXTO_HISTORICO = ['Código', 'Un', 'Produto', 'Categoria', 'Grupo']
+
+_lock_historico = threading.Lock()
+_historico_atual = None
+
+def _origem_preferida(meta):
+    return meta['origem'].lower().endswith(EXTENSOES_PREFERIDAS_MESMA_DATA)
+
+def _ordenar_sem_repetidos(valores):
+    """Valores distintos em ordem crescente (sort + diff; evita o np.unique baseado em hash)."""
+    ordenados = np.sort(valores)
+    if len(ordenados) == 0:
+        return ordenados
+    manter = np.empty(len(ordenados), dtype=bool)
+    manter[0] = True
+    np.not_equal(ordenados[1:], ordenados[:-1], out=manter[1:])
+    return ordenados[manter]
+
+def _gravar_json_atomico(caminho, dados):
+    caminho_temporario = f"{caminho}.tmp-{os.getpid()}"
+    with open(caminho_temporario, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, ensure_ascii=False)
+    os.replace(caminho_temporario, caminho)
+
+@contextmanager
+def _trava_entre_processos(diretorio):
+    """Trava exclusiva (flock) para que só um processo grave no histórico por vez."""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(diretorio, exist_ok=True)
+    with open(os.path.join(diretorio, ARQUIVO_TRAVA), 'a') as arquivo_trava:
+        fcntl.flock(arquivo_trava, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(arquivo_trava, fcntl.LOCK_UN)
+
+class SegmentoHistorico:
+    """
+    Um relatório ingerido: colunas em arrays NumPy alinhados, ordenados pelo código do
+    produto (`Código`, em códigos do dicionário global). Os arquivos .npy são abertos com
+    memory-mapping e nunca são reescritos.
+    """
+
+    def __init__(self, meta, diretorio_segmento):
+        self.id = meta['id']
+        self.data_estoque = pd.Timestamp(meta['data_estoque'])
+        self.origem = meta['origem']
+        self.hash_conteudo = meta['hash_conteudo']
+        self.linhas = meta['linhas']
+        self.colunas = {
+            coluna: np.load(os.path.join(diretorio_segmento, f"{coluna}.npy"), mmap_mode='r')
+            for coluna in meta['colunas']
+        }
+        self._somas_por_grupo = {}
+
+    def posicoes_codigos(self, codigos):
+        """Posição de cada código no segmento (-1 quando o produto não está neste relatório)."""
+        codigos_segmento = self.colunas['Código']
+        if len(codigos_segmento) == 0:
+            return np.full(len(codigos), -1, dtype='int64')
+        posicoes = np.searchsorted(codigos_segmento, codigos)
+        posicoes_limitadas = np.minimum(posicoes, len(codigos_segmento) - 1)
+        encontrados = codigos_segmento[posicoes_limitadas] == codigos
+        return np.where(encontrados, posicoes_limitadas, -1)
+
+    def somas_por_grupo(self, coluna, quantidade_grupos):
+        """
+        Soma de `coluna` e quantidade de produtos por código de grupo (NaN soma zero),
+        calculadas uma vez por segmento.
+        """
+        somas = self._somas_por_grupo.get(coluna)
+        if somas is None or len(somas[0]) < quantidade_grupos:
+            grupos = np.asarray(self.colunas['Grupo'])
+            validos = grupos >= 0
+            if coluna in self.colunas:
+                valores = np.nan_to_num(np.asarray(self.colunas[coluna], dtype='float64'))[validos]
+            else:
+                valores = np.zeros(int(validos.sum()))
+            somas = (np.bincount(grupos[validos], weights=valores, minlength=quantidade_grupos),
+                     np.bincount(grupos[validos], minlength=quantidade_grupos))
+            self._somas_por_grupo[coluna] = somas
+        return somas[0][:quantidade_grupos], somas[1][:quantidade_grupos]
+
+class HistoricoSnapshots:
+    """
+    Histórico colunar, só de acréscimo, dos relatórios "NECESSIDADE ESTOQUE" exportados.
+
+    Cada relatório ingerido vira um segmento em `diretorio_historico`, identificado pela data
+    do estoque do cabeçalho ("Estoque:'27/05/25") e com uma linha por Código. Arquivos já
+    ingeridos (mesmo caminho, tamanho e mtime, ou mesmo conteúdo) não são lidos de novo.
+    Se dois relatórios tiverem a mesma data, vale o ingerido por último. Vários processos
+    podem compartilhar o diretório: a gravação é feita sob trava e cada processo relê o
+    manifesto quando ele muda no disco.
+
+    As consultas trabalham segmento a segmento (busca binária pelos códigos ordenados e
+    bincount por grupo), então carregar N relatórios custa o total de linhas, sem reordenar
+    o histórico inteiro.
+    """
+
+    def __init__(self, diretorio_historico=DIRETORIO_HISTORICO_PADRAO):
+        self.diretorio_historico = diretorio_historico
+        self._lock = threading.RLock()
+        self._segmentos = {}
+        self._assinatura_manifesto = None
+        self._carregar_manifesto()
+
+    def _estado_manifesto(self):
+        try:
+            estado = os.stat(os.path.join(self.diretorio_historico, ARQUIVO_MANIFESTO))
+        except OSError:
+            return None
+        return estado.st_mtime_ns, estado.st_size
+
+    def _carregar_manifesto(self):
+        self._assinatura_manifesto = self._estado_manifesto()
+        self._manifesto = self._ler_manifesto()
+        self._indices_dicionarios = {
+            coluna: {valor: codigo for codigo, valor in enumerate(valores)}
+            for coluna, valores in self._manifesto['dicionarios'].items()
+        }
+
+    def _sincronizar_manifesto(self):
+        """Relê o manifesto se outro processo acrescentou relatórios desde a última leitura."""
+        if self._estado_manifesto() != self._assinatura_manifesto:
+            self._carregar_manifesto()
+
+    def _ler_manifesto(self):
+        manifesto_vazio = {
+            'versao_formato': VERSAO_FORMATO_HISTORICO,
+            'arquivos': {},
+            'segmentos': [],
+            'dicionarios': {coluna: [] for coluna in COLUNAS_TEXTO_HISTORICO},
+        }
+        caminho_manifesto = os.path.join(self.diretorio_historico, ARQUIVO_MANIFESTO)
+        try:
+            with open(caminho_manifesto, 'r', encoding='utf-8') as f:
+                manifesto = json.load(f)
+        except FileNotFoundError:
+            return manifesto_vazio
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Aviso: manifesto do histórico inválido em '{caminho_manifesto}', recriando. Erro: {e}")
+            manifesto = None
+
+        if manifesto is None or manifesto.get('versao_formato') != VERSAO_FORMATO_HISTORICO:
+            shutil.rmtree(self.diretorio_historico, ignore_errors=True)
+            return manifesto_vazio
+        return manifesto
+
+    # --- Ingestão ---
+
+    def _codificar_texto(self, coluna, serie):
+        """Converte os valores em códigos do dicionário global da coluna, acrescentando os novos."""
+        indice = self._indices_dicionarios.setdefault(coluna, {})
+        valores_dicionario = self._manifesto['dicionarios'].setdefault(coluna, [])
+        categorica = serie.astype('category')
+        codigos_categorias = np.empty(len(categorica.cat.categories) + 1, dtype='int32')
+        codigos_categorias[-1] = -1
+        for posicao, valor in enumerate(categorica.cat.categories):
+            valor = str(valor)
+            codigo = indice.get(valor)
+            if codigo is None:
+                codigo = len(valores_dicionario)
+                indice[valor] = codigo
+                valores_dicionario.append(valor)
+            codigos_categorias[posicao] = codigo
+        return codigos_categorias[categorica.cat.codes.to_numpy()]
+
+    def ingerir_arquivo(self, caminho_arquivo):
+        """
+        Acrescenta o relatório ao histórico, se ainda não foi ingerido.
+        Retorna True quando um novo segmento foi gravado.
+        """
+        caminho_absoluto = os.path.abspath(caminho_arquivo)
+        with self._lock, _trava_entre_processos(self.diretorio_historico):
+            self._sincronizar_manifesto()
+            try:
+                estado = os.stat(caminho_absoluto)
+            except OSError as e:
+                print(f"Erro: não foi possível ler o arquivo {caminho_arquivo}: {e}")
+                return False
+
+            registro = self._manifesto['arquivos'].get(caminho_absoluto)
+            if registro and registro['tamanho'] == estado.st_size and registro['mtime_ns'] == estado.st_mtime_ns:
+                return False
+
+            hash_conteudo = _hash_conteudo(caminho_absoluto)
+            self._manifesto['arquivos'][caminho_absoluto] = {
+                'tamanho': estado.st_size, 'mtime_ns': estado.st_mtime_ns, 'hash_conteudo': hash_conteudo,
+            }
+            if any(segmento['hash_conteudo'] == hash_conteudo for segmento in self._manifesto['segmentos']):
+                self._gravar_manifesto()
+                return False
+
+            data_estoque = ler_cabecalho_relatorio(caminho_absoluto)['data_estoque']
+            if data_estoque is None:
+                data_estoque = pd.Timestamp(estado.st_mtime, unit='s').normalize()
+                print(f"Aviso: data do estoque não encontrada no cabeçalho de {caminho_arquivo}; usando a data do arquivo ({data_estoque:%d/%m/%Y}).")
+
+            df = carregar_produtos_streaming(caminho_absoluto, colunas_numericas=COLUNAS_NUMERICAS_HISTORICO)
+            if df is None or df.empty or 'Código' not in df.columns:
+                print(f"Aviso: nenhum produto ingerido no histórico a partir de {caminho_arquivo}.")
+                self._gravar_manifesto()
+                return False
+
+            df = df.drop_duplicates(subset='Código', keep='last')
+            colunas = {coluna: self._codificar_texto(coluna, df[coluna]) for coluna in COLUNAS_TEXTO_HISTORICO if coluna in df.columns}
+            colunas.update({coluna: df[coluna].to_numpy(dtype='float64') for coluna in COLUNAS_NUMERICAS_HISTORICO if coluna in df.columns})
+            ordem = np.argsort(colunas['Código'], kind='stable')
+
+            id_segmento = max((segmento['id'] for segmento in self._manifesto['segmentos']), default=-1) + 1
+            diretorio_segmento = os.path.join(self.diretorio_historico, f"segmento_{id_segmento:06d}")
+            diretorio_temporario = f"{diretorio_segmento}.tmp-{os.getpid()}"
+            shutil.rmtree(diretorio_temporario, ignore_errors=True)
+            os.makedirs(diretorio_temporario)
+            for coluna, valores in colunas.items():
+                np.save(os.path.join(diretorio_temporario, f"{coluna}.npy"), valores[ordem])
+            os.replace(diretorio_temporario, diretorio_segmento)
+
+            self._manifesto['segmentos'].append({
+                'id': id_segmento, 'origem': caminho_absoluto, 'hash_conteudo': hash_conteudo,
+                'data_estoque': data_estoque.strftime('%Y-%m-%d'), 'linhas': len(df),
+                'colunas': list(colunas), 'ingerido_em': time.time(),
+            })
+            self._gravar_manifesto()
+            print(f"Histórico: {len(df)} produtos de {data_estoque:%d/%m/%Y} ingeridos do arquivo: {caminho_arquivo}")
+            return True
+
+    def ingerir_diretorio(self, diretorio=DIRETORIO_DADOS_PADRAO):
+        """Ingere todos os relatórios (EXTENSOES_RELATORIO) do diretório. Retorna quantos segmentos novos foram gravados."""
+        try:
+            nomes = sorted(os.listdir(diretorio))
+        except OSError as e:
+            print(f"Erro ao listar o diretório de relatórios {diretorio}: {e}")
+            return 0
+        novos = 0
+        for nome in nomes:
+            caminho = os.path.join(diretorio, nome)
+            if nome.lower().endswith(EXTENSOES_RELATORIO) and os.path.isfile(caminho):
+                novos += self.ingerir_arquivo(caminho)
+        return novos
+
+    def _gravar_manifesto(self):
+        os.makedirs(self.diretorio_historico, exist_ok=True)
+        _gravar_json_atomico(os.path.join(self.diretorio_historico, ARQUIVO_MANIFESTO), self._manifesto)
+        self._assinatura_manifesto = self._estado_manifesto()
+
+    # --- Consulta ---
+
+    def _segmento(self, meta):
+        segmento = self._segmentos.get(meta['id'])
+        if segmento is None:
+            segmento = SegmentoHistorico(meta, os.path.join(self.diretorio_historico, f"segmento_{meta['id']:06d}"))
+            self._segmentos[meta['id']] = segmento
+        return segmento
+
+    def segmentos_por_data(self):
+        """
+        Segmentos vigentes (o último ingerido de cada data, dando preferência aos relatórios
+        em EXTENSOES_PREFERIDAS_MESMA_DATA), em ordem cronológica.
+        """
+        with self._lock:
+            self._sincronizar_manifesto()
+            vigentes = {}
+            for meta in self._manifesto['segmentos']:
+                atual = vigentes.get(meta['data_estoque'])
+                if atual is None or _origem_preferida(meta) >= _origem_preferida(atual):
+                    vigentes[meta['data_estoque']] = meta
+            return [self._segmento(vigentes[data]) for data in sorted(vigentes)]
+
+    @property
+    def datas(self):
+        return [segmento.data_estoque for segmento in self.segmentos_por_data()]
+
+    def _valores_dicionario(self, coluna):
+        return self._manifesto['dicionarios'].get(coluna, [])
+
+    def caminho_relatorio_mais_recente(self):
+        """Caminho de um arquivo existente com o relatório de data mais recente (None se não houver)."""
+        with self._lock:
+            self._sincronizar_manifesto()
+            for segmento in reversed(self.segmentos_por_data()):
+                if os.path.isfile(segmento.origem):
+                    return segmento.origem
+                for caminho, registro in self._manifesto['arquivos'].items():
+                    if registro['hash_conteudo'] == segmento.hash_conteudo and os.path.isfile(caminho):
+                        return caminho
+            return None
+
+    def linha_do_tempo_produto(self, codigo_produto):
+        """
+        Evolução de um produto ao longo dos relatórios: uma linha por data em que o Código
+        aparece, com Estoque, VendaMensal e CustoEstoque.
+        """
+        with self._lock:
+            self._sincronizar_manifesto()
+            colunas_saida = ['Data', *COLUNAS_NUMERICAS_HISTORICO]
+            codigo = self._indices_dicionarios.get('Código', {}).get(str(codigo_produto).strip())
+            if codigo is None:
+                return pd.DataFrame(columns=colunas_saida)
+
+            linhas = []
+            for segmento in self.segmentos_por_data():
+                posicao = segmento.posicoes_codigos(np.array([codigo], dtype='int32'))[0]
+                if posicao >= 0:
+                    linhas.append([segmento.data_estoque, *(float(segmento.colunas[coluna][posicao]) if coluna in segmento.colunas else np.nan
+                                                          for coluna in COLUNAS_NUMERICAS_HISTORICO)])
+            return pd.DataFrame(linhas, columns=colunas_saida)
+
+    def variacao_entre_snapshots(self, data_inicial=None, data_final=None, coluna='Estoque'):
+        """
+        Variação de `coluna` por produto entre dois relatórios (padrão: os dois mais recentes).
+        Produtos presentes em só um dos relatórios aparecem com NaN do outro lado.
+        Colunas: Código, Produto, Grupo, <coluna>Inicial, <coluna>Final e Variacao.
+        """
+        with self._lock:
+            self._sincronizar_manifesto()
+            segmentos = {segmento.data_estoque: segmento for segmento in self.segmentos_por_data()}
+            datas = sorted(segmentos)
+            colunas_saida = ['Código', 'Produto', 'Grupo', f'{coluna}Inicial', f'{coluna}Final', 'Variacao']
+            if len(datas) < 2 and (data_inicial is None or data_final is None):
+                return pd.DataFrame(columns=colunas_saida)
+            segmento_inicial = segmentos.get(pd.Timestamp(data_inicial) if data_inicial is not None else datas[-2])
+            segmento_final = segmentos.get(pd.Timestamp(data_final) if data_final is not None else datas[-1])
+            if segmento_inicial is None or segmento_final is None:
+                print(f"Aviso: não há relatório no histórico para a data {data_inicial if segmento_inicial is None else data_final}.")
+                return pd.DataFrame(columns=colunas_saida)
+
+            codigos = _ordenar_sem_repetidos(np.concatenate([segmento_inicial.colunas['Código'], segmento_final.colunas['Código']]))
+            valores = []
+            textos = {'Produto': np.full(len(codigos), -1, dtype='int32'), 'Grupo': np.full(len(codigos), -1, dtype='int32')}
+            for segmento in (segmento_inicial, segmento_final):
+                posicoes = segmento.posicoes_codigos(codigos)
+                presentes = posicoes >= 0
+                serie = np.full(len(codigos), np.nan)
+                if coluna in segmento.colunas:
+                    serie[presentes] = segmento.colunas[coluna][posicoes[presentes]]
+                valores.append(serie)
+                # Nome e grupo do relatório mais recente prevalecem
+                for coluna_texto, codigos_texto in textos.items():
+                    codigos_texto[presentes] = segmento.colunas[coluna_texto][posicoes[presentes]]
+
+            def decodificar(coluna_texto, codigos_texto):
+                dicionario = np.array(self._valores_dicionario(coluna_texto) + [None], dtype=object)
+                return dicionario[codigos_texto]
+
+            return pd.DataFrame({
+                'Código': decodificar('Código', codigos),
+                'Produto': decodificar('Produto', textos['Produto']),
+                'Grupo': decodificar('Grupo', textos['Grupo']),
+                f'{coluna}Inicial': valores[0],
+                f'{coluna}Final': valores[1],
+                'Variacao': valores[1] - valores[0],
+            })
+
+    def tendencia_grupos(self, coluna='Estoque'):
+        """Soma de `coluna` por Grupo em cada relatório: índice = data do estoque, colunas = grupos."""
+        with self._lock:
+            self._sincronizar_manifesto()
+            grupos = self._valores_dicionario('Grupo')
+            segmentos = self.segmentos_por_data()
+            if not segmentos or not grupos:
+                return pd.DataFrame()
+            somas, contagens = zip(*(segmento.somas_por_grupo(coluna, len(grupos)) for segmento in segmentos))
+            indice_datas = pd.DatetimeIndex([segmento.data_estoque for segmento in segmentos], name='Data')
+            tendencia = pd.DataFrame(np.vstack(somas), index=indice_datas, columns=grupos)
+            # Grupos que só existiram em relatórios substituídos não entram
+            return tendencia.loc[:, np.vstack(contagens).any(axis=0)]
+
+def obter_historico_snapshots(diretorio_historico=DIRETORIO_HISTORICO_PADRAO):
+    """Retorna o histórico compartilhado do processo (aberto na primeira chamada)."""
+    global _historico_atual
+    with _lock_historico:
+        if _historico_atual is None or _historico_atual.diretorio_historico != diretorio_historico:
+            _historico_atual = HistoricoSnapshots(diretorio_historico)
+        return _historico_atual
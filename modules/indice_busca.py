@@ -0,0 +1,172 @@
+# modules/indice_busca.py
+import threading
+import unicodedata
+from collections import OrderedDict
+import numpy as np
+
+TAMANHO_NGRAMA = 3
+MAX_CONSULTAS_RECENTES = 256
+# Total de posições guardadas nas consultas recentes (int32: 4 bytes cada), e a fração do
+# índice acima da qual um resultado não é guardado (consultas curtas casam quase tudo)
+MAX_POSICOES_CONSULTAS_RECENTES = 1_000_000
+FRACAO_MAXIMA_RESULTADO_GUARDADO = 0.05
+# Abaixo desse número de candidatos é mais barato conferir a substring direto do que intersectar
+MAX_CANDIDATOS_VERIFICACAO_DIRETA = 64
+SEPARADOR = '\x00'
+
+def normalizar_texto_busca(texto):
+    """Remove acentos e converte para minúsculas ("Pão de AÇÚCAR" -> "pao de acucar")."""
+    if not isinstance(texto, str):
+        return ''
+    if texto.isascii():
+        return texto.casefold()
+    decomposto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).casefold()
+
+def _chaves_trigramas(codigos, tamanho_alfabeto):
+    """Combina três caracteres consecutivos (já convertidos para a posição no alfabeto) em uma chave inteira."""
+    codigos = codigos.astype(np.int64)
+    return (codigos[:-2] * tamanho_alfabeto + codigos[1:-1]) * tamanho_alfabeto + codigos[2:]
+
+class IndiceBuscaProdutos:
+    """
+    Índice invertido de trigramas para busca por substring em nomes de produtos.
+
+    Os textos são normalizados (sem acentos, minúsculos) e cada trigrama aponta para a
+    lista ordenada de posições que o contêm. Uma consulta intersecta as listas dos seus
+    trigramas e confirma os candidatos com uma busca de substring. Consultas recentes
+    ficam guardadas (menos as que casam boa parte dos textos): ao digitar mais caracteres,
+    a nova consulta é verificada apenas dentro do resultado da consulta anterior (prefixo).
+
+    A construção é vetorizada com NumPy (sem laço por produto além da normalização), e o
+    índice é somente leitura depois de criado, podendo ser compartilhado entre threads.
+    """
+
+    def __init__(self, textos):
+        self._textos = [normalizar_texto_busca(texto) for texto in textos]
+        self._todas_posicoes = np.arange(len(self._textos), dtype=np.int32)
+        self._consultas_recentes = OrderedDict()
+        self._posicoes_guardadas = 0
+        self._lock = threading.Lock()
+        self._construir()
+
+    def __len__(self):
+        return len(self._textos)
+
+    def texto_normalizado(self, posicao):
+        """Texto da posição como foi indexado (sem acentos, minúsculo)."""
+        return self._textos[posicao]
+
+    def _construir(self):
+        texto_unico = SEPARADOR.join(self._textos) + SEPARADOR
+        codigos = np.frombuffer(texto_unico.encode('utf-32-le'), dtype=np.uint32)
+
+        # Os caracteres são renumerados pelo alfabeto efetivamente usado nos nomes, de modo que
+        # o trigrama e a posição do texto caibam juntos em um único int64 ordenável.
+        alfabeto = np.flatnonzero(np.bincount(codigos))
+        self._tamanho_alfabeto = len(alfabeto)
+        self._posicao_no_alfabeto = {int(codigo): indice for indice, codigo in enumerate(alfabeto)}
+        tabela_alfabeto = np.zeros(int(alfabeto[-1]) + 1, dtype=np.int32)
+        tabela_alfabeto[alfabeto] = np.arange(len(alfabeto), dtype=np.int32)
+        codigos = tabela_alfabeto[codigos]
+
+        tamanhos = np.fromiter((len(texto) + 1 for texto in self._textos), dtype=np.int64, count=len(self._textos))
+        posicao_por_caractere = np.repeat(self._todas_posicoes, tamanhos)
+
+        # Um trigrama é válido quando os três caracteres pertencem ao mesmo texto;
+        # como o separador é o último caractere de cada texto, basta checar o terceiro.
+        validos = (posicao_por_caractere[:-2] == posicao_por_caractere[2:]) & (codigos[2:] != 0)
+        chaves = _chaves_trigramas(codigos, self._tamanho_alfabeto)[validos]
+        posicoes = posicao_por_caractere[:-2][validos].astype(np.int64)
+
+        bits_posicao = max(1, (len(self._textos) - 1).bit_length())
+        if self._tamanho_alfabeto ** 3 < 2 ** (63 - bits_posicao):
+            pares = np.sort((chaves << bits_posicao) | posicoes)
+            pares = pares[np.r_[True, pares[1:] != pares[:-1]]] if len(pares) else pares
+            chaves = pares >> bits_posicao
+            posicoes = pares & ((1 << bits_posicao) - 1)
+        else:
+            # Alfabeto grande demais para a chave combinada: ordenação estável só pela chave
+            # (as posições já estão em ordem crescente) e remoção dos pares repetidos.
+            ordem = np.argsort(chaves, kind='stable')
+            chaves, posicoes = chaves[ordem], posicoes[ordem]
+            distintos = np.ones(len(chaves), dtype=bool)
+            distintos[1:] = (chaves[1:] != chaves[:-1]) | (posicoes[1:] != posicoes[:-1])
+            chaves, posicoes = chaves[distintos], posicoes[distintos]
+
+        inicio_de_chave = np.flatnonzero(np.r_[True, chaves[1:] != chaves[:-1]]) if len(chaves) else np.empty(0, dtype=np.int64)
+        self._chaves = chaves[inicio_de_chave]
+        self._inicios = np.r_[inicio_de_chave, len(chaves)]
+        self._posicoes = posicoes.astype(np.int32)
+
+    def _lista_do_trigrama(self, chave):
+        indice = np.searchsorted(self._chaves, chave)
+        if indice >= len(self._chaves) or self._chaves[indice] != chave:
+            return self._posicoes[:0]
+        return self._posicoes[self._inicios[indice]:self._inicios[indice + 1]]
+
+    def _candidatos_por_trigramas(self, consulta):
+        codigos = [self._posicao_no_alfabeto.get(ord(caractere)) for caractere in consulta]
+        if None in codigos:
+            # Caractere que não aparece em nenhum nome: nenhum texto pode conter a consulta
+            return self._posicoes[:0]
+        chaves = np.unique(_chaves_trigramas(np.array(codigos), self._tamanho_alfabeto))
+        listas = sorted((self._lista_do_trigrama(chave) for chave in chaves), key=len)
+        candidatos = listas[0]
+        for lista in listas[1:]:
+            if len(candidatos) <= MAX_CANDIDATOS_VERIFICACAO_DIRETA:
+                break
+            # Busca binária dos (poucos) candidatos na lista maior, sem percorrê-la inteira
+            indices = np.searchsorted(lista, candidatos)
+            encontrados = indices < len(lista)
+            encontrados[encontrados] = lista[indices[encontrados]] == candidatos[encontrados]
+            candidatos = candidatos[encontrados]
+        return candidatos
+
+    def _resultado_recente(self, consulta):
+        """Procura o resultado da consulta mais longa já feita que seja prefixo desta."""
+        with self._lock:
+            for tamanho in range(len(consulta), 0, -1):
+                resultado = self._consultas_recentes.get(consulta[:tamanho])
+                if resultado is not None:
+                    self._consultas_recentes.move_to_end(consulta[:tamanho])
+                    return consulta[:tamanho], resultado
+        return None, None
+
+    def buscar(self, consulta):
+        """
+        Retorna as posições (np.ndarray ordenado de int32) dos textos que contêm `consulta`,
+        ignorando acentos e maiúsculas.
+        """
+        consulta = normalizar_texto_busca(consulta)
+        if consulta == '':
+            return self._todas_posicoes
+
+        prefixo, resultado_prefixo = self._resultado_recente(consulta)
+        if prefixo == consulta:
+            return resultado_prefixo
+        if resultado_prefixo is not None:
+            candidatos = resultado_prefixo
+        elif len(consulta) >= TAMANHO_NGRAMA:
+            candidatos = self._candidatos_por_trigramas(consulta)
+        else:
+            candidatos = self._todas_posicoes
+
+        textos = self._textos
+        resultado = np.fromiter((p for p in candidatos if consulta in textos[p]), dtype=np.int32)
+
+        if len(resultado) <= FRACAO_MAXIMA_RESULTADO_GUARDADO * len(self._textos):
+            self._guardar_consulta(consulta, resultado)
+        return resultado
+
+    def _guardar_consulta(self, consulta, resultado):
+        """Guarda o resultado, limitado por MAX_CONSULTAS_RECENTES e MAX_POSICOES_CONSULTAS_RECENTES."""
+        with self._lock:
+            if consulta in self._consultas_recentes:
+                return
+            self._consultas_recentes[consulta] = resultado
+            self._posicoes_guardadas += len(resultado)
+            while (len(self._consultas_recentes) > MAX_CONSULTAS_RECENTES
+                   or self._posicoes_guardadas > MAX_POSICOES_CONSULTAS_RECENTES):
+                _, resultado_antigo = self._consultas_recentes.popitem(last=False)
+                self._posicoes_guardadas -= len(resultado_antigo)
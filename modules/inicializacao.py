@@ -0,0 +1,124 @@
+# modules/inicializacao.py
+import os
+import threading
+import time
+from modules.data_loader import carregar_produtos_compactos
+from modules.dataset_efetivo import obter_dataset_efetivo, publicar_dataset_base
+from modules.historico_snapshots import DIRETORIO_DADOS_PADRAO, obter_historico_snapshots
+from modules.instrumentacao import obter_registro_metricas, instrumentacao_ativa, METRICA_DURACAO, TIPO_INICIALIZACAO
+from modules.snapshot_cache import carregar_produtos_com_cache
+
+# Com "1", o servidor abre a porta logo depois das importações e serve uma página de
+# "carregando" enquanto o relatório é lido em uma thread de fundo
+VARIAVEL_INICIO_RAPIDO = "DASHESTOQUE_INICIO_RAPIDO"
+CAMINHO_RELATORIO_PADRAO = "data/DAMI29-05.CSV"
+
+SITUACAO_PENDENTE = "pendente"
+SITUACAO_CARREGANDO = "carregando"
+SITUACAO_PRONTO = "pronto"
+SITUACAO_ERRO = "erro"
+
+# Etapas do relatório de inicialização, na ordem em que acontecem
+ETAPA_IMPORTACAO = "importacao"
+ETAPA_HISTORICO = "ingestao_historico"
+ETAPA_LEITURA = "leitura_relatorio"
+ETAPA_LAYOUT = "primeiro_layout"
+ROTULOS_ETAPAS_INICIALIZACAO = {
+    ETAPA_IMPORTACAO: "importação dos módulos",
+    ETAPA_HISTORICO: "ingestão no histórico",
+    ETAPA_LEITURA: "leitura do relatório",
+    ETAPA_LAYOUT: "primeiro layout",
+}
+
+_lock_carga = threading.Lock()
+_estado_carga = {"situacao": SITUACAO_PENDENTE, "mensagem": "", "thread": None}
+_tempos_inicializacao = {}
+
+def inicio_rapido_ativo():
+    return os.environ.get(VARIAVEL_INICIO_RAPIDO) == "1"
+
+def registrar_tempo_inicializacao(etapa, segundos):
+    """
+    Guarda o tempo de uma etapa da inicialização (a primeira medição de cada etapa vale) e o
+    registra nas métricas. Com as etapas principais medidas, imprime o relatório de inicialização.
+    """
+    with _lock_carga:
+        if etapa in _tempos_inicializacao:
+            return
+        _tempos_inicializacao[etapa] = segundos
+        completo = all(etapa in _tempos_inicializacao for etapa in ROTULOS_ETAPAS_INICIALIZACAO)
+    if instrumentacao_ativa():
+        obter_registro_metricas().observar(METRICA_DURACAO, etapa, TIPO_INICIALIZACAO, segundos)
+    if completo:
+        print(texto_relatorio_inicializacao())
+
+def tempos_inicializacao():
+    with _lock_carga:
+        return dict(_tempos_inicializacao)
+
+def texto_relatorio_inicializacao():
+    """Relatório de inicialização: o tempo de cada etapa medida até agora."""
+    tempos = tempos_inicializacao()
+    partes = [f"{rotulo} {tempos[etapa]:.2f} s" for etapa, rotulo in ROTULOS_ETAPAS_INICIALIZACAO.items() if etapa in tempos]
+    return "Inicialização: " + " | ".join(partes)
+
+def carregar_dados_iniciais(diretorio=DIRETORIO_DADOS_PADRAO):
+    """
+    Ingere no histórico os relatórios novos de `diretorio`, carrega o de data de estoque mais
+    recente e o publica como dataset efetivo. Retorna o dataset publicado.
+    """
+    inicio = time.perf_counter()
+    historico_snapshots = obter_historico_snapshots()
+    historico_snapshots.ingerir_diretorio(diretorio)
+    caminho_arquivo = historico_snapshots.caminho_relatorio_mais_recente() or CAMINHO_RELATORIO_PADRAO
+    registrar_tempo_inicializacao(ETAPA_HISTORICO, time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    df_produtos = carregar_produtos_com_cache(caminho_arquivo, carregador=carregar_produtos_compactos)
+    dataset = publicar_dataset_base(df_produtos, origem=caminho_arquivo)
+    registrar_tempo_inicializacao(ETAPA_LEITURA, time.perf_counter() - inicio)
+    return dataset
+
+def _executar_carga(diretorio, ao_concluir):
+    try:
+        dataset = carregar_dados_iniciais(diretorio)
+        if dataset.vazio:
+            _definir_situacao(SITUACAO_ERRO, f"Nenhum produto foi carregado do arquivo {dataset.origem}.")
+            return
+        if ao_concluir is not None:
+            ao_concluir(dataset)
+        _definir_situacao(SITUACAO_PRONTO)
+    except Exception as e:
+        print(f"Erro ao carregar os dados iniciais: {e}")
+        _definir_situacao(SITUACAO_ERRO, f"Erro ao carregar os dados: {e}")
+
+def _definir_situacao(situacao, mensagem=""):
+    with _lock_carga:
+        _estado_carga["situacao"] = situacao
+        _estado_carga["mensagem"] = mensagem
+
+def iniciar_carga_em_segundo_plano(diretorio=DIRETORIO_DADOS_PADRAO, ao_concluir=None):
+    """
+    Inicia (uma única vez por processo) carregar_dados_iniciais em uma thread de fundo.
+    `ao_concluir(dataset)` é chamado na mesma thread depois da publicação, antes de a carga
+    ser dada como pronta (por exemplo, para iniciar o monitor de data/).
+    """
+    with _lock_carga:
+        if _estado_carga["thread"] is not None:
+            return _estado_carga["thread"]
+        _estado_carga["situacao"] = SITUACAO_CARREGANDO
+        thread = threading.Thread(target=_executar_carga, args=(diretorio, ao_concluir), name="carga-inicial", daemon=True)
+        _estado_carga["thread"] = thread
+    thread.start()
+    return thread
+
+def situacao_carga():
+    """
+    (situação, mensagem) da carga inicial. Sem carga em segundo plano, a situação é
+    "pronto" quando algum dataset já foi publicado.
+    """
+    with _lock_carga:
+        situacao, mensagem = _estado_carga["situacao"], _estado_carga["mensagem"]
+    if situacao == SITUACAO_PENDENTE and not obter_dataset_efetivo().vazio:
+        return SITUACAO_PRONTO, ""
+    return situacao, mensagem
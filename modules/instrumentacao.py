@@ -0,0 +1,253 @@
+# modules/instrumentacao.py
+import functools
+import threading
+import time
+import tracemalloc
+from collections import deque
+import flask
+import numpy as np
+from plotly.io.json import to_json_plotly
+
+PREFIXO_METRICAS = "dashestoque"
+METRICA_DURACAO = "etapa_duracao_segundos"
+METRICA_PAYLOAD = "etapa_payload_bytes"
+METRICA_MEMORIA = "etapa_pico_memoria_bytes"
+DESCRICOES_METRICAS = {
+    METRICA_DURACAO: "Tempo de parede de cada etapa (callback, gráfico, trecho interno ou requisição completa).",
+    METRICA_PAYLOAD: "Tamanho em bytes da saída serializada (resposta do callback ou figura montada).",
+    METRICA_MEMORIA: "Pico de memória alocada durante a etapa (tracemalloc; só no modo detalhado).",
+}
+LIMITES_BUCKETS = {
+    METRICA_DURACAO: (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+    METRICA_PAYLOAD: (1e3, 1e4, 5e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7),
+    METRICA_MEMORIA: (1e5, 1e6, 1e7, 5e7, 1e8, 5e8, 1e9),
+}
+# Os quantis expostos (e mostrados no painel de diagnóstico) são calculados sobre as últimas amostras
+TAMANHO_JANELA_AMOSTRAS = 512
+QUANTIS_JANELA = (0.5, 0.95, 0.99)
+
+TIPO_CALLBACK = "callback"
+TIPO_GRAFICO = "grafico"
+TIPO_TRECHO = "trecho"
+TIPO_REQUISICAO = "requisicao"
+TIPO_INICIALIZACAO = "inicializacao"
+
+class HistogramaMovel:
+    """
+    Histograma de uma métrica: contagens acumuladas por bucket desde o início do processo
+    (formato histogram do Prometheus) e uma janela com as últimas amostras, da qual saem os
+    quantis recentes (formato summary).
+    """
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)
+        self.soma = 0.0
+        self.total = 0
+        self.janela = deque(maxlen=TAMANHO_JANELA_AMOSTRAS)
+
+    def observar(self, valor):
+        posicao = int(np.searchsorted(self.limites, valor, side='left'))
+        self.contagens[posicao] += 1
+        self.soma += valor
+        self.total += 1
+        self.janela.append(valor)
+
+    def quantis(self):
+        """Quantis QUANTIS_JANELA das amostras da janela (None sem amostras)."""
+        if not self.janela:
+            return {quantil: None for quantil in QUANTIS_JANELA}
+        valores = np.quantile(np.fromiter(self.janela, dtype='float64'), QUANTIS_JANELA)
+        return dict(zip(QUANTIS_JANELA, valores.tolist()))
+
+def _escapar_rotulo(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class RegistroMetricas:
+    """Histogramas por (métrica, etapa, tipo), compartilhados pelas threads do servidor."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histogramas = {}
+
+    def observar(self, metrica, etapa, tipo, valor):
+        with self._lock:
+            chave = (metrica, etapa, tipo)
+            histograma = self._histogramas.get(chave)
+            if histograma is None:
+                histograma = self._histogramas[chave] = HistogramaMovel(LIMITES_BUCKETS[metrica])
+            histograma.observar(valor)
+
+    def limpar(self):
+        with self._lock:
+            self._histogramas.clear()
+
+    def _copiar(self):
+        with self._lock:
+            copia = {}
+            for chave, histograma in self._histogramas.items():
+                clone = HistogramaMovel(histograma.limites)
+                clone.contagens, clone.soma, clone.total = list(histograma.contagens), histograma.soma, histograma.total
+                clone.janela.extend(histograma.janela)
+                copia[chave] = clone
+            return copia
+
+    def texto_prometheus(self):
+        """Todas as métricas no formato de texto do Prometheus (versão 0.0.4)."""
+        histogramas = self._copiar()
+        linhas = []
+        for metrica, descricao in DESCRICOES_METRICAS.items():
+            nome = f"{PREFIXO_METRICAS}_{metrica}"
+            chaves = sorted(chave for chave in histogramas if chave[0] == metrica)
+            linhas += [f"# HELP {nome} {descricao}", f"# TYPE {nome} histogram"]
+            for chave in chaves:
+                histograma = histogramas[chave]
+                rotulos = f'etapa="{_escapar_rotulo(chave[1])}",tipo="{_escapar_rotulo(chave[2])}"'
+                acumulado = 0
+                for limite, contagem in zip(list(histograma.limites) + ['+Inf'], histograma.contagens):
+                    acumulado += contagem
+                    linhas.append(f'{nome}_bucket{{{rotulos},le="{limite}"}} {acumulado}')
+                linhas.append(f"{nome}_sum{{{rotulos}}} {histograma.soma}")
+                linhas.append(f"{nome}_count{{{rotulos}}} {histograma.total}")
+
+            nome_janela = f"{nome}_janela"
+            linhas += [f"# HELP {nome_janela} {descricao} Quantis das últimas {TAMANHO_JANELA_AMOSTRAS} amostras.",
+                       f"# TYPE {nome_janela} summary"]
+            for chave in chaves:
+                histograma = histogramas[chave]
+                rotulos = f'etapa="{_escapar_rotulo(chave[1])}",tipo="{_escapar_rotulo(chave[2])}"'
+                for quantil, valor in histograma.quantis().items():
+                    linhas.append(f'{nome_janela}{{{rotulos},quantile="{quantil}"}} {valor}')
+                linhas.append(f"{nome_janela}_sum{{{rotulos}}} {float(sum(histograma.janela))}")
+                linhas.append(f"{nome_janela}_count{{{rotulos}}} {len(histograma.janela)}")
+        return "\n".join(linhas) + "\n"
+
+    def resumo(self):
+        """
+        Uma linha por (etapa, tipo) com chamadas e quantis recentes de duração, payload e memória,
+        ordenada pelo p95 de duração (as etapas mais lentas primeiro). Usado pelo painel de diagnóstico.
+        """
+        histogramas = self._copiar()
+        linhas = {}
+        for (metrica, etapa, tipo), histograma in histogramas.items():
+            linha = linhas.setdefault((etapa, tipo), {'etapa': etapa, 'tipo': tipo})
+            quantis = histograma.quantis()
+            if metrica == METRICA_DURACAO:
+                linha.update(chamadas=histograma.total, duracao_p50=quantis[0.5], duracao_p95=quantis[0.95],
+                             duracao_max=max(histograma.janela))
+            elif metrica == METRICA_PAYLOAD:
+                linha.update(payload_p50=quantis[0.5], payload_max=max(histograma.janela))
+            elif metrica == METRICA_MEMORIA:
+                linha.update(memoria_p50=quantis[0.5], memoria_max=max(histograma.janela))
+        return sorted(linhas.values(), key=lambda linha: linha.get('duracao_p95') or 0, reverse=True)
+
+_registro_metricas = RegistroMetricas()
+# Instrumentação ligada (tempo de parede) e modo detalhado (pico de memória via tracemalloc e
+# tamanho das figuras serializadas, que custam caro e por isso são opcionais)
+_estado_instrumentacao = {"ativa": True, "detalhada": False}
+_contexto_thread = threading.local()
+
+def obter_registro_metricas():
+    return _registro_metricas
+
+def configurar_instrumentacao(ativa=True, detalhada=False):
+    """Liga/desliga a instrumentação e o modo detalhado (inicia ou para o tracemalloc)."""
+    _estado_instrumentacao["ativa"] = bool(ativa)
+    _estado_instrumentacao["detalhada"] = bool(ativa and detalhada)
+    if _estado_instrumentacao["detalhada"] and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not _estado_instrumentacao["detalhada"] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def instrumentacao_ativa():
+    return _estado_instrumentacao["ativa"]
+
+def instrumentacao_detalhada():
+    return _estado_instrumentacao["detalhada"]
+
+def _pilha_etapas():
+    pilha = getattr(_contexto_thread, "pilha", None)
+    if pilha is None:
+        pilha = _contexto_thread.pilha = []
+    return pilha
+
+class _MedicaoEtapa:
+    """
+    Mede uma etapa (ver medir_etapa). Com o tracemalloc ligado, o pico é o maior valor de
+    memória rastreada durante a etapa menos o valor no início; etapas aninhadas repassam
+    o próprio pico à etapa de fora, já que cada uma zera o pico do tracemalloc ao começar.
+    Com requisições simultâneas o pico inclui alocações das outras threads (é aproximado).
+    """
+
+    def __init__(self, etapa, tipo):
+        self.etapa = etapa
+        self.tipo = tipo
+
+    def __enter__(self):
+        self.memoria = tracemalloc.is_tracing()
+        if self.memoria:
+            self.memoria_inicial = tracemalloc.get_traced_memory()[0]
+            self.pico_filhas = 0
+            tracemalloc.reset_peak()
+            _pilha_etapas().append(self)
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo_excecao, excecao, rastreamento):
+        duracao = time.perf_counter() - self.inicio
+        _registro_metricas.observar(METRICA_DURACAO, self.etapa, self.tipo, duracao)
+        if not self.memoria:
+            return False
+        pilha = _pilha_etapas()
+        if pilha and pilha[-1] is self:
+            pilha.pop()
+        # O modo detalhado pode ter sido desligado durante a etapa
+        if tracemalloc.is_tracing():
+            pico_absoluto = max(tracemalloc.get_traced_memory()[1], self.pico_filhas)
+            if pilha:
+                pilha[-1].pico_filhas = max(pilha[-1].pico_filhas, pico_absoluto)
+            _registro_metricas.observar(METRICA_MEMORIA, self.etapa, self.tipo, max(pico_absoluto - self.memoria_inicial, 0))
+        return False
+
+def medir_trecho(etapa, tipo=TIPO_TRECHO):
+    """Context manager que mede um trecho de código como a etapa `etapa`."""
+    if not _estado_instrumentacao["ativa"]:
+        return _TRECHO_NULO
+    return _MedicaoEtapa(etapa, tipo)
+
+class _TrechoNulo:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+_TRECHO_NULO = _TrechoNulo()
+
+def medir_etapa(tipo=TIPO_TRECHO):
+    """
+    Decorador que registra o tempo de parede de cada chamada (e, no modo detalhado, o pico
+    de memória) com o nome da função como etapa. Em callbacks (TIPO_CALLBACK), anota o nome
+    na requisição para que o tamanho da resposta seja atribuído a ele; em gráficos
+    (TIPO_GRAFICO), o modo detalhado também mede o tamanho da figura serializada.
+    """
+    def decorador(funcao):
+        etapa = funcao.__name__
+
+        @functools.wraps(funcao)
+        def funcao_medida(*args, **kwargs):
+            if not _estado_instrumentacao["ativa"]:
+                return funcao(*args, **kwargs)
+            if tipo == TIPO_CALLBACK:
+                _anotar_callback_da_requisicao(etapa)
+            with _MedicaoEtapa(etapa, tipo):
+                resultado = funcao(*args, **kwargs)
+            if tipo == TIPO_GRAFICO and _estado_instrumentacao["detalhada"]:
+                _registro_metricas.observar(METRICA_PAYLOAD, etapa, tipo, len(to_json_plotly(resultado)))
+            return resultado
+        return funcao_medida
+    return decorador
+
+def _anotar_callback_da_requisicao(etapa):
+    if flask.has_request_context():
+        flask.g.etapa_callback = etapa
@@ -1,5 +1,74 @@
 # modules/inventory_manager.py
+import numpy as np
 import pandas as pd
+from modules.data_loader import serie_numerica
+
+# Códigos dos níveis de estoque (índices de ClassificacaoNiveisEstoque.contagens)
+NIVEL_BAIXO = 0
+NIVEL_MEDIO = 1
+NIVEL_ALTO = 2
+NIVEL_DESCONHECIDO = 3
+NIVEL_LIMITES_INVALIDOS = 4
+QUANTIDADE_NIVEIS = 5
+# Ordem de exibição no gráfico (do mais importante para o menos)
+ORDEM_EXIBICAO_NIVEIS = [NIVEL_ALTO, NIVEL_MEDIO, NIVEL_BAIXO, NIVEL_DESCONHECIDO, NIVEL_LIMITES_INVALIDOS]
+
+def rotulos_niveis_estoque(limite_baixo, limite_medio):
+    """Rótulos exibidos para cada código de nível, conforme os limites."""
+    try:
+        lim_b = float(limite_baixo)
+        lim_m = float(limite_medio)
+    except (ValueError, TypeError):
+        return {NIVEL_DESCONHECIDO: 'Desconhecido', NIVEL_LIMITES_INVALIDOS: 'Desconhecido (Limites Inválidos)'}
+    return {
+        NIVEL_BAIXO: f'Baixo (≤{lim_b:g})',
+        NIVEL_MEDIO: f'Médio ({lim_b:g} < E ≤ {lim_m:g})',
+        NIVEL_ALTO: f'Alto (>{lim_m:g})',
+        NIVEL_DESCONHECIDO: 'Desconhecido',
+        NIVEL_LIMITES_INVALIDOS: 'Desconhecido (Limites Inválidos)',
+    }
+
+class ClassificacaoNiveisEstoque:
+    """
+    Resultado de classificar_niveis_estoque: um código de nível por linha (np.int8,
+    alinhado ao DataFrame classificado) e a contagem de linhas em cada nível.
+    """
+
+    def __init__(self, codigos, limite_baixo, limite_medio):
+        self.codigos = codigos
+        self.limite_baixo = limite_baixo
+        self.limite_medio = limite_medio
+        self.contagens = np.bincount(codigos, minlength=QUANTIDADE_NIVEIS)
+
+    def mascara(self, codigo_nivel):
+        return self.codigos == codigo_nivel
+
+    def subconjunto(self, mascara_linhas):
+        """Classificação restrita às linhas de `mascara_linhas` (None = todas)."""
+        if mascara_linhas is None:
+            return self
+        return ClassificacaoNiveisEstoque(self.codigos[mascara_linhas], self.limite_baixo, self.limite_medio)
+
+def classificar_niveis_estoque(serie_estoque, limite_baixo, limite_medio):
+    """
+    Classifica todos os produtos de uma vez (sem apply por linha):
+    Estoque ≤ limite_baixo -> Baixo; ≤ limite_medio -> Médio; acima -> Alto.
+    Estoque ausente ou não numérico fica como Desconhecido; limites inválidos
+    deixam todas as linhas como NIVEL_LIMITES_INVALIDOS.
+    """
+    try:
+        lim_b = float(limite_baixo)
+        lim_m = float(limite_medio)
+    except (ValueError, TypeError):
+        return ClassificacaoNiveisEstoque(np.full(len(serie_estoque), NIVEL_LIMITES_INVALIDOS, dtype=np.int8), limite_baixo, limite_medio)
+
+    estoque = serie_numerica(serie_estoque).to_numpy(dtype='float64')
+    codigos = np.select(
+        [np.isnan(estoque), estoque <= lim_b, estoque <= lim_m],
+        [NIVEL_DESCONHECIDO, NIVEL_BAIXO, NIVEL_MEDIO],
+        default=NIVEL_ALTO
+    ).astype(np.int8)
+    return ClassificacaoNiveisEstoque(codigos, lim_b, lim_m)
 
 def identificar_produtos_em_falta(df_estoque, limite_falta=0):
     """
@@ -9,13 +78,12 @@ def identificar_produtos_em_falta(df_estoque, limite_falta=0):
     if df_estoque is None or df_estoque.empty or 'Estoque' not in df_estoque.columns:
         return pd.DataFrame(columns=df_estoque.columns if df_estoque is not None else [])
 
-    df_estoque_copia = df_estoque.copy()
-    df_estoque_copia['Estoque'] = pd.to_numeric(df_estoque_copia['Estoque'], errors='coerce')
-    
-    df_em_falta = df_estoque_copia[df_estoque_copia['Estoque'] <= limite_falta].copy()
+    mascara_em_falta = classificar_niveis_estoque(df_estoque['Estoque'], limite_falta, limite_falta).mascara(NIVEL_BAIXO)
+    df_em_falta = df_estoque[mascara_em_falta].copy()
+    df_em_falta['Estoque'] = serie_numerica(df_em_falta['Estoque'])
     return df_em_falta
 
-def identificar_produtos_estoque_baixo(df_estoque, limite_estoque_baixo):
+def identificar_produtos_estoque_baixo(df_estoque, limite_estoque_baixo, classificacao=None):
     """
     Identifica produtos com estoque baixo (Estoque <= limite_estoque_baixo).
     Não inclui produtos com estoque NaN após conversão.
@@ -24,6 +92,8 @@ def identificar_produtos_estoque_baixo(df_estoque, limite_estoque_baixo):
         df_estoque (pd.DataFrame): DataFrame contendo os dados de estoque.
                                    Deve incluir uma coluna 'Estoque'.
         limite_estoque_baixo (int/float): O limite para considerar estoque como baixo.
+        classificacao (ClassificacaoNiveisEstoque, opcional): Classificação já calculada
+                                   para `df_estoque` com o mesmo limite baixo; evita reclassificar.
 
     Returns:
         pd.DataFrame: DataFrame contendo apenas os produtos com estoque baixo.
@@ -37,13 +107,6 @@ def identificar_produtos_estoque_baixo(df_estoque, limite_estoque_baixo):
         print(f"Limite de estoque baixo inválido: {limite_estoque_baixo}. Nenhum produto será classificado como baixo.")
         return pd.DataFrame(columns=df_estoque.columns)
 
-
-    df_copia = df_estoque.copy()
-    df_copia['EstoqueNum'] = pd.to_numeric(df_copia['Estoque'], errors='coerce')
-    
-    df_baixo = df_copia[
-        (df_copia['EstoqueNum'].notna()) & 
-        (df_copia['EstoqueNum'] <= limite)
-    ].copy()
-    
-    return df_baixo.drop(columns=['EstoqueNum'], errors='ignore')
\ No newline at end of file
+    if classificacao is None or classificacao.limite_baixo != limite or len(classificacao.codigos) != len(df_estoque):
+        classificacao = classificar_niveis_estoque(df_estoque['Estoque'], limite, limite)
+    return df_estoque[classificacao.mascara(NIVEL_BAIXO)]
\ No newline at end of file
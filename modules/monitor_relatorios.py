@@ -0,0 +1,164 @@
+# modules/monitor_relatorios.py
+import os
+import threading
+from modules.data_loader import carregar_produtos_compactos, serie_numerica
+from modules.config_manager import carregar_configuracoes_exclusao
+from modules.dataset_efetivo import calcular_hash_exclusao, obter_dataset_efetivo, publicar_dataset_base, reaplicar_exclusoes
+from modules.historico_snapshots import DIRETORIO_DADOS_PADRAO, EXTENSOES_RELATORIO, obter_historico_snapshots
+from modules.snapshot_cache import carregar_produtos_com_cache
+
+INTERVALO_VERIFICACAO_SEGUNDOS = 5
+COLUNAS_OBRIGATORIAS_RELATORIO = ['Código', 'Produto', 'Estoque', 'Categoria', 'Grupo']
+
+_lock_monitor = threading.Lock()
+_monitor_atual = None
+# Cada verificação roda inteira sob este lock, e um fork do processo (workers do gunicorn criados
+# a partir do processo mestre) espera a verificação em andamento terminar: assim o processo filho
+# nunca herda o dataset ou a configuração no meio de uma atualização, com locks presos.
+_lock_verificacao = threading.Lock()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(before=_lock_verificacao.acquire, after_in_parent=_lock_verificacao.release,
+                        after_in_child=_lock_verificacao.release)
+
+def validar_dataframe_estoque(df):
+    """Confere se um relatório recém-carregado pode substituir o publicado. Retorna (válido, mensagem)."""
+    if df is None or df.empty:
+        return False, "nenhum produto carregado"
+    faltando = [coluna for coluna in COLUNAS_OBRIGATORIAS_RELATORIO if coluna not in df.columns]
+    if faltando:
+        return False, f"colunas ausentes: {', '.join(faltando)}"
+    if serie_numerica(df['Estoque']).notna().sum() == 0:
+        return False, "nenhum valor de estoque numérico"
+    return True, ""
+
+def _estado_arquivo(caminho):
+    try:
+        estado = os.stat(caminho)
+    except OSError:
+        return None
+    return estado.st_size, estado.st_mtime_ns
+
+class MonitorRelatorios:
+    """
+    Vigia o diretório de relatórios em uma thread de fundo (por polling, sem dependências).
+
+    Um arquivo novo ou alterado só é processado depois de ficar uma verificação inteira sem
+    mudar de tamanho nem de mtime, para não ler um export ainda sendo gravado pelo ERP.
+    Os relatórios estáveis são ingeridos no histórico; se o de data mais recente mudou, ele é
+    carregado, validado e publicado com publicar_dataset_base, que cria uma nova versão do
+    dataset. Requisições em andamento terminam com o dataset que já obtiveram, e os caches
+    derivados (figuras, consultas das tabelas) deixam de ser usados por terem outra versão.
+
+    Também reaplica as exclusões quando a configuração salva deixa de corresponder ao dataset
+    publicado (alterada por outro processo ou à mão). `ao_publicar(dataset)`, se informado, é
+    chamado a cada nova publicação, ainda dentro da verificação.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_DADOS_PADRAO, intervalo_segundos=INTERVALO_VERIFICACAO_SEGUNDOS,
+                 caminho_publicado=None, ao_publicar=None):
+        self.diretorio = diretorio
+        self.intervalo_segundos = intervalo_segundos
+        self.caminho_publicado = os.path.abspath(caminho_publicado) if caminho_publicado else None
+        self._estado_publicado = _estado_arquivo(self.caminho_publicado) if self.caminho_publicado else None
+        self._estados_anteriores = self._estados_diretorio()
+        self.ao_publicar = ao_publicar
+        self._parar = threading.Event()
+        self._thread = None
+
+    def _estados_diretorio(self):
+        estados = {}
+        try:
+            nomes = os.listdir(self.diretorio)
+        except OSError as e:
+            print(f"Erro ao listar o diretório de relatórios {self.diretorio}: {e}")
+            return estados
+        for nome in nomes:
+            if nome.lower().endswith(EXTENSOES_RELATORIO):
+                estado = _estado_arquivo(os.path.join(self.diretorio, nome))
+                if estado is not None:
+                    estados[nome] = estado
+        return estados
+
+    def verificar_agora(self):
+        """
+        Faz uma verificação do diretório e da configuração de exclusão. Retorna o dataset
+        publicado, ou None se nada mudou (ou se o relatório novo não passou na validação).
+        """
+        with _lock_verificacao:
+            dataset = self._verificar_relatorios()
+            if dataset is None:
+                dataset = self._verificar_exclusoes()
+            if dataset is not None and self.ao_publicar is not None:
+                self.ao_publicar(dataset)
+            return dataset
+
+    def _verificar_exclusoes(self):
+        dataset = obter_dataset_efetivo()
+        if dataset.vazio or dataset.hash_exclusao == calcular_hash_exclusao(carregar_configuracoes_exclusao()):
+            return None
+        print("Configuração de exclusão alterada; reaplicando as exclusões aos dados publicados.")
+        return reaplicar_exclusoes()
+
+    def _verificar_relatorios(self):
+        estados_atuais = self._estados_diretorio()
+        alterados = {nome for nome, estado in estados_atuais.items() if self._estados_anteriores.get(nome) != estado}
+        estaveis = {nome for nome, estado in estados_atuais.items() if self._estados_anteriores.get(nome) == estado}
+        self._estados_anteriores = estados_atuais
+        if alterados:
+            # Espera a próxima verificação para confirmar que a gravação terminou
+            return None
+
+        historico = obter_historico_snapshots()
+        for nome in sorted(estaveis):
+            historico.ingerir_arquivo(os.path.join(self.diretorio, nome))
+
+        caminho_mais_recente = historico.caminho_relatorio_mais_recente()
+        if caminho_mais_recente is None:
+            return None
+        caminho_mais_recente = os.path.abspath(caminho_mais_recente)
+        estado_mais_recente = _estado_arquivo(caminho_mais_recente)
+        if caminho_mais_recente == self.caminho_publicado and estado_mais_recente == self._estado_publicado:
+            return None
+        return self.publicar(caminho_mais_recente, estado_mais_recente)
+
+    def publicar(self, caminho_arquivo, estado_arquivo=None):
+        """Carrega, valida e publica o relatório como nova versão do dataset."""
+        df_novo = carregar_produtos_com_cache(caminho_arquivo, carregador=carregar_produtos_compactos)
+        valido, motivo = validar_dataframe_estoque(df_novo)
+        # Mesmo rejeitado, o arquivo não é relido até mudar de novo
+        self.caminho_publicado = caminho_arquivo
+        self._estado_publicado = estado_arquivo if estado_arquivo is not None else _estado_arquivo(caminho_arquivo)
+        if not valido:
+            print(f"Aviso: relatório '{caminho_arquivo}' ignorado ({motivo}); os dados atuais continuam publicados.")
+            return None
+        dataset = publicar_dataset_base(df_novo, origem=caminho_arquivo)
+        print(f"Novos dados publicados (versão {dataset.versao_dados}): {len(df_novo)} produtos do arquivo: {caminho_arquivo}")
+        return dataset
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo_segundos):
+            try:
+                self.verificar_agora()
+            except Exception as e:
+                print(f"Erro no monitor de relatórios: {e}")
+
+    def iniciar(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._executar, name="monitor-relatorios", daemon=True)
+            self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+
+def iniciar_monitor_relatorios(caminho_publicado, diretorio=DIRETORIO_DADOS_PADRAO,
+                               intervalo_segundos=INTERVALO_VERIFICACAO_SEGUNDOS, ao_publicar=None):
+    """Inicia (uma única vez por processo) o monitor do diretório de relatórios."""
+    global _monitor_atual
+    with _lock_monitor:
+        if _monitor_atual is None:
+            _monitor_atual = MonitorRelatorios(diretorio, intervalo_segundos, caminho_publicado, ao_publicar).iniciar()
+        return _monitor_atual
@@ -0,0 +1,107 @@
+# modules/opcoes_produtos.py
+import threading
+import numpy as np
+from modules.indice_busca import IndiceBuscaProdutos, normalizar_texto_busca
+
+# Quantas opções a busca do dropdown de produtos devolve (além dos produtos já selecionados)
+MAX_OPCOES_BUSCA_PRODUTOS = 50
+
+# Um lock serializa a construção do índice; o outro só protege as variáveis abaixo
+_lock_construcao_indice = threading.Lock()
+_lock_indice_opcoes = threading.Lock()
+_indice_opcoes_atual = None
+_versao_preparada = None
+
+def opcoes_codigos(df_base, codigos):
+    """
+    Opções ("Produto (Cód: X)") dos códigos informados, procuradas direto em `df_base`, sem
+    depender do índice. Códigos que não estão no relatório aparecem só com o código.
+    """
+    codigos = [str(codigo) for codigo in codigos or []]
+    if not codigos:
+        return []
+    encontrados = df_base[df_base['Código'].astype(str).isin(codigos)].drop_duplicates(subset=['Código'])
+    produto_por_codigo = dict(zip(encontrados['Código'].astype(str), encontrados['Produto'].astype(str)))
+    return [{'label': f"{produto_por_codigo[codigo]} (Cód: {codigo})" if codigo in produto_por_codigo else codigo, 'value': codigo}
+            for codigo in codigos]
+
+class IndiceOpcoesProdutos:
+    """
+    Opções do dropdown de exclusão de produtos ("Produto (Cód: X)", uma por código) com
+    busca por substring no servidor: o navegador recebe só as opções que casam com o texto
+    digitado, em vez do catálogo inteiro.
+
+    As opções ficam em ordem alfabética de rótulo e a busca usa um IndiceBuscaProdutos
+    sobre os rótulos, então casa tanto o nome quanto o código do produto.
+    """
+
+    def __init__(self, df_base, versao_dados=None):
+        self.versao_dados = versao_dados
+        produtos = df_base.drop_duplicates(subset=['Código'])
+        produtos = produtos[produtos['Código'].notna() & (produtos['Código'].astype(str).str.strip() != '')]
+        codigos = produtos['Código'].astype(str)
+        rotulos = (produtos['Produto'].astype(str) + " (Cód: " + codigos + ")").to_numpy()
+        ordem = np.argsort(rotulos, kind='stable')
+        self._rotulos = rotulos[ordem].tolist()
+        self._codigos = codigos.to_numpy()[ordem].tolist()
+        self._posicao_por_codigo = {codigo: posicao for posicao, codigo in enumerate(self._codigos)}
+        self._indice = IndiceBuscaProdutos(self._rotulos)
+
+    def __len__(self):
+        return len(self._codigos)
+
+    def _opcao(self, posicao):
+        return {'label': self._rotulos[posicao], 'value': self._codigos[posicao]}
+
+    def opcoes_codigos(self, codigos):
+        """Opções dos códigos informados (códigos que não estão no relatório aparecem só com o código)."""
+        opcoes = []
+        for codigo in codigos or []:
+            posicao = self._posicao_por_codigo.get(str(codigo))
+            opcoes.append({'label': str(codigo), 'value': str(codigo)} if posicao is None else self._opcao(posicao))
+        return opcoes
+
+    def buscar(self, texto_busca, limite=MAX_OPCOES_BUSCA_PRODUTOS):
+        """
+        Até `limite` opções cujo rótulo contém `texto_busca` (ignorando acentos e maiúsculas):
+        primeiro as que começam pelo texto, depois as demais, cada grupo em ordem alfabética.
+        """
+        consulta = normalizar_texto_busca(texto_busca or '').strip()
+        if consulta == '':
+            return [self._opcao(posicao) for posicao in range(min(limite, len(self)))]
+        com_prefixo, demais = [], []
+        for posicao in self._indice.buscar(consulta):
+            if self._indice.texto_normalizado(posicao).startswith(consulta):
+                com_prefixo.append(posicao)
+                if len(com_prefixo) >= limite:
+                    break
+            elif len(demais) < limite:
+                demais.append(posicao)
+        return [self._opcao(posicao) for posicao in (com_prefixo + demais)[:limite]]
+
+def obter_indice_opcoes_produtos(dataset):
+    """
+    Índice de opções de produtos do DataFrame completo (sem exclusões) de `dataset`,
+    construído na primeira busca e reaproveitado enquanto a versão dos dados não muda.
+    """
+    global _indice_opcoes_atual
+    with _lock_construcao_indice:
+        indice = _indice_opcoes_atual
+        if indice is None or indice.versao_dados != dataset.versao_dados:
+            indice = IndiceOpcoesProdutos(dataset.df_base, dataset.versao_dados)
+            with _lock_indice_opcoes:
+                _indice_opcoes_atual = indice
+        return indice
+
+def preparar_indice_opcoes_produtos(dataset):
+    """
+    Começa a construir em uma thread de fundo o índice de opções da versão de `dataset`
+    (alguns segundos com centenas de milhares de produtos), para que a primeira busca já o
+    encontre pronto. Não faz nada se o índice dessa versão já existe ou está sendo construído.
+    """
+    global _versao_preparada
+    with _lock_indice_opcoes:
+        if _versao_preparada == dataset.versao_dados:
+            return
+        _versao_preparada = dataset.versao_dados
+    threading.Thread(target=obter_indice_opcoes_produtos, args=(dataset,), name="indice-opcoes-produtos", daemon=True).start()
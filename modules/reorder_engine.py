@@ -0,0 +1,153 @@
+# modules/reorder_engine.py
+import threading
+import numpy as np
+import pandas as pd
+from modules.data_loader import carregar_produtos_streaming, ler_cabecalho_relatorio, serie_numerica
+from modules.dataset_efetivo import mascara_exclusoes
+from modules.snapshot_cache import carregar_produtos_com_cache
+
+# Coluna de saída -> coluna do relatório (as posições são lidas do cabeçalho)
+COLUNAS_NUMERICAS_SUGESTAO = {
+    'Compra': 'Compra',
+    'VendaMensal': 'Venda',
+    'MediaDiaria': 'Média',
+    'VendaDia': 'Venda Dia',
+    'Estoque': 'Estoque',
+    'DiasEstoque': 'Dias Estoque',
+}
+# Colunas calculadas por sugerir_compras
+COLUNA_VENDA_DIARIA = 'Venda/Dia'
+COLUNA_DIAS_COBERTURA = 'Cobertura (dias)'
+COLUNA_DATA_RUPTURA = 'Ruptura Prevista'
+COLUNA_QTD_SUGERIDA = 'Qtd. Sugerida'
+COLUNAS_TABELA_SUGESTAO = ['Código', 'Produto', 'Un', 'Estoque', COLUNA_VENDA_DIARIA, COLUNA_DIAS_COBERTURA,
+                           COLUNA_DATA_RUPTURA, COLUNA_QTD_SUGERIDA, 'Categoria', 'Grupo']
+CASAS_DECIMAIS_SUGESTAO = 2
+# Cobertura acima disso (10 anos) fica sem data de ruptura: a projeção não tem sentido e datas
+# com mais de quatro dígitos no ano quebrariam a ordenação do texto ISO na tabela
+MAX_DIAS_PREVISAO_RUPTURA = 3650
+
+_lock_produtos_sugestao = threading.Lock()
+_produtos_sugestao = {'chave': None, 'df': None, 'cabecalho': None}
+
+def carregar_produtos_sugestao_compra(caminho_arquivo):
+    """
+    Carrega o relatório com todas as colunas usadas na sugestão de compra
+    (Compra, Venda, Média, Venda Dia, Estoque e Dias Estoque), além da hierarquia.
+    """
+    return carregar_produtos_streaming(caminho_arquivo, colunas_numericas=COLUNAS_NUMERICAS_SUGESTAO, compactar=True)
+
+def venda_media_diaria(df, dias_media=None):
+    """
+    Velocidade de venda (unidades por dia) de cada produto: Venda do período dividida pelos
+    "Dias Média" do cabeçalho. Sem o cabeçalho, ou sem a Venda, usa a coluna Média do ERP
+    (que vem arredondada a duas casas). Produtos sem venda ficam com 0.
+    """
+    media_erp = serie_numerica(df['MediaDiaria']).to_numpy(dtype='float64') if 'MediaDiaria' in df.columns else np.full(len(df), np.nan)
+    if dias_media and 'VendaMensal' in df.columns:
+        venda_periodo = serie_numerica(df['VendaMensal']).to_numpy(dtype='float64') / dias_media
+        media_erp = np.where(np.isnan(venda_periodo), media_erp, venda_periodo)
+    return np.where(np.isnan(media_erp) | (media_erp < 0), 0.0, media_erp)
+
+def calcular_sugestao_compra(estoque, venda_diaria, horizonte_dias, estoque_seguranca_dias):
+    """
+    Cálculo vetorizado da sugestão de compra sobre arrays NumPy alinhados.
+
+    - dias de cobertura = estoque disponível / venda diária (infinito sem venda; 0 com estoque negativo);
+    - quantidade sugerida = o que falta para cobrir `horizonte_dias` + `estoque_seguranca_dias`
+      de venda, arredondado para cima (0 quando o estoque já cobre). Estoque negativo (venda
+      sem saldo no ERP) entra como falta a repor.
+
+    Estoque ausente (NaN) deixa cobertura e quantidade como NaN. Retorna (dias_cobertura, quantidade).
+    """
+    estoque = np.asarray(estoque, dtype='float64')
+    venda_diaria = np.asarray(venda_diaria, dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dias_cobertura = np.where(venda_diaria > 0, np.maximum(estoque, 0) / venda_diaria, np.inf)
+    necessidade = venda_diaria * (horizonte_dias + estoque_seguranca_dias)
+    quantidade = np.ceil(np.maximum(necessidade - estoque, 0))
+
+    sem_estoque_informado = np.isnan(estoque)
+    dias_cobertura[sem_estoque_informado] = np.nan
+    quantidade[sem_estoque_informado] = np.nan
+    return dias_cobertura, quantidade
+
+def datas_ruptura(dias_cobertura, data_estoque):
+    """
+    Data prevista em que o estoque acaba (NaT sem venda, sem estoque informado ou com
+    cobertura acima de MAX_DIAS_PREVISAO_RUPTURA).
+    """
+    base = np.datetime64(pd.Timestamp(data_estoque).normalize(), 'D')
+    finitos = np.isfinite(dias_cobertura) & (dias_cobertura <= MAX_DIAS_PREVISAO_RUPTURA)
+    dias = np.zeros(len(dias_cobertura), dtype='int64')
+    dias[finitos] = np.floor(dias_cobertura[finitos])
+    return np.where(finitos, base + dias.astype('timedelta64[D]'), np.datetime64('NaT', 'D'))
+
+def sugerir_compras(df, horizonte_dias, estoque_seguranca_dias, data_estoque=None, dias_media=None, ordenar=True):
+    """
+    Sugestão de compra por SKU: venda diária, dias de cobertura, data prevista de ruptura
+    (a partir da data do estoque do relatório, ou de hoje) e quantidade sugerida.
+    Retorna um DataFrame com COLUNAS_TABELA_SUGESTAO e o mesmo índice de `df`, ordenado pela
+    ruptura mais próxima (ou na ordem de `df`, com `ordenar=False`).
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(columns=COLUNAS_TABELA_SUGESTAO)
+
+    estoque = serie_numerica(df['Estoque']).to_numpy(dtype='float64')
+    venda_diaria = venda_media_diaria(df, dias_media)
+    dias_cobertura, quantidade = calcular_sugestao_compra(estoque, venda_diaria, horizonte_dias, estoque_seguranca_dias)
+    ruptura = datas_ruptura(dias_cobertura, data_estoque if data_estoque is not None else pd.Timestamp.today())
+
+    df_sugestao = pd.DataFrame({
+        'Código': df['Código'].to_numpy(),
+        'Produto': df['Produto'].to_numpy(),
+        'Un': df['Un'].to_numpy(),
+        'Estoque': estoque,
+        COLUNA_VENDA_DIARIA: np.round(venda_diaria, CASAS_DECIMAIS_SUGESTAO),
+        COLUNA_DIAS_COBERTURA: np.round(np.where(np.isinf(dias_cobertura), np.nan, dias_cobertura), 1),
+        COLUNA_DATA_RUPTURA: ruptura,
+        COLUNA_QTD_SUGERIDA: quantidade,
+        'Categoria': df['Categoria'].to_numpy(),
+        'Grupo': df['Grupo'].to_numpy(),
+    }, index=df.index)
+    if not ordenar:
+        return df_sugestao
+    ordem = np.lexsort((-quantidade, np.where(np.isfinite(dias_cobertura), dias_cobertura, np.inf)))
+    return df_sugestao.iloc[ordem]
+
+def tabela_sugestao_compra(df_sugestao, apenas_com_sugestao=True):
+    """Prepara o resultado de sugerir_compras para a DataTable (datas em texto ISO, ordenáveis)."""
+    if apenas_com_sugestao:
+        df_sugestao = df_sugestao[df_sugestao[COLUNA_QTD_SUGERIDA] > 0]
+    return df_sugestao.assign(**{COLUNA_DATA_RUPTURA: df_sugestao[COLUNA_DATA_RUPTURA].dt.strftime('%Y-%m-%d')})
+
+def obter_produtos_sugestao(dataset):
+    """
+    Produtos do relatório publicado no `dataset` (DatasetEfetivo) com as colunas da sugestão
+    de compra e as exclusões da configuração aplicadas, mais o cabeçalho do relatório
+    (data do estoque e dias da média). O carregamento é guardado até a versão dos dados mudar.
+    """
+    if dataset.vazio or not dataset.origem:
+        return pd.DataFrame(), {}
+    chave = (dataset.origem, dataset.versao_dados, dataset.hash_exclusao)
+    with _lock_produtos_sugestao:
+        if _produtos_sugestao['chave'] == chave:
+            return _produtos_sugestao['df'], _produtos_sugestao['cabecalho']
+
+    df_produtos = carregar_produtos_com_cache(dataset.origem, carregador=carregar_produtos_sugestao_compra)
+    if df_produtos is None or df_produtos.empty:
+        return pd.DataFrame(), {}
+    mascara_manter = mascara_exclusoes(df_produtos, dataset.config_exclusao)
+    if mascara_manter is not None:
+        df_produtos = df_produtos[mascara_manter]
+    cabecalho = ler_cabecalho_relatorio(dataset.origem)
+
+    with _lock_produtos_sugestao:
+        _produtos_sugestao.update(chave=chave, df=df_produtos, cabecalho=cabecalho)
+    return df_produtos, cabecalho
+
+def sugestao_compra_dataset(dataset, horizonte_dias, estoque_seguranca_dias):
+    """sugerir_compras sobre os produtos do relatório publicado (ver obter_produtos_sugestao)."""
+    df_produtos, cabecalho = obter_produtos_sugestao(dataset)
+    return sugerir_compras(df_produtos, horizonte_dias, estoque_seguranca_dias,
+                           data_estoque=cabecalho.get('data_estoque'), dias_media=cabecalho.get('dias_media'))
@@ -0,0 +1,177 @@
+# modules/snapshot_cache.py
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from modules.data_loader import carregar_produtos_com_hierarquia
+
+DIRETORIO_CACHE_PADRAO = ".cache_estoque"
+# Incrementar ao mudar o formato gravado ou o esquema produzido pelos carregadores
+VERSAO_FORMATO_CACHE = 3
+MAX_ENTRADAS_CACHE = 8
+TAMANHO_BLOCO_HASH = 1024 * 1024
+ARQUIVO_METADADOS = "meta.json"
+
+def _hash_conteudo(caminho_arquivo):
+    """Calcula o hash do conteúdo do arquivo lendo-o em blocos."""
+    hash_arquivo = hashlib.blake2b(digest_size=16)
+    with open(caminho_arquivo, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO_HASH), b''):
+            hash_arquivo.update(bloco)
+    return hash_arquivo.hexdigest()
+
+def _assinatura_origem(caminho_arquivo, nome_carregador):
+    """
+    Identifica a versão do arquivo de origem: caminho absoluto, tamanho, mtime e hash do conteúdo.
+    O nome do carregador entra na chave para que carregadores diferentes não compartilhem entradas.
+    """
+    caminho_absoluto = os.path.abspath(caminho_arquivo)
+    estado = os.stat(caminho_absoluto)
+    assinatura = {
+        'origem': caminho_absoluto,
+        'tamanho': estado.st_size,
+        'mtime_ns': estado.st_mtime_ns,
+        'hash_conteudo': _hash_conteudo(caminho_absoluto),
+        'carregador': nome_carregador,
+        'versao_formato': VERSAO_FORMATO_CACHE,
+    }
+    chave = hashlib.blake2b(json.dumps(assinatura, sort_keys=True).encode('utf-8'), digest_size=16).hexdigest()
+    return chave, assinatura
+
+def _gravar_snapshot(df, diretorio_entrada, assinatura):
+    """
+    Grava o DataFrame coluna a coluna em arquivos .npy.
+    Colunas numéricas vão direto; colunas de texto viram códigos inteiros (-1 = ausente),
+    no mesmo tipo inteiro que o pandas usa nos códigos de um Categorical, mais a lista de
+    valores distintos, o que mantém todos os arquivos mapeáveis em memória.
+    """
+    diretorio_temporario = f"{diretorio_entrada}.tmp-{os.getpid()}"
+    shutil.rmtree(diretorio_temporario, ignore_errors=True)
+    os.makedirs(diretorio_temporario)
+
+    colunas_meta = []
+    for indice, coluna in enumerate(df.columns):
+        serie = df[coluna]
+        nome_base = f"col_{indice:03d}"
+        if isinstance(serie.dtype, pd.CategoricalDtype) or not (pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_datetime64_dtype(serie)):
+            categorica = serie.astype('category') if not isinstance(serie.dtype, pd.CategoricalDtype) else serie
+            np.save(os.path.join(diretorio_temporario, f"{nome_base}.codes.npy"), categorica.cat.codes.to_numpy())
+            colunas_meta.append({
+                'nome': coluna, 'arquivo': nome_base, 'tipo': 'texto',
+                'categorica': isinstance(serie.dtype, pd.CategoricalDtype),
+                'valores': [str(valor) for valor in categorica.cat.categories],
+            })
+        elif pd.api.types.is_datetime64_dtype(serie):
+            np.save(os.path.join(diretorio_temporario, f"{nome_base}.npy"), serie.to_numpy().view('int64'))
+            colunas_meta.append({'nome': coluna, 'arquivo': nome_base, 'tipo': 'datetime', 'dtype': str(serie.dtype)})
+        else:
+            np.save(os.path.join(diretorio_temporario, f"{nome_base}.npy"), serie.to_numpy())
+            colunas_meta.append({'nome': coluna, 'arquivo': nome_base, 'tipo': 'numerico'})
+
+    with open(os.path.join(diretorio_temporario, ARQUIVO_METADADOS), 'w', encoding='utf-8') as f:
+        json.dump({**assinatura, 'linhas': len(df), 'colunas': colunas_meta, 'criado_em': time.time()}, f, ensure_ascii=False)
+
+    shutil.rmtree(diretorio_entrada, ignore_errors=True)
+    os.replace(diretorio_temporario, diretorio_entrada)
+
+def _ler_snapshot(diretorio_entrada):
+    """
+    Lê uma entrada do cache. As colunas numéricas e os códigos das colunas categóricas
+    (Un, Categoria, Grupo...) são abertos com memory-mapping e usados sem cópia. As colunas de
+    texto não categóricas (Código, Produto) são reconstruídas como arrays de objetos a cada
+    leitura: strings Python não podem ser mapeadas do disco.
+    """
+    with open(os.path.join(diretorio_entrada, ARQUIVO_METADADOS), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+
+    dados = {}
+    for coluna_meta in meta['colunas']:
+        caminho_base = os.path.join(diretorio_entrada, coluna_meta['arquivo'])
+        if coluna_meta['tipo'] == 'texto':
+            if coluna_meta['categorica']:
+                # Os códigos já estão no tipo que o pandas usaria, então o Categorical fica sobre o mmap
+                codigos = np.load(f"{caminho_base}.codes.npy", mmap_mode='c')
+                dados[coluna_meta['nome']] = pd.Categorical.from_codes(codigos, categories=pd.Index(coluna_meta['valores'], dtype=object))
+            else:
+                codigos = np.load(f"{caminho_base}.codes.npy")
+                valores = np.array(coluna_meta['valores'], dtype=object)
+                texto = np.full(len(codigos), np.nan, dtype=object)
+                texto[codigos >= 0] = valores[codigos[codigos >= 0]]
+                dados[coluna_meta['nome']] = texto
+        elif coluna_meta['tipo'] == 'datetime':
+            dados[coluna_meta['nome']] = np.load(f"{caminho_base}.npy").view(coluna_meta['dtype'])
+        else:
+            # mmap_mode='c' (copy-on-write): as páginas são compartilhadas com o cache de disco do SO
+            # e uma eventual escrita acidental fica só na memória deste processo.
+            dados[coluna_meta['nome']] = np.load(f"{caminho_base}.npy", mmap_mode='c')
+    return pd.DataFrame(dados, copy=False)
+
+def _remover_entradas_obsoletas(diretorio_cache, assinatura_atual, chave_atual):
+    """
+    Remove entradas do mesmo arquivo de origem com outra chave (versões antigas),
+    entradas cujo arquivo de origem não existe mais e as menos usadas além de MAX_ENTRADAS_CACHE.
+    """
+    entradas_validas = []
+    for nome in os.listdir(diretorio_cache):
+        caminho_entrada = os.path.join(diretorio_cache, nome)
+        if nome == chave_atual or not os.path.isdir(caminho_entrada):
+            continue
+        try:
+            with open(os.path.join(caminho_entrada, ARQUIVO_METADADOS), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            meta = None
+
+        obsoleta = (
+            meta is None
+            or not os.path.exists(meta.get('origem', ''))
+            or (meta.get('origem') == assinatura_atual['origem'] and meta.get('carregador') == assinatura_atual['carregador'])
+        )
+        if obsoleta:
+            shutil.rmtree(caminho_entrada, ignore_errors=True)
+        else:
+            entradas_validas.append((os.path.getatime(caminho_entrada), caminho_entrada))
+
+    for _, caminho_entrada in sorted(entradas_validas, reverse=True)[MAX_ENTRADAS_CACHE - 1:]:
+        shutil.rmtree(caminho_entrada, ignore_errors=True)
+
+def carregar_produtos_com_cache(caminho_arquivo, diretorio_cache=DIRETORIO_CACHE_PADRAO,
+                                carregador=carregar_produtos_com_hierarquia):
+    """
+    Carrega o relatório de estoque usando um cache colunar em disco.
+
+    Na primeira leitura de uma versão do arquivo o `carregador` faz o parse e o resultado
+    é gravado em `diretorio_cache`; nas seguintes o DataFrame é lido dos arquivos .npy
+    (ver _ler_snapshot), sem passar pelo CSV. Qualquer falha no cache cai no carregador.
+    """
+    try:
+        chave, assinatura = _assinatura_origem(caminho_arquivo, getattr(carregador, '__name__', str(carregador)))
+    except OSError:
+        return carregador(caminho_arquivo)
+
+    diretorio_entrada = os.path.join(diretorio_cache, chave)
+    if os.path.isdir(diretorio_entrada):
+        try:
+            df_cache = _ler_snapshot(diretorio_entrada)
+            os.utime(diretorio_entrada)
+            print(f"Produtos carregados do cache: {len(df_cache)} do arquivo: {caminho_arquivo}")
+            return df_cache
+        except Exception as e:
+            print(f"Aviso: entrada de cache inválida em '{diretorio_entrada}', recarregando o arquivo. Erro: {e}")
+            shutil.rmtree(diretorio_entrada, ignore_errors=True)
+
+    df_produtos = carregador(caminho_arquivo)
+    if df_produtos is None or df_produtos.empty:
+        return df_produtos
+
+    df_produtos = df_produtos.reset_index(drop=True)
+    try:
+        os.makedirs(diretorio_cache, exist_ok=True)
+        _gravar_snapshot(df_produtos, diretorio_entrada, assinatura)
+        _remover_entradas_obsoletas(diretorio_cache, assinatura, chave)
+    except Exception as e:
+        print(f"Aviso: não foi possível gravar o cache de '{caminho_arquivo}': {e}")
+    return df_produtos
@@ -0,0 +1,49 @@
+"""
+Ponto de entrada WSGI para produção (o `python main.py` sobe o servidor de desenvolvimento do Dash).
+
+Uso (a partir da raiz do projeto):
+    gunicorn -c gunicorn.conf.py wsgi:application       # Linux: vários workers com preload
+    waitress-serve --port=8050 wsgi:application         # Windows: um processo com várias threads
+
+Com o gunicorn.conf.py o relatório é carregado uma única vez, no processo mestre, antes de os
+workers serem criados; os workers herdam o dataset por fork (cópia sob demanda das páginas de
+memória) em vez de cada um ler o seu. Nesse caso o monitor de data/ também roda só no mestre,
+e a cada nova publicação os workers são recriados a partir dele (ver gunicorn.conf.py). Com
+outros servidores WSGI o monitor é iniciado aqui mesmo, em cada processo que importar este módulo,
+e DASHESTOQUE_INICIO_RAPIDO=1 faz o servidor atender antes de o relatório terminar de ser lido
+(ver modules/inicializacao.py).
+"""
+import os
+from main import app
+from modules.config_manager import carregar_definicoes_niveis_estoque
+from modules.dataset_efetivo import obter_dataset_efetivo
+from modules.inicializacao import inicio_rapido_ativo, iniciar_carga_em_segundo_plano
+from modules.monitor_relatorios import iniciar_monitor_relatorios
+
+# Definida pelo gunicorn.conf.py: o monitor de data/ é iniciado pelo processo mestre do gunicorn
+VARIAVEL_MONITOR_NO_MESTRE = "DASHESTOQUE_MONITOR_NO_MESTRE"
+
+application = server = app.server
+
+def preaquecer_dataset(dataset=None):
+    """
+    Monta a classificação por nível e o cubo de agregados dos limites configurados, que os
+    callbacks do painel criariam na primeira requisição. Chamado antes do fork, eles ficam
+    prontos (e compartilhados) em todos os workers em vez de serem montados por cada um.
+    """
+    dataset = dataset if dataset is not None else obter_dataset_efetivo()
+    if dataset.vazio:
+        return dataset
+    config_niveis = carregar_definicoes_niveis_estoque()
+    dataset.cubo_agregacao(config_niveis.get("limite_estoque_baixo", 10), config_niveis.get("limite_estoque_medio", 100))
+    return dataset
+
+def _concluir_carga(dataset):
+    preaquecer_dataset(dataset)
+    if os.environ.get(VARIAVEL_MONITOR_NO_MESTRE) != "1":
+        iniciar_monitor_relatorios(dataset.origem)
+
+if inicio_rapido_ativo():
+    iniciar_carga_em_segundo_plano(ao_concluir=_concluir_carga)
+else:
+    _concluir_carga(obter_dataset_efetivo())